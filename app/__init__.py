@@ -1,4 +1,4 @@
-from flask import Flask
+from flask import Flask, Response
 from flask_jwt_extended import JWTManager
 from config import Config
 from .sample import sample_bp
@@ -8,7 +8,14 @@ from .campaigns import campaigns_bp
 from .campaign_donors import campaign_donors_bp
 from .donation_points import donation_points_bp
 from .auth import auth_bp
+from .events import events_bp
+from .health import health_bp
+from .analytics import analytics_bp
+from .pickup_routes import pickup_routes_bp
+from .query import query_bp
 from flask_cors import CORS
+from . import metrics, profiling, logging_setup, ratelimit, cli, expiry
+from .db import supabase
 jwt = JWTManager()
 
 
@@ -17,11 +24,21 @@ def create_app(config_class=Config):
     CORS(app)
     app.config.from_object(config_class)
     jwt.init_app(app)
+    logging_setup.init_app(app)
+    profiling.init_app(app)
+    ratelimit.init_app(app)
+    supabase.init_app(app)
+    cli.init_app(app)
+    expiry.init_app(app)
 
     @app.route("/")
     def hello_world():
         return "Hello, World! \n This is the backend point of Punto Donativo. \n Please, use the API to interact with the database."
 
+    @app.route("/metrics")
+    def metrics_endpoint():
+        return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
     app.register_blueprint(auth_bp, url_prefix="/auth")
     app.register_blueprint(sample_bp, url_prefix="/sample")
     app.register_blueprint(donors_bp, url_prefix="/donors")
@@ -29,6 +46,11 @@ def create_app(config_class=Config):
     app.register_blueprint(campaigns_bp, url_prefix="/campaigns")
     app.register_blueprint(campaign_donors_bp, url_prefix="/campaign_donors")
     app.register_blueprint(donation_points_bp, url_prefix="/donation_points")
+    app.register_blueprint(events_bp, url_prefix="/events")
+    app.register_blueprint(health_bp, url_prefix="/health")
+    app.register_blueprint(analytics_bp, url_prefix="/analytics")
+    app.register_blueprint(pickup_routes_bp, url_prefix="/routes")
+    app.register_blueprint(query_bp, url_prefix="/query")
 
 
     return app
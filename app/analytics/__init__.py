@@ -0,0 +1,43 @@
+from flask import Blueprint, jsonify, request
+from app.db import supabase
+from app.timeseries import GRANULARITIES, parse_range, timeseries
+
+
+analytics_bp = Blueprint("analytics", __name__)
+
+
+@analytics_bp.route("/timeseries", methods=["GET"])
+def get_timeseries():
+    """
+    Series de tiempo de donaciones para operaciones.
+
+    Query parameters:
+    start_date: date (YYYY-MM-DD)
+    end_date: date (YYYY-MM-DD, inclusive)
+    granularity: 'day' | 'week' (optional, default 'day'; weeks start on Monday)
+    id_point: int (optional - only this donation point)
+
+    Response: bucket start dates plus, per bucket, donation count, kg,
+    perishable ratio (perishable kg / kg), kg per food category, and the
+    same broken down per donation point.
+    """
+    try:
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+        granularity = request.args.get('granularity', 'day')
+        id_point = request.args.get('id_point', type=int)
+
+        if not start_date or not end_date:
+            return jsonify({'error': 'Missing date range parameters'}), 400
+        if granularity not in GRANULARITIES:
+            return jsonify({'error': f"granularity must be one of: {', '.join(GRANULARITIES)}"}), 400
+
+        try:
+            start, end = parse_range(start_date, end_date)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        return jsonify(timeseries(supabase, start, end, granularity, id_point)), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,68 @@
+# app/archive.py
+import logging
+import os
+from datetime import date, timedelta
+
+from app import metrics
+
+# Closed donations older than this many days live in the archive tables
+HORIZON_DAYS = int(os.getenv("ARCHIVE_HORIZON_DAYS", "180"))
+BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+MAX_BATCHES = int(os.getenv("ARCHIVE_MAX_BATCHES", "200"))
+
+HOT = ("donations", "food")
+ALL = ("donations_all", "food_all")
+
+donations_archived = metrics.counter("donations_archived_total", "Closed donations moved to the archive tables")
+logger = logging.getLogger(__name__)
+
+
+def tables(include_archived=False):
+    """(donations, food) relation names: the hot tables, or the views over both tiers."""
+    return ALL if include_archived else HOT
+
+
+def include_archived(args):
+    """The `include_archived` query flag of a list endpoint."""
+    return args.get('include_archived', 'false').lower() == 'true'
+
+
+def horizon(today=None):
+    return (today or date.today()) - timedelta(days=HORIZON_DAYS)
+
+
+def tables_for_range(start, today=None):
+    """Reads starting before the archive horizon have to include the archive."""
+    return tables(start < horizon(today))
+
+
+def archive(supabase, horizon_days=HORIZON_DAYS, batch_size=BATCH_SIZE, max_batches=MAX_BATCHES,
+            today=None, dry_run=False):
+    """
+    Move closed donations dated more than `horizon_days` ago, and their
+    food, to the archive tables in batches (one archive_donations() call,
+    i.e. one transaction, per batch). Returns {'archived', 'batches'}, or
+    {'eligible'} for a dry run.
+    """
+    cutoff = ((today or date.today()) - timedelta(days=horizon_days)).isoformat()
+
+    if dry_run:
+        response = supabase.table("donations") \
+            .select("id", count="exact") \
+            .eq('pending', False) \
+            .lt('date', cutoff) \
+            .limit(1) \
+            .execute()
+        return {'eligible': response.count or 0, 'before': cutoff}
+
+    result = {'archived': 0, 'batches': 0, 'before': cutoff}
+    for _ in range(max_batches):
+        moved = supabase.rpc("archive_donations", {'p_before': cutoff, 'p_limit': batch_size}).execute().data or 0
+        result['batches'] += 1
+        result['archived'] += moved
+        donations_archived.inc(moved)
+        if moved < batch_size:
+            break
+
+    logger.info("donations archived", extra=result)
+    return result
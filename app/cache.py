@@ -0,0 +1,284 @@
+# app/cache.py
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from app import metrics
+
+cache_hits = metrics.counter("cache_hits_total", "Entity cache hits by tier")
+cache_misses = metrics.counter("cache_misses_total", "Entity cache misses (backend reads)")
+cache_invalidations = metrics.counter("cache_invalidations_total", "Entity cache invalidations by origin")
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+# Set while a loader refills a cache. Whatever it loads is served to every
+# client, and the entry was usually just invalidated by a write the read
+# replica may not have applied yet, so app.db sends these reads to the
+# primary.
+_refilling = contextvars.ContextVar("cache_refilling", default=False)
+
+
+@contextlib.contextmanager
+def refilling():
+    token = _refilling.set(True)
+    try:
+        yield
+    finally:
+        _refilling.reset(token)
+
+
+def is_refilling():
+    return _refilling.get()
+
+
+class LRUCache:
+    """Per-process LRU cache whose entries expire after a TTL (in seconds)."""
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def keys(self):
+        with self._lock:
+            return list(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RedisTier:
+    """
+    Shared cache tier backed by any Redis-compatible server.
+    Invalidations are broadcast on a pub/sub channel so every worker
+    can drop its local copy.
+    """
+
+    # Backoff between attempts to resubscribe after the pub/sub connection drops
+    retry_initial = 0.5
+    retry_max = 30.0
+
+    def __init__(self, url, prefix="pd:", ttl=300):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_REDIS_URL is set but the 'redis' package is not installed")
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.ttl = ttl
+        self.channel = f"{prefix}invalidate"
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            return _MISSING
+        return json.loads(raw)
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, json.dumps(value), ex=self.ttl)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def publish(self, key):
+        self.client.publish(self.channel, key)
+
+    def listen(self, callback, on_reconnect=None):
+        """
+        Call `callback(key)` for every invalidation, for as long as the
+        process lives. A dropped connection is logged and retried with
+        backoff; invalidations published meanwhile are lost, so
+        `on_reconnect()` is called each time the subscription is restored.
+        """
+        delay, subscribed_before = 0.0, False
+        while True:
+            pubsub = None
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                if subscribed_before and on_reconnect is not None:
+                    on_reconnect()
+                subscribed_before, delay = True, 0.0
+                for message in pubsub.listen():
+                    data = message.get("data")
+                    if isinstance(data, bytes):
+                        data = data.decode()
+                    callback(data)
+            except Exception:
+                logger.warning("cache invalidation subscription lost, retrying", exc_info=True)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
+            delay = min(self.retry_max, delay * 2 or self.retry_initial)
+            time.sleep(delay)
+
+
+class EntityCache:
+    """
+    Two-tier read-through cache: local LRU first, then the optional
+    shared tier, then the loader (the backend).
+    """
+
+    def __init__(self, local, shared=None):
+        self.local = local
+        self.shared = shared
+        self._listener_pid = None
+        self._listener_lock = threading.Lock()
+
+    def _ensure_listener(self):
+        # The subscriber thread must be started in every worker process,
+        # not inherited from the master through fork.
+        if self.shared is None or self._listener_pid == os.getpid():
+            return
+        with self._listener_lock:
+            if self._listener_pid == os.getpid():
+                return
+            self._listener_pid = os.getpid()
+            thread = threading.Thread(
+                target=self.shared.listen,
+                args=(self._on_remote_invalidation, self._on_reconnect),
+                name="cache-invalidation-listener",
+                daemon=True,
+            )
+            thread.start()
+
+    def _on_remote_invalidation(self, key):
+        self.local.delete(key)
+        cache_invalidations.inc(origin="remote")
+
+    def _on_reconnect(self):
+        # Invalidations sent while disconnected never arrived: drop everything
+        self.local.clear()
+        cache_invalidations.inc(origin="reconnect")
+
+    def get_or_load(self, key, loader):
+        self._ensure_listener()
+
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            cache_hits.inc(tier="local")
+            return value
+
+        if self.shared is not None:
+            try:
+                value = self.shared.get(key)
+            except Exception:
+                value = _MISSING
+            if value is not _MISSING:
+                cache_hits.inc(tier="shared")
+                self.local.set(key, value)
+                return value
+
+        cache_misses.inc()
+        with refilling():
+            value = loader()
+        # Missing rows are not cached so a later create is visible immediately.
+        if value is not None:
+            self.local.set(key, value)
+            if self.shared is not None:
+                try:
+                    self.shared.set(key, value)
+                except Exception:
+                    pass
+        return value
+
+    def invalidate(self, key):
+        self.local.delete(key)
+        cache_invalidations.inc(origin="local")
+        if self.shared is not None:
+            try:
+                self.shared.delete(key)
+                self.shared.publish(key)
+            except Exception:
+                pass
+
+
+def _build_entity_cache():
+    redis_url = os.getenv("CACHE_REDIS_URL")
+    # Without the shared tier invalidations reach only the worker that made
+    # the write, so other workers' copies must expire quickly on their own
+    local = LRUCache(
+        maxsize=int(os.getenv("CACHE_MAXSIZE", "4096")),
+        ttl=float(os.getenv("CACHE_TTL", "60" if redis_url else "5")),
+    )
+    shared = None
+    if redis_url:
+        shared = RedisTier(redis_url, ttl=int(os.getenv("CACHE_SHARED_TTL", "300")))
+    return EntityCache(local, shared)
+
+
+entity_cache = _build_entity_cache()
+
+# Columns that must never be stored in the cache.
+_PRIVATE_COLUMNS = {
+    "donors": ("password",),
+}
+
+
+def get_entity(table, entity_id):
+    """
+    Read a row by ID through the entity cache.
+    Returns the row as a dict, or None if it does not exist.
+    """
+    # Imported here because app.db itself depends on this module (via app.resilience).
+    from app.db import supabase
+
+    def load():
+        response = supabase.table(table) \
+            .select("*") \
+            .eq('id', entity_id) \
+            .execute()
+
+        if not response.data:
+            return None
+
+        row = dict(response.data[0])
+        for column in _PRIVATE_COLUMNS.get(table, ()):
+            row.pop(column, None)
+        return row
+
+    return entity_cache.get_or_load(f"{table}:{entity_id}", load)
+
+
+def invalidate_entity(table, entity_id):
+    """Drop a row from every cache tier and every worker."""
+    entity_cache.invalidate(f"{table}:{entity_id}")
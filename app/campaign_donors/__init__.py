@@ -1,6 +1,9 @@
 from flask import Blueprint, jsonify, request
 from datetime import datetime
 from app.db import supabase
+from app.cache import get_entity
+from app.schemas import parse_body, CampaignDonorIn
+from app.idempotency import idempotent
 
 
 campaign_donors_bp = Blueprint("campaign_donors", __name__)
@@ -12,6 +15,7 @@ def sample():
 
 
 @campaign_donors_bp.route("/create", methods=["POST"])
+@idempotent
 def create():
     """
     Para crear un Campaign Donor, se debe enviar un JSON con los siguientes campos:
@@ -19,43 +23,32 @@ def create():
     donor_id: int
     """
     try:
-        data = request.get_json()
+        data, error = parse_body(CampaignDonorIn)
+        if error:
+            return error
 
-        required_fields = ['campaign_id', 'donor_id']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({'error': f'Missing required field: {field}'}), 400
+        campaign = get_entity("campaigns", data.campaign_id)
 
-        campaign = supabase.table("campaigns") \
-            .select("*") \
-            .eq('id', data['campaign_id']) \
-            .single() \
-            .execute()
-
-        if not campaign.data:
+        if not campaign:
             return jsonify({'error': 'Campaign not found'}), 404
 
-        donor = supabase.table("donors") \
-            .select("*") \
-            .eq('id', data['donor_id']) \
-            .single() \
-            .execute()
+        donor = get_entity("donors", data.donor_id)
 
-        if not donor.data:
+        if not donor:
             return jsonify({'error': 'Donor not found'}), 404
 
         existing = supabase.table("campaign_donors") \
             .select("*") \
-            .eq('campaign_id', data['campaign_id']) \
-            .eq('donor_id', data['donor_id']) \
+            .eq('campaign_id', data.campaign_id) \
+            .eq('donor_id', data.donor_id) \
             .execute()
 
         if existing.data:
             return jsonify({'error': 'Donor is already registered in this campaign'}), 400
 
         response = supabase.table("campaign_donors").insert({
-            "campaign_id": data['campaign_id'],
-            "donor_id": data['donor_id'],
+            "campaign_id": data.campaign_id,
+            "donor_id": data.donor_id,
             "created_at": datetime.utcnow().date().isoformat()
         }).execute()
 
@@ -73,15 +66,14 @@ def delete():
     donor_id: int
     """
     try:
-        data = request.get_json()
-
-        if 'campaign_id' not in data or 'donor_id' not in data:
-            return jsonify({'error': 'Missing campaign_id or donor_id'}), 400
+        data, error = parse_body(CampaignDonorIn)
+        if error:
+            return error
 
         response = supabase.table("campaign_donors") \
             .delete() \
-            .eq('campaign_id', data['campaign_id']) \
-            .eq('donor_id', data['donor_id']) \
+            .eq('campaign_id', data.campaign_id) \
+            .eq('donor_id', data.donor_id) \
             .execute()
 
         if not response.data:
@@ -1,6 +1,11 @@
 from flask import Blueprint, jsonify, request
 from datetime import datetime
 from app.db import supabase
+from app.cache import get_entity, invalidate_entity
+from app.resilience import stale_read, stale_response, mark_stale
+from app.pubsub import publish_campaign
+from app.leaderboard import LEADERBOARD_SIZE, campaign_scope, leaderboards
+from app.schemas import parse_body, dump, CampaignCreate, CampaignUpdate
 
 
 campaigns_bp = Blueprint("campaigns", __name__)
@@ -43,28 +48,18 @@ def create():
     }
     """
     try:
-        data = request.get_json()
+        data, error = parse_body(CampaignCreate)
+        if error:
+            return error
 
-        required_fields = ["name", "start_date", "end_date"]
-        for field in required_fields:
-            if field not in data:
-                return jsonify({"error": f"Missing required field: {field}"}), 400
-
-        if data["start_date"] > data["end_date"]:
+        if data.start_date > data.end_date:
             return jsonify({"error": "Start date must be before end date"}), 400
 
-        campaign_data = {
-            "name": data["name"],
-            "start_date": data["start_date"],
-            "end_date": data["end_date"],
-            "active": data.get("active", True),
-            "address": data.get("address", None),
-            "lat": data.get("lat", None),
-            "lon": data.get("lon", None),
-            "description": data.get("description", None)
-        }
+        campaign_data = dump(data)
 
         response = supabase.table("campaigns").insert(campaign_data).execute()
+        mark_stale("campaigns:")
+        publish_campaign("campaign.created", response.data[0])
 
         return jsonify(response.data[0]), 201
 
@@ -105,28 +100,29 @@ def update():
     }
     """
     try:
-        data = request.get_json()
-
         # Retrieve the campaign ID from query parameters
         campaign_id = request.args.get('id')
         if not campaign_id:
             return jsonify({"error": "Missing campaign ID"}), 400
 
-        update_data = {}
+        data, error = parse_body(CampaignUpdate)
+        if error:
+            return error
 
-        for field in ["name", "start_date", "end_date", "active", "description", "address", "lat", "lon"]:
-            if field in data:
-                update_data[field] = data[field]
+        if data.start_date and data.end_date and data.start_date > data.end_date:
+            return jsonify({"error": "Start date must be before end date"}), 400
 
-        if "start_date" in update_data and "end_date" in update_data:
-            if update_data["start_date"] > update_data["end_date"]:
-                return jsonify({"error": "Start date must be before end date"}), 400
+        update_data = dump(data, exclude_unset=True)
 
         response = supabase.table("campaigns").update(update_data).eq("id", campaign_id).execute()
 
         if not response.data:
             return jsonify({"error": "Campaign not found"}), 404
 
+        invalidate_entity("campaigns", campaign_id)
+        mark_stale("campaigns:")
+        publish_campaign("campaign.updated", response.data[0])
+
         return jsonify(response.data[0]), 200
 
     except Exception as e:
@@ -169,6 +165,10 @@ def delete():
         if not response.data:
             return jsonify({'error': 'Campaign not found'}), 404
 
+        invalidate_entity("campaigns", campaign_id)
+        mark_stale("campaigns:")
+        publish_campaign("campaign.deleted", response.data[0])
+
         return jsonify({'message': 'Campaign and related donors deleted successfully'}), 200
 
     except Exception as e:
@@ -187,16 +187,19 @@ def list():
         campaign_id = request.args.get('id')
         active = request.args.get('active')
 
-        query = supabase.table("campaigns").select("*")
+        def load():
+            query = supabase.table("campaigns").select("*")
 
-        if campaign_id:
-            query = query.eq('id', campaign_id)
-        if active is not None:
-            query = query.eq('active', active.lower() == 'true')
+            if campaign_id:
+                query = query.eq('id', campaign_id)
+            if active is not None:
+                query = query.eq('active', active.lower() == 'true')
 
-        response = query.order('start_date', desc=True).execute()
+            return query.order('start_date', desc=True).execute().data
 
-        return jsonify(response.data), 200
+        data, age = stale_read(f"campaigns:list:{campaign_id}:{active}", load)
+
+        return stale_response(data, age)
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -232,15 +235,17 @@ def list_by_donor(donor_id):
 def list_active():
     """Lista de campañas activas"""
     try:
-        current_date = datetime.utcnow().date().isoformat()
+        def load():
+            return supabase.table("campaigns") \
+                .select("*") \
+                .eq('active', True) \
+                .order('start_date', desc=True) \
+                .execute() \
+                .data
 
-        response = supabase.table("campaigns") \
-            .select("*") \
-            .eq('active', True) \
-            .order('start_date', desc=True) \
-            .execute()
+        data, age = stale_read("campaigns:active", load)
 
-        return jsonify(response.data), 200
+        return stale_response(data, age)
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -252,15 +257,66 @@ def list_upcoming():
     try:
         current_date = datetime.utcnow().date().isoformat()
 
-        response = supabase.table("campaigns") \
-            .select("*") \
-            .eq('active', True) \
-            .gt('start_date', current_date) \
-            .execute()
+        def load():
+            return supabase.table("campaigns") \
+                .select("*") \
+                .eq('active', True) \
+                .gt('start_date', current_date) \
+                .execute() \
+                .data
 
-        return jsonify(response.data), 200
+        data, age = stale_read(f"campaigns:upcoming:{current_date}", load)
+
+        return stale_response(data, age)
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@campaigns_bp.route("/<int:campaign_id>/dashboard", methods=["GET"])
+def dashboard(campaign_id):
+    """
+    Tablero de una campaña: donantes inscritos, donaciones recibidas y kg
+    por categoría de alimento y por día. Los totales se agrupan en la base
+    de datos (función campaign_dashboard, migrations/003) en una sola
+    consulta, sin traer las filas de donations ni food.
+    URL: /campaigns/1/dashboard
+    """
+    try:
+        campaign = get_entity("campaigns", campaign_id)
+        if not campaign:
+            return jsonify({'error': 'Campaign not found'}), 404
+
+        def load():
+            return supabase.rpc("campaign_dashboard", {'p_campaign_id': campaign_id}).execute().data
+
+        data, age = stale_read(f"campaigns:dashboard:{campaign_id}:", load)
+
+        return stale_response({
+            'campaign': {field: campaign.get(field) for field in ('id', 'name', 'start_date', 'end_date', 'active')},
+            **(data or {}),
+        }, age)
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+@campaigns_bp.route("/<int:campaign_id>/leaderboard", methods=["GET"])
+def leaderboard(campaign_id):
+    """
+    Top de donantes de una campaña por kg donados.
+    URL: /campaigns/1/leaderboard?limit=10 (limit opcional, máximo LEADERBOARD_SIZE)
+    """
+    try:
+        limit = max(1, min(request.args.get('limit', LEADERBOARD_SIZE, type=int), LEADERBOARD_SIZE))
+
+        if not get_entity("campaigns", campaign_id):
+            return jsonify({'error': 'Campaign not found'}), 404
+
+        return jsonify({
+            'campaign_id': campaign_id,
+            'leaderboard': leaderboards.top(campaign_scope(campaign_id), limit)
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
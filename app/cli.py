@@ -0,0 +1,73 @@
+# app/cli.py
+import json
+
+import click
+
+from app.db import supabase
+
+
+def init_app(app):
+    """Maintenance commands, run with `flask --app wsgi <command>`."""
+
+    @app.cli.command("inventory-reconcile")
+    @click.option("--batch-size", type=int, default=None, help="Donations per page and ledger rows per upsert.")
+    @click.option("--dry-run", is_flag=True, help="Report drift without rewriting the ledger.")
+    def inventory_reconcile(batch_size, dry_run):
+        """Rebuild donation_point_inventory from donations and food."""
+        from app.inventory import RECONCILE_BATCH_SIZE, reconcile
+
+        result = reconcile(supabase, batch_size or RECONCILE_BATCH_SIZE, dry_run=dry_run)
+        click.echo(json.dumps(result))
+
+    @app.cli.command("leaderboard-rebuild")
+    @click.option("--batch-size", type=int, default=None, help="Donations per page and rows per upsert.")
+    def leaderboard_rebuild(batch_size):
+        """Recompute donor_leaderboard from donations and food."""
+        from app.leaderboard import BATCH_SIZE, rebuild
+
+        click.echo(json.dumps(rebuild(supabase, batch_size or BATCH_SIZE)))
+
+    @app.cli.command("donors-dedup")
+    @click.option("--merge", is_flag=True, help="Merge the groups found instead of only listing them.")
+    def donors_dedup(merge):
+        """Find (and optionally merge) duplicate donors; the groups are stored for /donors/duplicates."""
+        from app.dedup import merge_groups, save_scan, scan
+
+        groups = scan(supabase)
+        for group in groups:
+            click.echo(json.dumps(group))
+        if merge and groups:
+            click.echo(json.dumps(merge_groups(supabase, groups)))
+            save_scan(supabase, [])
+
+    @app.cli.command("import-csv")
+    @click.argument("kind", type=click.Choice(["donors", "donation_points"]))
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--batch-size", type=int, default=None, help="Rows per upsert.")
+    def import_csv_command(kind, path, batch_size):
+        """Stream a CSV file of donors or donation points into the database."""
+        from app.bulk_import import BATCH_SIZE, import_csv
+
+        with open(path, encoding="utf-8-sig", newline="") as text_stream:
+            click.echo(json.dumps(import_csv(supabase, kind, text_stream, batch_size or BATCH_SIZE)))
+
+    @app.cli.command("donations-expire")
+    @click.option("--batch-size", type=int, default=None, help="Donations per update.")
+    @click.option("--dry-run", is_flag=True, help="Count the first batch of overdue donations per type without expiring them.")
+    def donations_expire(batch_size, dry_run):
+        """Expire overdue pending donations once (DONATION_EXPIRY_DAYS per type)."""
+        from app.expiry import BATCH_SIZE, sweep
+
+        click.echo(json.dumps(sweep(supabase, batch_size=batch_size or BATCH_SIZE, dry_run=dry_run)))
+
+    @app.cli.command("donations-archive")
+    @click.option("--horizon-days", type=int, default=None, help="Archive closed donations older than this (ARCHIVE_HORIZON_DAYS).")
+    @click.option("--batch-size", type=int, default=None, help="Donations moved per transaction.")
+    @click.option("--dry-run", is_flag=True, help="Count the donations that would be archived.")
+    def donations_archive(horizon_days, batch_size, dry_run):
+        """Move closed donations past the horizon, and their food, to the archive tables."""
+        from app.archive import BATCH_SIZE, HORIZON_DAYS, archive
+
+        result = archive(supabase, horizon_days if horizon_days is not None else HORIZON_DAYS,
+                         batch_size or BATCH_SIZE, dry_run=dry_run)
+        click.echo(json.dumps(result))
@@ -0,0 +1,154 @@
+# app/composite.py
+import os
+
+from app.dataloader import TooManyRows
+
+MAX_DEPTH = int(os.getenv("COMPOSITE_MAX_DEPTH", "4"))
+MAX_IDS = int(os.getenv("COMPOSITE_MAX_IDS", "100"))
+
+
+class QueryError(ValueError):
+    """The requested shape is not valid (unknown root or relation, too deep)."""
+
+
+class HasMany:
+    """Child rows pointing at the parent: donor -> donations, donation -> food."""
+
+    def __init__(self, table, foreign_key):
+        self.table = table
+        self.foreign_key = foreign_key
+
+    def attach(self, loaders, rows, name):
+        found = loaders.get(self.table, self.foreign_key).load_many([row['id'] for row in rows])
+        children = []
+        for row in rows:
+            row[name] = [dict(child) for child in found.get(row['id'], [])]
+            children.extend(row[name])
+        return children
+
+
+class BelongsTo:
+    """The row the parent points at: donation -> donor, point, campaign."""
+
+    def __init__(self, table, local_key):
+        self.table = table
+        self.local_key = local_key
+
+    def attach(self, loaders, rows, name):
+        found = loaders.get(self.table).load_many([row.get(self.local_key) for row in rows])
+        children = []
+        for row in rows:
+            parent = found.get(row.get(self.local_key))
+            row[name] = dict(parent) if parent else None
+            if row[name]:
+                children.append(row[name])
+        return children
+
+
+class Through:
+    """Many-to-many through a link table: donor -> campaign_donors -> campaigns."""
+
+    def __init__(self, link_table, link_key, target_key, table):
+        self.link_table = link_table
+        self.link_key = link_key
+        self.target_key = target_key
+        self.table = table
+
+    def attach(self, loaders, rows, name):
+        links = loaders.get(self.link_table, self.link_key).load_many([row['id'] for row in rows])
+        target_ids = [link[self.target_key] for found in links.values() for link in found]
+        targets = loaders.get(self.table).load_many(target_ids)
+        children = []
+        for row in rows:
+            row[name] = [
+                dict(targets[link[self.target_key]])
+                for link in links.get(row['id'], []) if targets.get(link[self.target_key])
+            ]
+            children.extend(row[name])
+        return children
+
+
+class DonorStats:
+    """Same totals as /donors/stats (archived donations included), from the shared loaders."""
+
+    table = None
+
+    def attach(self, loaders, rows, name):
+        ids = [row['id'] for row in rows]
+        donations = loaders.get("donations_all", "id_donor").load_many(ids)
+        enrolments = loaders.get("campaign_donors", "donor_id").load_many(ids)
+        food = loaders.get("food_all", "id_donation").load_many(
+            [donation['id'] for found in donations.values() for donation in found])
+        for row in rows:
+            quantity = sum(
+                item.get('quantity') or 0
+                for donation in donations.get(row['id'], []) for item in food.get(donation['id'], [])
+            )
+            row[name] = {
+                'total_donations': len(donations.get(row['id'], [])),
+                'total_campaigns': len(enrolments.get(row['id'], [])),
+                # food.quantity is in hundredths of a kg
+                'total_kg_donated': round(quantity / 100, 2),
+            }
+        return []
+
+
+RELATIONS = {
+    'donors': {
+        'donations': HasMany("donations", "id_donor"),
+        'campaigns': Through("campaign_donors", "donor_id", "campaign_id", "campaigns"),
+        'stats': DonorStats(),
+    },
+    'donations': {
+        'food': HasMany("food", "id_donation"),
+        'donor': BelongsTo("donors", "id_donor"),
+        'point': BelongsTo("donation_points", "id_point"),
+        'campaign': BelongsTo("campaigns", "id_campaign"),
+    },
+    'campaigns': {
+        'donations': HasMany("donations", "id_campaign"),
+        'donors': Through("campaign_donors", "campaign_id", "donor_id", "donors"),
+    },
+    'donation_points': {
+        'donations': HasMany("donations", "id_point"),
+    },
+}
+
+
+def _resolve(loaders, table, rows, include, depth):
+    if not include:
+        return
+    if depth > MAX_DEPTH:
+        raise QueryError(f"Queries can nest at most {MAX_DEPTH} levels")
+    relations = RELATIONS.get(table, {})
+    for name, node in include.items():
+        relation = relations.get(name)
+        if relation is None:
+            raise QueryError(f"Unknown relation '{name}' for {table}; expected one of {sorted(relations)}")
+        children = relation.attach(loaders, rows, name)
+        if node.include:
+            if relation.table is None:
+                raise QueryError(f"'{name}' cannot include relations")
+            _resolve(loaders, relation.table, children, node.include, depth + 1)
+
+
+def resolve(loaders, root, ids, include):
+    """
+    Load `root` rows by id and attach the requested relations level by
+    level: every relation costs one batched query per level, whatever the
+    number of parent rows, and rows already loaded in this request are
+    not fetched again. Returns the root rows in the order of `ids`.
+    Raises QueryError once the loaders read more rows than they allow.
+    """
+    if root not in RELATIONS:
+        raise QueryError(f"Unknown root '{root}'; expected one of {sorted(RELATIONS)}")
+    if len(ids) > MAX_IDS:
+        raise QueryError(f"At most {MAX_IDS} ids per query")
+
+    try:
+        found = loaders.get(root).load_many(ids)
+        rows = [dict(found[key]) for key in dict.fromkeys(ids) if found.get(key)]
+        _resolve(loaders, root, rows, include, 1)
+    except TooManyRows as e:
+        raise QueryError(str(e))
+    return rows
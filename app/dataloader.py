@@ -0,0 +1,107 @@
+# app/dataloader.py
+import os
+
+from flask import g
+
+from app import metrics
+from app.db import select_in
+
+BATCH_SIZE = int(os.getenv("DATALOADER_BATCH_SIZE", "200"))
+# Rows one request may read through its loaders (every level together)
+MAX_ROWS = int(os.getenv("COMPOSITE_MAX_ROWS", "5000"))
+
+# Columns read per table. Every lookup of a table selects the same columns
+# so rows found through one relation can answer lookups by id through
+# another (the QR image and the password hash are never read)
+COLUMNS = {
+    'donors': "id,name,email,phone,created_at,updated_at",
+    'donations': "id,date,time,state,id_donor,id_calendar,id_point,id_campaign,type,pending,updated_at",
+    'donations_all': "id,date,time,state,id_donor,id_calendar,id_point,id_campaign,type,pending,updated_at",
+    'food': "id,id_donation,name,quantity,category,perishable",
+    'food_all': "id,id_donation,name,quantity,category,perishable",
+    'campaigns': "*",
+    'campaign_donors': "id,campaign_id,donor_id",
+    'donation_points': "*",
+}
+
+lookups = metrics.counter("dataloader_lookups_total", "Per-request dataloader keys by table and result (cached or fetched)")
+queries = metrics.counter("dataloader_queries_total", "Backend queries issued by per-request dataloaders, by table")
+
+
+class TooManyRows(ValueError):
+    """The request would read more rows than its loaders allow."""
+
+
+class Loader:
+    """
+    Rows of `table` looked up by `column` for the length of one request.
+    Keys are deduplicated, looked up once and fetched in in_() batches;
+    `many` loaders return a list of rows per key (one-to-many relations).
+    """
+
+    def __init__(self, loaders, table, column, many):
+        self.loaders = loaders
+        self.table = table
+        self.column = column
+        self.many = many
+        self._rows = {}
+
+    def load_many(self, keys):
+        keys = [key for key in keys if key is not None]
+        missing = [key for key in dict.fromkeys(keys) if key not in self._rows]
+        lookups.inc(len(keys) - len(missing), table=self.table, result="cached")
+        lookups.inc(len(missing), table=self.table, result="fetched")
+
+        for start in range(0, len(missing), BATCH_SIZE):
+            chunk = missing[start:start + BATCH_SIZE]
+            # Every page is read before the chunk is cached, so a key never holds a partial list
+            rows = select_in(self.loaders.supabase, self.table, COLUMNS[self.table], self.column, chunk,
+                             max_rows=self.loaders.remaining())
+            queries.inc(table=self.table)
+            self.loaders.spend(len(rows))
+            for key in chunk:
+                self._rows[key] = [] if self.many else None
+            self.store(rows)
+            if self.column != 'id':
+                self.loaders.get(self.table, 'id').store(rows)
+        return {key: self._rows[key] for key in keys}
+
+    def store(self, rows):
+        for row in rows:
+            key = row.get(self.column)
+            if self.many:
+                self._rows.setdefault(key, []).append(row)
+            else:
+                self._rows[key] = row
+
+
+class Loaders:
+    def __init__(self, supabase, max_rows=None):
+        self.supabase = supabase
+        self.max_rows = max_rows
+        self.rows_read = 0
+        self._loaders = {}
+
+    def remaining(self):
+        return None if self.max_rows is None else max(0, self.max_rows - self.rows_read)
+
+    def spend(self, count):
+        """Count rows read from the backend; past `max_rows` the request is rejected before anything more is read."""
+        self.rows_read += count
+        if self.max_rows is not None and self.rows_read > self.max_rows:
+            raise TooManyRows(f"The query reads more than {self.max_rows} rows; ask for fewer ids or relations")
+
+    def get(self, table, column='id'):
+        """The loader for `table` by `column`: by id returns one row per key, by any other column a list."""
+        loader = self._loaders.get((table, column))
+        if loader is None:
+            loader = self._loaders[(table, column)] = Loader(self, table, column, many=column != 'id')
+        return loader
+
+
+def get_loaders():
+    """Loaders for the current request (flask.g), so repeated lookups in one request hit the backend once."""
+    if 'loaders' not in g:
+        from app.db import supabase
+        g.loaders = Loaders(supabase, MAX_ROWS)
+    return g.loaders
@@ -1,16 +1,279 @@
 # db.py
-from supabase import create_client
+from supabase import Client, ClientOptions
 import os
+import time
 from dotenv import load_dotenv
+from flask import g, has_request_context, request
+from app.cache import LRUCache, entity_cache, is_refilling
+from app.ratelimit import jwt_identity
+from app.resilience import BreakerTransport, CircuitBreaker, data_breaker
 
 load_dotenv()
 
+
+class GuardedClient(Client):
+    """
+    Supabase client whose PostgREST calls have a deadline and go through
+    the shared circuit breaker, so a slow backend fails fast instead of
+    tying up every worker.
+    """
+
+    breaker = data_breaker
+
+    @property
+    def postgrest(self):
+        postgrest = super().postgrest
+        session = postgrest.session
+        if not isinstance(session._transport, BreakerTransport):
+            session._transport = BreakerTransport(session._transport, self.breaker)
+        return postgrest
+
+
+def create_supabase_client(url=None, key=None, breaker=data_breaker):
+    client = GuardedClient.create(
+        url or os.getenv('SUPABASE_URL'),
+        key or os.getenv('SUPABASE_KEY'),
+        ClientOptions(postgrest_client_timeout=float(os.getenv('SUPABASE_TIMEOUT', '5')))
+    )
+    client.breaker = breaker
+    return client
+
+
+class ProcessLocalClient:
+    """
+    Creates the client lazily, once per process. Connection pools must not
+    be shared across fork, so a gunicorn worker forked from a preloaded
+    master builds its own client on first use.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._client = None
+        self._pid = None
+
+    def get(self):
+        if self._pid != os.getpid():
+            self._client = self._factory()
+            self._pid = os.getpid()
+        return self._client
+
+    def reset(self):
+        self._client = None
+        self._pid = None
+
+    def __getattr__(self, name):
+        # Introspection (copy, mock, pickle) must not open a connection
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.get(), name)
+
+
+class _RoutedTable:
+    """
+    Query builder entry point for one table: `select` goes wherever the
+    router sends reads, every other operation goes to the primary.
+    """
+
+    def __init__(self, router, name):
+        self._router = router
+        self._name = name
+
+    def select(self, *args, **kwargs):
+        return self._router.reader().table(self._name).select(*args, **kwargs)
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self._router.writer().table(self._name), name)
+
+
+class StickyWindows:
+    """
+    Until when each JWT identity reads from the primary after a write.
+    Kept on the shared cache tier's Redis when one is configured, so the
+    window holds on every worker, and in this process otherwise.
+    """
+
+    def __init__(self, client=None, prefix="pd:sticky:", maxsize=100000):
+        self.client = client
+        self.prefix = prefix
+        self.local = LRUCache(maxsize=maxsize)
+
+    def mark(self, identity, seconds):
+        until = time.time() + seconds
+        self.local.set(identity, until, ttl=seconds)
+        if self.client is not None:
+            try:
+                self.client.set(self.prefix + identity, f"{until:.3f}", px=max(1, int(seconds * 1000)))
+            except Exception:
+                pass
+
+    def active(self, identity):
+        until = self.local.get(identity)
+        if until is None and self.client is not None:
+            try:
+                raw = self.client.get(self.prefix + identity)
+            except Exception:
+                raw = None
+            until = float(raw) if raw is not None else None
+        return until is not None and until > time.time()
+
+
+class RoutingClient:
+    """
+    Sends reads issued by GET handlers to the read replica and everything
+    else to the primary.
+
+    Read-your-writes: once a request writes, the rest of that request and
+    the same client's requests for the next `sticky_seconds` read from the
+    primary, so a replica that is a little behind never hides a donor's
+    own change. The window is kept per JWT identity (clients without
+    cookies, like the mobile app, carry a token) and in a cookie for
+    anonymous browsers. Loaders refilling a cache always read from the
+    primary, since their result is served to every client. Reads also
+    fall back to the primary while the replica's circuit is open. Without
+    a replica configured every call goes to the primary.
+    """
+
+    COOKIE = 'pd_primary_until'
+
+    def __init__(self, primary, replica=None, replica_breaker=None, sticky_seconds=5.0, windows=None):
+        self.primary = primary
+        self.replica = replica
+        self.replica_breaker = replica_breaker
+        self.sticky_seconds = sticky_seconds
+        self.windows = windows or StickyWindows()
+
+    def _read_from_primary(self):
+        if self.replica is None or not has_request_context():
+            return True
+        if request.method not in ('GET', 'HEAD') or g.get('wrote_primary'):
+            return True
+        if self.replica_breaker is not None and self.replica_breaker.is_open():
+            return True
+        if is_refilling():
+            return True
+        if 'sticky_primary' not in g:
+            g.sticky_primary = self._sticky()
+        return g.sticky_primary
+
+    def _sticky(self):
+        try:
+            if float(request.cookies.get(self.COOKIE, 0)) > time.time():
+                return True
+        except ValueError:
+            pass
+        identity = jwt_identity()
+        return identity is not None and self.windows.active(str(identity))
+
+    def reader(self):
+        return self.primary.get() if self._read_from_primary() else self.replica.get()
+
+    def writer(self):
+        if has_request_context():
+            g.wrote_primary = True
+        return self.primary.get()
+
+    def table(self, name):
+        return _RoutedTable(self, name)
+
+    def from_(self, name):
+        return self.table(name)
+
+    def rpc(self, fn, params=None, *args, **kwargs):
+        # RPCs are read-only lookups when called from a GET handler
+        client = self.reader() if has_request_context() and request.method in ('GET', 'HEAD') else self.writer()
+        return client.rpc(fn, params if params is not None else {}, *args, **kwargs)
+
+    def get(self):
+        return self.primary.get()
+
+    def reset(self):
+        self.primary.reset()
+        if self.replica is not None:
+            self.replica.reset()
+
+    def init_app(self, app):
+        @app.after_request
+        def stick_to_primary(response):
+            if g.get('wrote_primary') and self.replica is not None:
+                until = time.time() + self.sticky_seconds
+                response.set_cookie(self.COOKIE, f"{until:.3f}", max_age=int(self.sticky_seconds) + 1,
+                                    httponly=True, samesite='Lax')
+                identity = jwt_identity()
+                if identity is not None:
+                    self.windows.mark(str(identity), self.sticky_seconds)
+            return response
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.primary.get(), name)
+
+
+# Read replica (optional). SUPABASE_READ_KEY defaults to the primary key.
+replica_breaker = CircuitBreaker(
+    failure_threshold=int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5")),
+    reset_timeout=float(os.getenv("BREAKER_RESET_TIMEOUT", "30")),
+)
+
+
+def create_replica_client():
+    return create_supabase_client(
+        os.getenv('SUPABASE_READ_URL'),
+        os.getenv('SUPABASE_READ_KEY') or os.getenv('SUPABASE_KEY'),
+        replica_breaker,
+    )
+
+
 # Initialize Supabase client
-supabase = create_client(
-    os.getenv('SUPABASE_URL'),
-    os.getenv('SUPABASE_KEY')
+supabase = RoutingClient(
+    ProcessLocalClient(create_supabase_client),
+    ProcessLocalClient(create_replica_client) if os.getenv('SUPABASE_READ_URL') else None,
+    replica_breaker,
+    sticky_seconds=float(os.getenv('READ_YOUR_WRITES_SECONDS', '5')),
+    windows=StickyWindows(entity_cache.shared.client if entity_cache.shared is not None else None),
 )
 
 
+# Rows per page for reads that may exceed PostgREST's max-rows (1000 by
+# default); must not be larger than max-rows, or a capped page looks complete
+PAGE_SIZE = int(os.getenv('SUPABASE_PAGE_SIZE', '1000'))
+# Values per in_() filter, so the query string stays within proxy URL limits
+IN_CHUNK_SIZE = int(os.getenv('SUPABASE_IN_CHUNK_SIZE', '200'))
+
+
+def select_in(client, table, columns, column, values, page_size=None, max_rows=None):
+    """
+    Every row of `table` whose `column` is in `values`. PostgREST silently
+    truncates a response at max-rows, so a single in_() over child rows
+    (food per donation, donations per donor) can come back incomplete;
+    this reads keyset pages ordered by id until a short page comes back.
+    Long `values` lists are queried IN_CHUNK_SIZE at a time, so rows are
+    ordered by id within each chunk only. With `max_rows`, reading stops
+    as soon as more rows than that were read, and the caller is expected
+    to reject the partial result.
+    """
+    page_size = page_size or PAGE_SIZE
+    if columns != '*' and 'id' not in columns.split(','):
+        columns = f"id,{columns}"
+    values = list(values)
+    rows = []
+    for start in range(0, len(values), IN_CHUNK_SIZE):
+        chunk, after_id = values[start:start + IN_CHUNK_SIZE], None
+        while True:
+            query = client.table(table).select(columns).in_(column, chunk)
+            if after_id is not None:
+                query = query.gt('id', after_id)
+            page = query.order('id').limit(page_size).execute().data
+            rows.extend(page)
+            if max_rows is not None and len(rows) > max_rows:
+                return rows
+            if len(page) < page_size:
+                break
+            after_id = page[-1]['id']
+    return rows
+
+
 def create_all():
     return None
@@ -0,0 +1,276 @@
+# app/dedup.py
+import logging
+import os
+import re
+import unicodedata
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from app import metrics
+from app.cache import invalidate_entity
+from app.db import select_in
+from app.pubsub import broker
+
+BATCH_SIZE = int(os.getenv("DEDUP_BATCH_SIZE", "200"))
+# Blocks larger than this are too common to be useful: name n-grams
+# ("ana", "mar"), shared office phones, placeholder emails ("info@")
+MAX_BLOCK_SIZE = int(os.getenv("DEDUP_MAX_BLOCK_SIZE", "100"))
+# Scans are computed by `flask donors-dedup` and served from this table
+# by /donors/duplicates and /donors/merge {"all": true} while younger
+# than DEDUP_SCAN_TTL seconds
+SCANS_TABLE = "donor_duplicate_scans"
+SCAN_TTL = float(os.getenv("DEDUP_SCAN_TTL", "86400"))
+
+donors_merged = metrics.counter("donors_merged_total", "Duplicate donor records merged into a canonical donor")
+logger = logging.getLogger(__name__)
+
+
+# Normalization
+
+def normalize_phone(phone):
+    digits = re.sub(r"\D", "", phone or "")
+    # Compare national numbers: drop country code / trunk prefixes
+    return digits[-10:] if len(digits) >= 7 else None
+
+
+def normalize_email(email):
+    email = (email or "").strip().lower()
+    if "@" not in email:
+        return None, None
+    local, domain = email.rsplit("@", 1)
+    local = local.split("+", 1)[0].replace(".", "")
+    return local or None, domain
+
+
+def normalize_name(name):
+    text = unicodedata.normalize("NFKD", name or "")
+    text = "".join(char for char in text if not unicodedata.combining(char)).lower()
+    return " ".join(re.findall(r"[a-z0-9]+", text))
+
+
+def ngrams(text, n=3):
+    padded = f" {text} "
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)} if text else set()
+
+
+def similarity(a, b):
+    """Jaccard similarity of two n-gram sets."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class DonorKey:
+    """Normalized fields of one donor used for blocking and matching."""
+
+    __slots__ = ('id', 'phone', 'email_local', 'email', 'name_grams', 'email_grams')
+
+    def __init__(self, donor):
+        self.id = donor['id']
+        self.phone = normalize_phone(donor.get('phone'))
+        local, domain = normalize_email(donor.get('email'))
+        self.email_local = local
+        self.email = f"{local}@{domain}" if local else None
+        self.name_grams = ngrams(normalize_name(donor.get('name')))
+        self.email_grams = ngrams(local or "")
+
+    def blocking_keys(self):
+        if self.phone:
+            yield f"p:{self.phone}"
+        if self.email_local:
+            yield f"e:{self.email_local}"
+        for gram in self.name_grams:
+            yield f"n:{gram}"
+
+
+def match_reason(a, b):
+    """Why two donors are considered the same person, or None."""
+    name = similarity(a.name_grams, b.name_grams)
+    if a.email and a.email == b.email:
+        return "email"
+    if a.phone and a.phone == b.phone and name >= 0.5:
+        return "phone+name"
+    if a.email_local and a.email_local == b.email_local and name >= 0.6:
+        return "email_local+name"
+    if name >= 0.8 and similarity(a.email_grams, b.email_grams) >= 0.8:
+        return "similar_name+email"
+    return None
+
+
+class UnionFind:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, item):
+        parent = self.parent.setdefault(item, item)
+        if parent != item:
+            parent = self.parent[item] = self.find(parent)
+        return parent
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            # The lowest id (oldest record) stays the root
+            self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+
+# Detection
+
+def load_donors(supabase, batch_size=BATCH_SIZE):
+    """Stream donors in keyset pages; only the fields used for matching are read."""
+    after_id = None
+    while True:
+        query = supabase.table("donors").select("id,name,email,phone")
+        if after_id is not None:
+            query = query.gt('id', after_id)
+        rows = query.order('id').limit(batch_size).execute().data
+        yield from rows
+        if len(rows) < batch_size:
+            return
+        after_id = rows[-1]['id']
+
+
+def find_duplicates(donors):
+    """
+    Group likely duplicates. Donors are only compared with others sharing
+    a blocking key (normalized phone, email local-part or a name trigram),
+    never all pairs; oversized blocks of any kind are skipped, so the
+    comparisons stay bounded by MAX_BLOCK_SIZE squared per block.
+    Returns [{'canonical_id', 'duplicate_ids', 'reasons'}] sorted by canonical id.
+    """
+    keys = {}
+    blocks = defaultdict(list)
+    for donor in donors:
+        key = DonorKey(donor)
+        keys[key.id] = key
+        for block in key.blocking_keys():
+            blocks[block].append(key.id)
+
+    groups = UnionFind()
+    reasons = defaultdict(set)
+    compared = set()
+    for block, ids in blocks.items():
+        if len(ids) < 2 or len(ids) > MAX_BLOCK_SIZE:
+            continue
+        for i, a in enumerate(ids):
+            for b in ids[i + 1:]:
+                pair = (a, b) if a < b else (b, a)
+                if pair in compared:
+                    continue
+                compared.add(pair)
+                reason = match_reason(keys[a], keys[b])
+                if reason:
+                    groups.union(a, b)
+                    reasons[pair[1]].add(reason)
+
+    members = defaultdict(list)
+    for donor_id in groups.parent:
+        members[groups.find(donor_id)].append(donor_id)
+
+    result = []
+    for canonical_id, ids in sorted(members.items()):
+        duplicates = sorted(donor_id for donor_id in ids if donor_id != canonical_id)
+        if duplicates:
+            result.append({
+                'canonical_id': canonical_id,
+                'duplicate_ids': duplicates,
+                'reasons': sorted({reason for donor_id in duplicates for reason in reasons[donor_id]}),
+            })
+    logger.info("duplicate scan", extra={'donors': len(keys), 'comparisons': len(compared), 'groups': len(result)})
+    return result
+
+
+def save_scan(supabase, groups):
+    """Store the groups of a scan as the latest result; scans older than SCAN_TTL are dropped."""
+    now = datetime.now(timezone.utc)
+    supabase.table(SCANS_TABLE).insert({'groups': groups, 'created_at': now.isoformat()}).execute()
+    supabase.table(SCANS_TABLE).delete().lt('created_at', (now - timedelta(seconds=SCAN_TTL)).isoformat()).execute()
+
+
+def latest_scan(supabase):
+    """The most recent stored scan ({'groups', 'created_at'}), or None if there is none younger than SCAN_TTL."""
+    rows = supabase.table(SCANS_TABLE) \
+        .select("groups,created_at") \
+        .order('id', desc=True) \
+        .limit(1) \
+        .execute().data
+    if not rows:
+        return None
+    created_at = datetime.fromisoformat(rows[0]['created_at'])
+    if datetime.now(timezone.utc) - created_at > timedelta(seconds=SCAN_TTL):
+        return None
+    return rows[0]
+
+
+def scan(supabase):
+    """Find the duplicate groups among all donors and store them as the latest scan."""
+    groups = find_duplicates(load_donors(supabase))
+    save_scan(supabase, groups)
+    return groups
+
+
+def unverified_groups(supabase, groups):
+    """
+    Canonical ids of the submitted groups that find_duplicates() would not
+    have formed: every donor must exist and be linked to the canonical one
+    through pairs match_reason() accepts, and no group may be larger than
+    a block.
+    """
+    ids = list({donor_id for group in groups for donor_id in [group['canonical_id'], *group['duplicate_ids']]})
+    keys = {}
+    for start in range(0, len(ids), BATCH_SIZE):
+        for donor in select_in(supabase, "donors", "id,name,email,phone", 'id', ids[start:start + BATCH_SIZE]):
+            keys[donor['id']] = DonorKey(donor)
+
+    rejected = []
+    for group in groups:
+        canonical_id = group['canonical_id']
+        members = [canonical_id, *dict.fromkeys(i for i in group['duplicate_ids'] if i != canonical_id)]
+        if len(members) > MAX_BLOCK_SIZE or any(member not in keys for member in members):
+            rejected.append(canonical_id)
+            continue
+        linked = UnionFind()
+        for i, a in enumerate(members):
+            linked.find(a)
+            for b in members[i + 1:]:
+                if match_reason(keys[a], keys[b]):
+                    linked.union(a, b)
+        if len({linked.find(member) for member in members}) > 1:
+            rejected.append(canonical_id)
+    return rejected
+
+
+# Merge
+
+def merge_group(supabase, canonical_id, duplicate_ids):
+    """
+    Merge the duplicates into the canonical donor with one merge_donors()
+    call, i.e. one transaction: their donations (hot and archived) and
+    campaign enrolments are re-pointed, enrolments in a campaign the
+    canonical donor already has are dropped, their leaderboard totals are
+    added to the canonical donor's and the duplicates are deleted.
+    """
+    duplicate_ids = [donor_id for donor_id in duplicate_ids if donor_id != canonical_id]
+    if not duplicate_ids:
+        return {'donations': 0, 'campaign_donors': 0, 'campaign_donors_dropped': 0}
+
+    moved = supabase.rpc("merge_donors", {'p_canonical': canonical_id, 'p_duplicates': duplicate_ids}).execute().data
+
+    for donor_id in [canonical_id, *duplicate_ids]:
+        invalidate_entity("donors", donor_id)
+    donors_merged.inc(len(duplicate_ids))
+    return moved
+
+
+def merge_groups(supabase, groups):
+    """Merge every group; returns totals over all groups. Running workers then reload the leaderboards."""
+    totals = {'groups': 0, 'donors_removed': 0, 'donations': 0, 'campaign_donors': 0, 'campaign_donors_dropped': 0}
+    for group in groups:
+        moved = merge_group(supabase, group['canonical_id'], group['duplicate_ids'])
+        totals['groups'] += 1
+        totals['donors_removed'] += len(group['duplicate_ids'])
+        for key, value in moved.items():
+            totals[key] += value
+    if totals['groups']:
+        broker.publish("leaderboard", "leaderboard.reload", {})
+    return totals
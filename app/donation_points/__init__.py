@@ -1,9 +1,16 @@
 from flask import Blueprint, jsonify, request
 from datetime import datetime
+import logging
 from app.db import supabase
+from app.bulk_import import BATCH_SIZE, import_csv, open_text
+from app.cache import get_entity, invalidate_entity
+from app.resilience import stale_read, stale_response, mark_stale
+from app.schemas import parse_body, dump, DonationPointCreate, DonationPointUpdate
+from app.inventory import read_inventory
 
 
 donation_points_bp = Blueprint("donation_points", __name__)
+logger = logging.getLogger(__name__)
 
 
 @donation_points_bp.route("", methods=["GET"])
@@ -21,22 +28,20 @@ def create():
     lon: float
     """
     try:
-        data = request.get_json()
-
         # Validate required fields
-        required_fields = ['name', 'address', 'lat', 'lon']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({'error': f'Missing required field: {field}'}), 400
+        data, error = parse_body(DonationPointCreate)
+        if error:
+            return error
 
         # Create donation point in Supabase
         response = supabase.table("donation_points").insert({
-            "name": data['name'],
-            "address": data['address'],
-            "lat": data['lat'],
-            "lon": data['lon'],
+            "name": data.name,
+            "address": data.address,
+            "lat": data.lat,
+            "lon": data.lon,
             "created_at": datetime.utcnow().isoformat()
         }).execute()
+        mark_stale("donation_points:")
 
         return jsonify(response.data[0]), 201
 
@@ -54,26 +59,13 @@ def update(point_id):
     lon: float (optional)
     """
     try:
-        # Get the JSON data from the request
-        data = request.get_json()
-
-        if not data:
-            return jsonify({'error': 'No data provided'}), 400
+        # Validate the JSON data from the request (lat/lon must be floats)
+        data, error = parse_body(DonationPointUpdate)
+        if error:
+            return error
 
         # Create a dictionary with only the provided fields
-        update_data = {}
-        updatable_fields = ['name', 'address', 'lat', 'lon']
-
-        for field in updatable_fields:
-            if field in data:
-                # Validate and convert lat/lon to float if provided
-                if field in ['lat', 'lon']:
-                    try:
-                        update_data[field] = float(data[field])
-                    except ValueError:
-                        return jsonify({'error': f'Invalid format for {field}, must be a float'}), 400
-                else:
-                    update_data[field] = data[field]
+        update_data = dump(data, exclude_unset=True)
 
         # Ensure there's something to update
         if not update_data:
@@ -90,13 +82,15 @@ def update(point_id):
         if not response.data or len(response.data) == 0:
             return jsonify({'error': f'Donation point not found'}), 404
 
+        invalidate_entity("donation_points", point_id)
+        mark_stale("donation_points:")
+
         return jsonify({'message': 'Donation point updated successfully', 'data': response.data[0]}), 200
 
     except ValueError as ve:
         return jsonify({'error': f'Invalid data format: {str(ve)}'}), 400
     except Exception as e:
-        # Add detailed logging for debugging
-        print(f"Error updating donation point: {str(e)}")
+        logger.exception("Error updating donation point", extra={'point_id': point_id})
         return jsonify({'error': 'An unexpected error occurred while updating donation point'}), 500
 
         
@@ -114,6 +108,9 @@ def delete(point_id):
         if not response.data:
             return jsonify({'error': 'Donation point not found'}), 404
 
+        invalidate_entity("donation_points", point_id)
+        mark_stale("donation_points:")
+
         return jsonify({'message': 'Donation point deleted successfully'}), 200
 
     except Exception as e:
@@ -131,20 +128,23 @@ def list():
         # Get query parameters
         name = request.args.get('name')
 
-        # Start query
-        query = supabase.table("donation_points").select("*")
+        def load():
+            # Start query
+            query = supabase.table("donation_points").select("*")
 
-        # Apply filters if provided
-        if name:
-            query = query.ilike('name', f'%{name}%')
+            # Apply filters if provided
+            if name:
+                query = query.ilike('name', f'%{name}%')
 
-        # Execute query
-        response = query.order('created_at', desc=True).execute()
+            # Execute query
+            return query.order('created_at', desc=True).execute().data
 
-        return jsonify({
-            'points': response.data,
-            'total': len(response.data)
-        }), 200
+        points, age = stale_read(f"donation_points:list:{name}", load)
+
+        return stale_response({
+            'points': points,
+            'total': len(points)
+        }, age)
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -156,19 +156,53 @@ def get_by_id(point_id):
     Obtiene un Donation Point por su ID
     """
     try:
-        response = supabase.table("donation_points") \
-            .select("*") \
-            .eq('id', point_id) \
-            .single() \
-            .execute()
+        point, age = stale_read(
+            f"donation_points:{point_id}",
+            lambda: get_entity("donation_points", point_id)
+        )
 
-        if not response.data:
+        if not point:
             return jsonify({'error': 'Donation point not found'}), 404
 
-        return jsonify(response.data), 200
+        return stale_response(point, age)
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
-0
\ No newline at end of file
+@donation_points_bp.route("/<int:point_id>/inventory", methods=["GET"])
+def get_inventory(point_id):
+    """
+    Inventario actual de un Donation Point por categoría de alimento
+    (alimentos de donaciones pendientes). Lee el ledger mantenido por
+    migrations/004, una fila por categoría.
+    """
+    try:
+        if not get_entity("donation_points", point_id):
+            return jsonify({'error': 'Donation point not found'}), 404
+
+        return jsonify(read_inventory(supabase, point_id)), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@donation_points_bp.route("/import", methods=["POST"])
+def bulk_import():
+    """
+    Importa Donation Points desde un CSV.
+    El CSV (con encabezado name,address,lat,lon) se envía como archivo
+    multipart `file` o como cuerpo text/csv, y se procesa en streaming.
+    batch_size: int (opcional, filas por upsert)
+
+    Response: filas importadas, ya existentes y con error (con número de línea).
+    """
+    try:
+        upload = request.files.get('file')
+        stream = upload.stream if upload else request.stream
+        batch_size = request.args.get('batch_size', BATCH_SIZE, type=int)
+
+        return jsonify(import_csv(supabase, "donation_points", open_text(stream), batch_size)), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
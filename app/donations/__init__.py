@@ -1,39 +1,58 @@
-from flask import Blueprint, jsonify, request
-from datetime import datetime, timezone
-from app.db import supabase
+from flask import Blueprint, Response, jsonify, request
+from datetime import datetime, timedelta, timezone
+from app.db import select_in, supabase
+from app.cache import get_entity
+from app.pubsub import publish_donation
+from app.leaderboard import leaderboards
+from app.resilience import mark_stale
+from app.expiry import EXPIRED_STATE
+from app import archive
+from app.qr_tokens import SigningKeyMissing, sign_qr_token, verify_qr_token, redeemed
+from app.schemas import parse_body, dump, DonationCreate, DonationUpdate, DonationRedeem, QrSheetRequest, ById
+from app import qr_sheet
+from app.idempotency import idempotent
+import logging
+import os
 import qrcode  
 import io  
 import base64  
 
 donations_bp = Blueprint("donations", __name__)
+logger = logging.getLogger(__name__)
+
+# /changes leaves out the most recent seconds of writes (see list_changes)
+CHANGES_LAG_SECONDS = float(os.getenv("CHANGES_LAG_SECONDS", "5"))
+# Every column but the QR image, which tablets fetch from /qrcode/<id>
+CHANGE_COLUMNS = "id,date,time,state,id_donor,id_calendar,id_point,id_campaign,type,pending,updated_at"
+
+
+def _donation_changed(event_type, donation):
+    """Fan out a donation write: event subscribers and the campaign dashboard."""
+    publish_donation(event_type, donation)
+    if donation.get('id_campaign'):
+        mark_stale(f"campaigns:dashboard:{donation['id_campaign']}:")
+
 
 @donations_bp.route("", methods=["GET"])
 def sample():
     return jsonify({"message": "Donations route"}), 200
 
 @donations_bp.route("/create", methods=["POST"])
+@idempotent
 def create():
     try:
-        # Parse JSON data
-        data = request.get_json()
+        # Parse and validate the donation and its foods
+        data, error = parse_body(DonationCreate)
+        if error:
+            return error
 
-        # Validate required fields for the donation
-        required_fields = ['id', 'date', 'time', 'state', 'id_donor', 'id_point', 'type', 'pending', 'foods']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({'error': f'Missing required field: {field}'}), 400
+        # Signed before any write, so a missing signing key creates nothing
+        qr_token = sign_qr_token(data.id, data.id_point)
 
         # Insert donation into Supabase
-        response = supabase.table("donations").insert({
-            "id": data['id'],
-            "date": data['date'],
-            "time": data['time'],
-            "state": data['state'],
-            "id_donor": data['id_donor'],
-            "id_point": data['id_point'],
-            "type": data['type'],
-            "pending": data['pending'],
-        }).execute()
+        donation_data = dump(data, exclude={'foods'}, exclude_none=True)
+        donation_data["updated_at"] = datetime.now(timezone.utc).isoformat()
+        response = supabase.table("donations").insert(donation_data).execute()
 
         # Check if the insert was successful
         if not response.data or len(response.data) == 0:
@@ -46,12 +65,12 @@ def create():
         food_data_list = [
             {
                 "id_donation": donation_id,
-                "name": food["name"],
-                "quantity": food["quantity"],
-                "category": food["category"],
-                "perishable": food["perishable"],
+                "name": food.name,
+                "quantity": food.quantity,
+                "category": food.category,
+                "perishable": food.perishable,
             }
-            for food in data['foods']
+            for food in data.foods
         ]
 
         # Insert food items into Supabase
@@ -61,14 +80,16 @@ def create():
         if not food_response.data:
             return jsonify({'error': 'Failed to insert food items'}), 500
 
-        # Generate QR Code for the donation ID
+        leaderboards.record(data.id_donor, data.id_campaign, sum(food.quantity for food in data.foods))
+
+        # Generate QR Code with a signed token for the donation ID
         qr = qrcode.QRCode(
             version=1,
             error_correction=qrcode.constants.ERROR_CORRECT_L,
             box_size=10,
             border=4,
         )
-        qr.add_data(donation_id)
+        qr.add_data(qr_token)
         qr.make(fit=True)
 
         # Save QR Code as binary data
@@ -81,15 +102,20 @@ def create():
 
         # Update donation with QR code
         qr_response = supabase.table("donations").update({
-            "qr": qr_image_data_base64
+            "qr": qr_image_data_base64,
+            "updated_at": datetime.now(timezone.utc).isoformat(),
         }).eq("id", donation_id).execute()
 
         # Check if the QR code was successfully updated
         if not qr_response.data:
             return jsonify({'error': 'Failed to update donation with QR code'}), 500
 
+        _donation_changed("donation.created", qr_response.data[0])
+
         return jsonify({"donation_id": donation_id, "qr_code": qr_image_data_base64}), 201
 
+    except SigningKeyMissing as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -109,33 +135,112 @@ def update():
     pending: boolean
     """
     try:
-        data = request.get_json()
-
-        if 'id' not in data:
-            return jsonify({'error': 'Missing donation ID'}), 400
+        data, error = parse_body(DonationUpdate)
+        if error:
+            return error
 
-        update_data = {}
-        updateable_fields = ['date', 'time', 'state', 'id_donor',
-                             'id_calendar', 'id_point', 'type', 'pending']
+        update_data = dump(data, exclude_unset=True, exclude={'id'})
+        update_data['updated_at'] = datetime.now(timezone.utc).isoformat()
 
-        for field in updateable_fields:
-            if field in data:
-                update_data[field] = data[field]
+        # Moving a donation to another donor or campaign moves its food on the leaderboards
+        previous = None
+        if 'id_donor' in update_data or 'id_campaign' in update_data:
+            previous = supabase.table("donations") \
+                .select("id_donor,id_campaign") \
+                .eq('id', data.id) \
+                .execute().data
 
         response = supabase.table("donations") \
             .update(update_data) \
-            .eq('id', data['id']) \
+            .eq('id', data.id) \
             .execute()
 
         if not response.data:
             return jsonify({'error': 'Donation not found'}), 404
 
-        return jsonify(response.data[0]), 200
+        donation = response.data[0]
+        if previous and (previous[0].get('id_donor'), previous[0].get('id_campaign')) != \
+                (donation.get('id_donor'), donation.get('id_campaign')):
+            food = supabase.table("food") \
+                .select("quantity") \
+                .eq('id_donation', data.id) \
+                .execute()
+            quantity = sum(item.get('quantity') or 0 for item in food.data)
+            leaderboards.record(previous[0].get('id_donor'), previous[0].get('id_campaign'), -quantity)
+            leaderboards.record(donation.get('id_donor'), donation.get('id_campaign'), quantity)
+        _donation_changed("donation.resolved" if donation.get('pending') is False else "donation.updated", donation)
+
+        return jsonify(donation), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+@donations_bp.route("/redeem", methods=["POST"])
+def redeem():
+    """
+    Redeem a scanned donation QR code at a donation point.
+    token: string (QR payload)
+    id_point: int (optional - rejects codes issued for another point)
+    state: string (optional - new state to record)
+
+    The signature, point and replay checks run in memory; accepted codes
+    cost a single conditional update (pending = true -> false).
+    """
+    try:
+        data, error = parse_body(DonationRedeem)
+        if error:
+            return error
+
+        verified = verify_qr_token(data.token)
+        if verified is None:
+            return jsonify({'error': 'Invalid QR code'}), 400
+
+        donation_id, id_point = verified
+        if data.id_point is not None and id_point is not None and str(data.id_point) != id_point:
+            return jsonify({'error': 'QR code belongs to another donation point'}), 409
+
+        if not redeemed.claim(donation_id):
+            return jsonify({'error': 'Donation already redeemed'}), 409
+
+        update_data = {
+            'pending': False,
+            'updated_at': datetime.now(timezone.utc).isoformat()
+        }
+        if data.state is not None:
+            update_data['state'] = data.state
+
+        try:
+            query = supabase.table("donations") \
+                .update(update_data) \
+                .eq('id', donation_id) \
+                .eq('pending', True)
+            # Legacy codes carry no point: the update checks it instead
+            if id_point is None and data.id_point is not None:
+                query = query.eq('id_point', data.id_point)
+            response = query.execute()
+        except Exception:
+            redeemed.release(donation_id)
+            raise
+
+        if not response.data:
+            if id_point is None:
+                # Possibly the wrong point: a retry at the right one must still work
+                redeemed.release(donation_id)
+            return jsonify({'error': 'Donation not found or already redeemed'}), 409
+
+        donation = response.data[0]
+        donation.pop('qr', None)
+        _donation_changed("donation.resolved", donation)
+
+        return jsonify({'message': 'Donation redeemed successfully', 'donation': donation}), 200
+
+    except SigningKeyMissing as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @donations_bp.route("/delete", methods=["DELETE"])
 def delete():
     """
@@ -143,22 +248,32 @@ def delete():
     id: int
     """
     try:
-        # Get data from request
-        data = request.get_json()
-
-        # Validate ID is present
-        if 'id' not in data:
-            return jsonify({'error': 'Missing donation ID'}), 400
+        # Get and validate data from request
+        data, error = parse_body(ById)
+        if error:
+            return error
+
+        # Food quantities are read first so the leaderboards can be decremented
+        food = supabase.table("food") \
+            .select("quantity") \
+            .eq('id_donation', data.id) \
+            .execute()
 
         # Delete donation from Supabase
         response = supabase.table("donations") \
             .delete() \
-            .eq('id', data['id']) \
+            .eq('id', data.id) \
             .execute()
 
         if not response.data:
             return jsonify({'error': 'Donation not found'}), 404
 
+        deleted = response.data[0]
+        leaderboards.record(deleted.get('id_donor'), deleted.get('id_campaign'),
+                            -sum(item.get('quantity') or 0 for item in food.data))
+
+        _donation_changed("donation.deleted", deleted)
+
         return jsonify({'message': 'Donation deleted successfully'}), 200
 
     except Exception as e:
@@ -171,12 +286,14 @@ def list():
     Para listar todas las Donations, se debe enviar un JSON con los siguientes campos:
     id: int (opcional - si se proporciona, filtra por ID)
     details: bool (opcional - si se proporciona, obtiene más detalles)
+    include_archived: bool (opcional - incluye las donaciones archivadas)
     """
     try:
         donation_id = request.args.get('id')
         details = request.args.get('details', 'false').lower() == 'true'
+        donations_table, food_table = archive.tables(archive.include_archived(request.args))
 
-        query = supabase.table("donations").select("*")
+        query = supabase.table(donations_table).select("*")
 
         if donation_id:
             query = query.eq('id', donation_id)
@@ -191,7 +308,7 @@ def list():
         if details:
             for donation in donations:
                 # Get all food items associated with this donation
-                food_response = supabase.table("food") \
+                food_response = supabase.table(food_table) \
                     .select("*") \
                     .eq('id_donation', donation['id']) \
                     .execute()
@@ -217,6 +334,7 @@ def list_by_donor():
     """
     Para listar todas las Donations de un Donor, se debe enviar un JSON con el siguiente campo:
     id_donor: int
+    include_archived: bool (opcional - incluye las donaciones archivadas)
     """
     try:
         donor_id = request.args.get('id_donor')
@@ -224,7 +342,8 @@ def list_by_donor():
         if not donor_id:
             return jsonify({'error': 'Missing donor ID'}), 400
 
-        response = supabase.table("donations") \
+        donations_table, _ = archive.tables(archive.include_archived(request.args))
+        response = supabase.table(donations_table) \
             .select(
             "*",
             count="exact"
@@ -262,9 +381,85 @@ def list_pending():
         return jsonify({'error': str(e)}), 500
 
 
+@donations_bp.route("/changes", methods=["GET"])
+def list_changes():
+    """
+    Incremental sync for staff tablets: returns only the donations created,
+    updated or resolved (pending -> false) after the given watermark.
+
+    Query parameters:
+    since: timestamp (optional - updated_at of the last change already seen)
+    after_id: int (optional - id of the last change already seen)
+    id_point: int (optional - only changes for this donation point)
+    limit: int (optional, default 500, max 1000)
+
+    Start without a watermark, then pass back the returned
+    `watermark` values until `has_more` is false.
+
+    updated_at is set when a write starts, not when it commits, so a slow
+    transaction can commit a timestamp older than the watermark already
+    handed out. Only changes older than CHANGES_LAG_SECONDS are returned,
+    which leaves those transactions time to commit before they are passed.
+    """
+    try:
+        since = request.args.get('since')
+        after_id = request.args.get('after_id', type=int)
+        id_point = request.args.get('id_point')
+        limit = max(1, min(request.args.get('limit', 500, type=int), 1000))
+
+        if since:
+            try:
+                since = datetime.fromisoformat(since).isoformat()
+            except ValueError:
+                return jsonify({'error': 'since must be an ISO 8601 timestamp'}), 400
+
+        settled = datetime.now(timezone.utc) - timedelta(seconds=CHANGES_LAG_SECONDS)
+        query = supabase.table("donations") \
+            .select(CHANGE_COLUMNS) \
+            .lte('updated_at', settled.isoformat())
+
+        if since:
+            if after_id is not None:
+                # Keyset on (updated_at, id) so rows sharing a timestamp are not skipped
+                query = query.or_(
+                    f'updated_at.gt."{since}",'
+                    f'and(updated_at.eq."{since}",id.gt.{after_id})'
+                )
+            else:
+                query = query.gt('updated_at', since)
+        if id_point:
+            query = query.eq('id_point', id_point)
+
+        response = query \
+            .order('updated_at') \
+            .order('id') \
+            .limit(limit + 1) \
+            .execute()
+
+        changes = response.data[:limit]
+        has_more = len(response.data) > limit
+
+        watermark = {'since': since, 'after_id': after_id}
+        if changes:
+            watermark = {'since': changes[-1]['updated_at'], 'after_id': changes[-1]['id']}
+
+        return jsonify({
+            'changes': changes,
+            'watermark': watermark,
+            'has_more': has_more
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @donations_bp.route("/by_date_range", methods=["GET"])
 def list_by_date_range():
-    """Lista de donaciones por rango de fechas"""
+    """
+    Lista de donaciones por rango de fechas
+    start_date, end_date: date
+    include_archived: bool (opcional - incluye las donaciones archivadas)
+    """
     try:
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
@@ -272,7 +467,8 @@ def list_by_date_range():
         if not start_date or not end_date:
             return jsonify({'error': 'Missing date range parameters'}), 400
 
-        response = supabase.table("donations") \
+        donations_table, _ = archive.tables(archive.include_archived(request.args))
+        response = supabase.table(donations_table) \
             .select("*") \
             .gte('date', start_date) \
             .lte('date', end_date) \
@@ -290,9 +486,11 @@ def list_by_date_range():
 def get_donation_details(donation_id, pending_status):
     """
     Get donation details and associated food items by donation ID and optional pending status
+    (?include_archived=true also looks in the archive)
     """
     try:
-        query = supabase.table("donations").select("*").eq('id', donation_id)
+        donations_table, food_table = archive.tables(archive.include_archived(request.args))
+        query = supabase.table(donations_table).select("*").eq('id', donation_id)
 
         # Apply pending status filter if provided
         if pending_status is not None:
@@ -307,20 +505,20 @@ def get_donation_details(donation_id, pending_status):
         donation = donation_response.data
 
         # Get all food items associated with this donation
-        food_response = supabase.table("food") \
+        food_response = supabase.table(food_table) \
             .select("*") \
             .eq('id_donation', donation_id) \
             .execute()
         
-        donor_response = supabase.table("donors") \
-            .select("name, phone, email") \
-            .eq('id', donation['id_donor']) \
-            .execute()
-        
+        donor = get_entity("donors", donation['id_donor'])
+        donor_data = []
+        if donor:
+            donor_data = [{field: donor.get(field) for field in ('name', 'phone', 'email')}]
+
         response_data = {
             'donation': donation,
             'food_items': food_response.data,
-            'donor': donor_response.data,
+            'donor': donor_data,
             'total_food_items': len(food_response.data)
         }
 
@@ -329,6 +527,76 @@ def get_donation_details(donation_id, pending_status):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@donations_bp.route("/qrcode/sheet", methods=["POST"])
+def get_qr_sheet():
+    """
+    Hoja imprimible de etiquetas QR para varias donaciones.
+
+    Request JSON:
+    {
+        "ids": [int] (opcional - donaciones a imprimir),
+        "id_point": int (opcional - filtro por Donation Point si no hay ids),
+        "pending": boolean (opcional, default true),
+        "format": "pdf" | "png" (opcional, default pdf; png con varias páginas devuelve un zip),
+        "columns": int, "rows": int (opcional, etiquetas por página, default 3 x 4)
+    }
+
+    Los QR se generan en un pool de procesos y se van componiendo en las
+    páginas a medida que terminan.
+    """
+    try:
+        data, error = parse_body(QrSheetRequest)
+        if error:
+            return error
+
+        if data.format not in ('pdf', 'png'):
+            return jsonify({'error': "format must be 'pdf' or 'png'"}), 400
+        if not (1 <= data.columns <= 6 and 1 <= data.rows <= 10):
+            return jsonify({'error': 'columns must be 1-6 and rows 1-10'}), 400
+        if not data.ids and data.id_point is None:
+            return jsonify({'error': 'Provide ids or id_point'}), 400
+        if data.ids and len(data.ids) > qr_sheet.MAX_LABELS:
+            return jsonify({'error': f"At most {qr_sheet.MAX_LABELS} labels per sheet"}), 400
+
+        if data.ids:
+            # Up to MAX_LABELS ids do not fit in one URL, so they are read in chunks
+            donations = select_in(supabase, "donations", "id,id_point,date,type,pending", 'id', data.ids)
+            donations = sorted(
+                (donation for donation in donations
+                 if donation['pending'] == data.pending
+                 and (data.id_point is None or donation['id_point'] == data.id_point)),
+                key=lambda donation: donation['id'],
+            )
+        else:
+            donations = supabase.table("donations") \
+                .select("id,id_point,date,type") \
+                .eq('pending', data.pending) \
+                .eq('id_point', data.id_point) \
+                .order('id') \
+                .limit(qr_sheet.MAX_LABELS) \
+                .execute().data
+
+        if not donations:
+            return jsonify({'error': 'No donations found'}), 404
+
+        labels = [
+            (sign_qr_token(donation['id'], donation['id_point']), f"#{donation['id']}  {donation.get('date') or ''}")
+            for donation in donations
+        ]
+        handle, mimetype = qr_sheet.build_sheet(labels, data.format, data.columns, data.rows)
+        extension = {'application/pdf': 'pdf', 'image/png': 'png', 'application/zip': 'zip'}[mimetype]
+
+        return Response(qr_sheet.stream_file(handle), mimetype=mimetype, headers={
+            'Content-Disposition': f'attachment; filename="qr-labels.{extension}"',
+            'X-Label-Count': str(len(labels)),
+        })
+
+    except SigningKeyMissing as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @donations_bp.route("/qrcode/<int:donation_id>", methods=["GET"])
 def get_qr_code(donation_id):  # Add donation_id parameter here
     """
@@ -337,19 +605,24 @@ def get_qr_code(donation_id):  # Add donation_id parameter here
 
     try:
         # No need to get from request.view_args since it's now a parameter
-        print("hello")
         donation_response = supabase.table("donations") \
-            .select("*") \
+            .select("id,pending,state,qr") \
             .eq('id', donation_id) \
-            .eq('pending', True) \
-            .single() \
+            .limit(1) \
             .execute()
-        print(donation_response)
+        logger.debug("qr code lookup", extra={'donation_id': donation_id, 'found': bool(donation_response.data)})
 
         if not donation_response.data:
-            return jsonify({'error': 'Donation not found or is expired'}), 404
+            return jsonify({'error': 'Donation not found'}), 404
+
+        donation = donation_response.data[0]
+        if not donation.get('pending'):
+            # Expired by the sweeper (app/expiry.py) or already redeemed
+            if donation.get('state') == EXPIRED_STATE:
+                return jsonify({'error': 'Donation is expired'}), 410
+            return jsonify({'error': 'Donation already redeemed'}), 409
 
-        qr_code = donation_response.data.get("qr")
+        qr_code = donation.get("qr")
         if not qr_code:
             return jsonify({'error': 'QR code not available for this donation'}), 404
 
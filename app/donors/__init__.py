@@ -2,13 +2,23 @@ from flask import Blueprint, jsonify, request
 from datetime import datetime
 import bcrypt
 import re
-from app.db import supabase
+from app.db import select_in, supabase
+from app.bulk_import import BATCH_SIZE, import_csv, open_text
+from app.cache import invalidate_entity
+from app.leaderboard import GLOBAL, LEADERBOARD_SIZE, leaderboards
+from app.schemas import parse_body, dump, DonorCreate, DonorLogin, DonorUpdate, DonorOut, DonorMerge, ById
+from app.dedup import latest_scan, merge_groups, save_scan, unverified_groups
+from app import archive
+from app.idempotency import idempotent
 import hashlib
 
 
 
 donors_bp = Blueprint("donors", __name__)
 
+# Columns /list may be ordered by
+ORDERABLE_FIELDS = ['id', 'name', 'email', 'created_at']
+
 
 @donors_bp.route("", methods=["GET"])
 def sample():
@@ -16,6 +26,7 @@ def sample():
 
 
 @donors_bp.route("/create", methods=["POST"])
+@idempotent
 def create():
     """
     Para crear un Donor, se debe enviar un JSON con los siguientes campos:
@@ -25,32 +36,23 @@ def create():
     password: string
     """
     try:
-        data = request.get_json()
-
-        # Validate required fields
-        required_fields = ['name', 'email', 'phone', 'password']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({'error': f'Missing required field: {field}'}), 400
+        data, error = parse_body(DonorCreate)
+        if error:
+            return error
 
         # Hash the password with SHA-256
-        hashed_password = hashlib.sha256(data['password'].encode()).hexdigest()
+        hashed_password = hashlib.sha256(data.password.encode()).hexdigest()
 
         # Create donor in Supabase
         response = supabase.table("donors").insert({
-            "name": data['name'],
-            "email": data['email'],
-            "phone": data['phone'],
+            "name": data.name,
+            "email": data.email,
+            "phone": data.phone,
             "password": hashed_password,
             "created_at": datetime.utcnow().isoformat()
         }).execute()
 
-        # Remove password from response
-        donor_data = response.data[0]
-        if 'password' in donor_data:
-            del donor_data['password']
-
-        return jsonify(donor_data), 201
+        return jsonify(dump(DonorOut.model_validate(response.data[0]))), 201
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -64,18 +66,14 @@ def login():
     password: string
     """
     try:
-        data = request.get_json()
-
-        # Validate required fields
-        required_fields = ['email', 'password']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({'error': f'Missing required field: {field}'}), 400
+        data, error = parse_body(DonorLogin)
+        if error:
+            return error
 
         # Get donor by email
         response = supabase.table("donors") \
             .select("*") \
-            .eq("email", data['email']) \
+            .eq("email", data.email) \
             .single() \
             .execute()
 
@@ -85,18 +83,14 @@ def login():
         donor = response.data
 
         # Hash the input password and compare
-        hashed_input_password = hashlib.sha256(data['password'].encode()).hexdigest()
+        hashed_input_password = hashlib.sha256(data.password.encode()).hexdigest()
 
         if hashed_input_password != donor['password']:
             return jsonify({'error': 'Invalid email or password'}), 401
 
-        # Remove password from donor object
-        if 'password' in donor:
-            del donor['password']
-
         return jsonify({
             'message': 'Login successful',
-            'donor': donor
+            'donor': dump(DonorOut.model_validate(donor))
         }), 200
 
     except Exception as e:
@@ -111,28 +105,25 @@ def update():
     phone: string
     """
     try:
-        data = request.get_json()
-
-        if 'id' not in data:
-            return jsonify({'error': 'Missing donor ID'}), 400
+        data, error = parse_body(DonorUpdate)
+        if error:
+            return error
 
         # Create update dict with only provided fields
-        update_data = {}
-        for field in ['name', 'email', 'phone']:
-            if field in data:
-                update_data[field] = data[field]
-
+        update_data = dump(data, exclude_unset=True, exclude={'id'})
         update_data['updated_at'] = datetime.utcnow().isoformat()
 
         response = supabase.table("donors") \
             .update(update_data) \
-            .eq('id', data['id']) \
+            .eq('id', data.id) \
             .execute()
 
         if not response.data:
             return jsonify({'error': 'Donor not found'}), 404
 
-        return jsonify(response.data[0]), 200
+        invalidate_entity("donors", data.id)
+
+        return jsonify(dump(DonorOut.model_validate(response.data[0]))), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -145,19 +136,20 @@ def delete():
     id: int
     """
     try:
-        data = request.get_json()
-
-        if 'id' not in data:
-            return jsonify({'error': 'Missing donor ID'}), 400
+        data, error = parse_body(ById)
+        if error:
+            return error
 
         response = supabase.table("donors") \
             .delete() \
-            .eq('id', data['id']) \
+            .eq('id', data.id) \
             .execute()
 
         if not response.data:
             return jsonify({'error': 'Donor not found'}), 404
 
+        invalidate_entity("donors", data.id)
+
         return jsonify({'message': 'Donor deleted successfully'}), 200
 
     except Exception as e:
@@ -182,6 +174,9 @@ def list():
         order_by = request.args.get('order', 'created_at')
         order_direction = request.args.get('order_direction', 'desc')
 
+        if order_by not in ORDERABLE_FIELDS:
+            return jsonify({'error': f'Invalid order field: {order_by}'}), 400
+
         # Start query selecting specific fields (excluding password)
         query = supabase.table("donors").select(
             "id",
@@ -217,6 +212,35 @@ def list():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@donors_bp.route("/search", methods=["GET"])
+def search():
+    """
+    Búsqueda incremental (typeahead) de donors por nombre o email.
+    Parámetros en URL:
+    q: string (al menos 2 caracteres)
+    limit: int (opcional, default 10, max 50)
+
+    Ranked by the search_donors() function (migrations/002): prefix
+    matches first, then trigram similarity, both served by GIN indexes.
+    """
+    try:
+        q = request.args.get('q', '').strip()
+        limit = max(1, min(request.args.get('limit', 10, type=int), 50))
+
+        if len(q) < 2:
+            return jsonify({'donors': [], 'total': 0}), 200
+
+        response = supabase.rpc("search_donors", {'q': q, 'k': limit}).execute()
+
+        return jsonify({
+            'donors': response.data,
+            'total': len(response.data)
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @donors_bp.route("/list_campaigns", methods=["GET"])
 def list_campaigns():
     # Get current date in ISO format
@@ -249,10 +273,13 @@ def past_campaigns():
 def get_donor_counts(donor_id):
     """
     Get count of donations, campaigns, and total food quantity (in KG) for a donor
+    (lifetime totals, archived donations included)
     """
     try:
+        donations_table, food_table = archive.tables(include_archived=True)
+
         # Get donations count
-        donations_count = supabase.table("donations") \
+        donations_count = supabase.table(donations_table) \
             .select("*", count="exact") \
             .eq('id_donor', donor_id) \
             .execute()
@@ -264,22 +291,15 @@ def get_donor_counts(donor_id):
             .execute()
 
         # Get all food entries for donor's donations and sum their quantities
-        donations = supabase.table("donations") \
-            .select("id") \
-            .eq('id_donor', donor_id) \
-            .execute()
+        # (paged: a donor's whole history can exceed PostgREST's max-rows)
+        donation_ids = [d['id'] for d in select_in(supabase, donations_table, "id", 'id_donor', [donor_id])]
 
         total_kg = 0
-        if donations.data:
-            donation_ids = [d['id'] for d in donations.data]
-
-            food_quantities = supabase.table("food") \
-                .select("quantity") \
-                .in_("id_donation", donation_ids) \
-                .execute()
+        if donation_ids:
+            food_quantities = select_in(supabase, food_table, "quantity", 'id_donation', donation_ids)
 
             # Sum quantities and convert to KG (divide by 100)
-            total_kg = sum([item['quantity'] for item in food_quantities.data]) / 100
+            total_kg = sum([item['quantity'] for item in food_quantities]) / 100
 
         return jsonify({
             'donor_id': donor_id,
@@ -289,4 +309,108 @@ def get_donor_counts(donor_id):
         }), 200
 
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+
+@donors_bp.route("/leaderboard", methods=["GET"])
+def leaderboard():
+    """
+    Top de donantes por kg donados (todas las campañas).
+    limit: int (opcional, default y máximo LEADERBOARD_SIZE)
+    """
+    try:
+        limit = max(1, min(request.args.get('limit', LEADERBOARD_SIZE, type=int), LEADERBOARD_SIZE))
+
+        return jsonify({'leaderboard': leaderboards.top(GLOBAL, limit)}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@donors_bp.route("/duplicates", methods=["GET"])
+def list_duplicates():
+    """
+    Grupos de donors probablemente duplicados (mismo teléfono, email o
+    nombre y email casi idénticos). El donor con menor ID es el canónico.
+    Los grupos los calcula el job `flask donors-dedup`; aquí se sirve el
+    último resultado guardado mientras tenga menos de DEDUP_SCAN_TTL segundos.
+    limit: int (opcional, default 100)
+    """
+    try:
+        limit = max(1, request.args.get('limit', 100, type=int))
+        result = latest_scan(supabase)
+        if result is None:
+            return jsonify({'error': 'No recent duplicate scan; run `flask donors-dedup`'}), 404
+
+        groups = result['groups']
+        return jsonify({'groups': groups[:limit], 'total': len(groups), 'scanned_at': result['created_at']}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@donors_bp.route("/merge", methods=["POST"])
+def merge():
+    """
+    Fusiona donors duplicados: sus donations, campaign_donors y totales
+    del leaderboard pasan al donor canónico y los duplicados se eliminan,
+    en una sola transacción por grupo.
+
+    Request JSON:
+    {
+        "groups": [{"canonical_id": int, "duplicate_ids": [int]}],
+        "all": boolean (opcional - fusiona todos los grupos del último /duplicates)
+    }
+
+    Los grupos enviados se verifican antes de fusionar: cada duplicado debe
+    coincidir con el canónico o con otro donor del grupo según los mismos
+    criterios de la detección; si no, responde 400 sin fusionar nada.
+    """
+    try:
+        data, error = parse_body(DonorMerge)
+        if error:
+            return error
+
+        if data.all:
+            result = latest_scan(supabase)
+            if result is None:
+                return jsonify({'error': 'No recent duplicate scan; run `flask donors-dedup`'}), 404
+            groups = result['groups']
+        else:
+            groups = [dump(group) for group in data.groups]
+            rejected = unverified_groups(supabase, groups)
+            if rejected:
+                return jsonify({'error': 'Some groups are not duplicates of each other',
+                                'canonical_ids': rejected}), 400
+
+        if not groups:
+            return jsonify({'error': 'No duplicate groups to merge'}), 400
+
+        merged = merge_groups(supabase, groups)
+        if data.all:
+            save_scan(supabase, [])
+        return jsonify(merged), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@donors_bp.route("/import", methods=["POST"])
+def bulk_import():
+    """
+    Importa donors desde un CSV.
+    El CSV (con encabezado name,email,phone[,password]) se envía como archivo
+    multipart `file` o como cuerpo text/csv, y se procesa en streaming.
+    batch_size: int (opcional, filas por upsert)
+
+    Response: filas importadas, ya existentes y con error (con número de línea).
+    """
+    try:
+        upload = request.files.get('file')
+        stream = upload.stream if upload else request.stream
+        batch_size = request.args.get('batch_size', BATCH_SIZE, type=int)
+
+        return jsonify(import_csv(supabase, "donors", open_text(stream), batch_size)), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
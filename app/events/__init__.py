@@ -0,0 +1,91 @@
+from flask import Blueprint, jsonify, request, Response
+import json
+import logging
+import os
+from app.pubsub import broker, TooManySubscribers
+
+
+events_bp = Blueprint("events", __name__)
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT", "15"))
+TOPICS = ("donations", "campaigns")
+# Serve /events even when the checks below fail
+ALLOW_ANY_WORKER = os.getenv("EVENTS_ALLOW_ANY_WORKER", "false").lower() == "true"
+
+# (worker class, number of workers) when running under gunicorn, set by
+# gunicorn.conf.py's post_fork; None under the development server
+_served_by = None
+
+
+def configure_workers(worker_class, workers):
+    """Record how gunicorn runs this process and log why /events would not work, if it would not."""
+    global _served_by
+    _served_by = (worker_class, workers)
+    problem = serving_problem()
+    if problem:
+        logger.warning("/events disabled: %s", problem)
+
+
+def serving_problem():
+    """Why event streams cannot be served by this deployment, or None."""
+    if _served_by is None:
+        return None
+    worker_class, workers = _served_by
+    if "gevent" not in worker_class and "eventlet" not in worker_class:
+        return (f"each stream would hold one of the threads of a '{worker_class}' worker; "
+                f"run gunicorn with GUNICORN_WORKER_CLASS=gevent")
+    if workers > 1 and broker.redis is None:
+        return (f"events published in one of the {workers} workers would not reach subscribers "
+                f"on the others; set CACHE_REDIS_URL")
+    return None
+
+
+@events_bp.route("", methods=["GET"])
+def stream():
+    """
+    Server-Sent Events stream of donation and campaign changes.
+    Parámetros opcionales en URL:
+    topics: string (comma separated, default: 'donations,campaigns')
+    id_point: int (only donation events for this donation point)
+
+    Each connection is a long-lived generator, so under gunicorn the stream
+    is only served by gevent workers, and with more than one worker only
+    with the Redis relay (CACHE_REDIS_URL); otherwise it answers 503.
+    """
+    problem = None if ALLOW_ANY_WORKER else serving_problem()
+    if problem:
+        return jsonify({'error': f'Event streams are not available: {problem}'}), 503
+
+    topics = [t for t in request.args.get('topics', ",".join(TOPICS)).split(",") if t]
+    id_point = request.args.get('id_point')
+
+    unknown = [t for t in topics if t not in TOPICS]
+    if unknown:
+        return jsonify({'error': f'Unknown topic: {unknown[0]}'}), 400
+
+    try:
+        subscription = broker.subscribe(topics, id_point)
+    except TooManySubscribers:
+        response = jsonify({'error': 'Too many event subscribers, retry later'})
+        response.headers['Retry-After'] = '30'
+        return response, 503
+
+    def generate():
+        try:
+            yield f"retry: {int(HEARTBEAT_SECONDS * 1000)}\n\n"
+            while True:
+                events = subscription.drain(HEARTBEAT_SECONDS)
+                if not events:
+                    # Comment line keeps proxies from closing idle connections
+                    yield ": keepalive\n\n"
+                    continue
+                for event_id, event_type, payload in events:
+                    yield f"id: {event_id}\nevent: {event_type}\ndata: {json.dumps(payload, default=str)}\n\n"
+        finally:
+            broker.unsubscribe(subscription)
+
+    return Response(generate(), mimetype="text/event-stream", headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
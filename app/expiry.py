@@ -0,0 +1,198 @@
+# app/expiry.py
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+
+from app import metrics
+from app.pubsub import publish_donation
+from app.resilience import mark_stale
+
+EXPIRED_STATE = "expired"
+DEFAULT_TYPE = "*"
+# Days after its scheduled date a pending donation expires, per donation type
+# ("drop:3,pickup:14,*:7"); "*" covers every type not listed and untyped donations
+EXPIRY_DAYS = os.getenv("DONATION_EXPIRY_DAYS", "*:7")
+# Seconds between sweeps; 0 disables the scheduler. With the shared Redis
+# tier every process schedules sweeps but only one per interval runs
+SWEEP_SECONDS = float(os.getenv("EXPIRY_SWEEP_SECONDS", "900"))
+# Without Redis the processes cannot agree on who sweeps, so the scheduler
+# only runs where this is set (single-process deployments); otherwise run
+# `flask donations-expire` from cron
+SWEEP_WITHOUT_LOCK = os.getenv("EXPIRY_SWEEP_WITHOUT_LOCK", "false").lower() == "true"
+BATCH_SIZE = int(os.getenv("EXPIRY_BATCH_SIZE", "200"))
+# Upper bound on batches per type per sweep, so one sweep never runs unbounded
+MAX_BATCHES = int(os.getenv("EXPIRY_MAX_BATCHES", "50"))
+
+donations_expired = metrics.counter("donations_expired_total", "Pending donations expired by the sweeper, by type")
+expiry_sweeps = metrics.counter("expiry_sweeps_total", "Expiry sweeps by result")
+expiry_last_sweep = metrics.gauge("expiry_last_sweep_timestamp_seconds", "Unix time the last expiry sweep finished")
+logger = logging.getLogger(__name__)
+
+
+def parse_policy(spec):
+    """'drop:3,*:7' -> {'drop': 3, '*': 7}; entries with a negative or non-numeric value are ignored."""
+    policy = {}
+    for entry in spec.split(","):
+        donation_type, _, days = entry.strip().rpartition(":")
+        try:
+            days = int(days)
+        except ValueError:
+            continue
+        if donation_type and days >= 0:
+            policy[donation_type.strip()] = days
+    return policy
+
+
+def _select_overdue(supabase, donation_type, listed, cutoff, batch_size):
+    query = supabase.table("donations") \
+        .select("id,id_donor,id_point,id_campaign,type,date") \
+        .eq('pending', True) \
+        .lt('date', cutoff)
+    if donation_type != DEFAULT_TYPE:
+        query = query.eq('type', donation_type)
+    elif listed:
+        types = ",".join(f'"{value}"' for value in listed)
+        query = query.or_(f"type.is.null,type.not.in.({types})")
+    return query.order('id').limit(batch_size).execute().data
+
+
+def _expire(supabase, ids, now):
+    """One in_() update per chunk; the pending guard skips donations redeemed meanwhile."""
+    response = supabase.table("donations") \
+        .update({'pending': False, 'state': EXPIRED_STATE, 'updated_at': now}) \
+        .in_('id', ids) \
+        .eq('pending', True) \
+        .execute()
+    return response.data
+
+
+def sweep(supabase, policy=None, batch_size=BATCH_SIZE, max_batches=MAX_BATCHES, today=None, dry_run=False):
+    """
+    Expire pending donations whose scheduled date is more than the
+    configured number of days ago, per type, in batches of `batch_size`.
+    Expired donations keep their history: pending becomes false and state
+    'expired'. Returns {'expired': {type: count}, 'batches': n}.
+    """
+    policy = parse_policy(EXPIRY_DAYS) if policy is None else policy
+    today = today or date.today()
+    listed = sorted(donation_type for donation_type in policy if donation_type != DEFAULT_TYPE)
+    result = {'expired': {}, 'batches': 0}
+
+    for donation_type, days in policy.items():
+        cutoff = (today - timedelta(days=days)).isoformat()
+        expired = 0
+        # Rows are only re-read after the previous batch left the pending
+        # set, so a dry run reads a single batch
+        for _ in range(1 if dry_run else max_batches):
+            rows = _select_overdue(supabase, donation_type, listed, cutoff, batch_size)
+            if not rows:
+                break
+            result['batches'] += 1
+            if dry_run:
+                expired += len(rows)
+                break
+
+            now = datetime.now(timezone.utc).isoformat()
+            updated = _expire(supabase, [row['id'] for row in rows], now)
+            expired += len(updated)
+            donations_expired.inc(len(updated), type=donation_type)
+
+            for donation in updated:
+                publish_donation("donation.expired", donation)
+            for campaign_id in {donation.get('id_campaign') for donation in updated} - {None}:
+                mark_stale(f"campaigns:dashboard:{campaign_id}:")
+
+            if len(rows) < batch_size:
+                break
+        if expired:
+            result['expired'][donation_type] = expired
+
+    logger.info("expiry sweep", extra={'expired': result['expired'], 'batches': result['batches'], 'dry_run': dry_run})
+    return result
+
+
+class SweepLock:
+    """
+    One sweep per interval across every worker: the first process to set
+    the key on the shared cache tier's Redis sweeps, and the key expires
+    with the interval rather than being released, so the others skip it.
+    """
+
+    def __init__(self, client, key="pd:lock:expiry-sweep"):
+        self.client = client
+        self.key = key
+
+    def acquire(self, ttl):
+        try:
+            return bool(self.client.set(self.key, os.getpid(), nx=True, ex=max(1, int(ttl))))
+        except Exception:
+            # Redis unavailable: skip rather than let every worker sweep
+            logger.warning("expiry sweep lock unavailable, skipping this sweep")
+            return False
+
+
+def _build_lock():
+    from app.cache import entity_cache
+    return SweepLock(entity_cache.shared.client) if entity_cache.shared is not None else None
+
+
+class Sweeper:
+    """
+    Runs `sweep` every SWEEP_SECONDS in a daemon thread per server process;
+    with a lock only the process holding it sweeps. Without a lock the
+    thread is only started when `without_lock` allows it.
+    """
+
+    def __init__(self, interval=SWEEP_SECONDS, lock=None, without_lock=SWEEP_WITHOUT_LOCK):
+        self.interval = interval
+        self.lock = lock
+        self.without_lock = without_lock
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def ensure_started(self):
+        if self.interval <= 0 or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            if self.lock is None and not self.without_lock:
+                logger.info("expiry sweeper not started: no shared lock (set EXPIRY_SWEEP_WITHOUT_LOCK "
+                            "for a single process, or schedule `flask donations-expire`)")
+                return
+            threading.Thread(target=self._loop, name="expiry-sweeper", daemon=True).start()
+
+    def run_once(self):
+        from app.db import supabase
+        if self.lock is not None and not self.lock.acquire(self.interval):
+            expiry_sweeps.inc(result="skipped")
+            return
+        try:
+            sweep(supabase)
+            expiry_sweeps.inc(result="ok")
+        except Exception:
+            expiry_sweeps.inc(result="error")
+            logger.exception("expiry sweep failed")
+        expiry_last_sweep.set(time.time())
+
+    def _loop(self):
+        pid = os.getpid()
+        while self._pid == pid:
+            time.sleep(self.interval)
+            self.run_once()
+
+
+sweeper = Sweeper(lock=_build_lock())
+
+
+def init_app(app):
+    """Start the sweeper with the first request served by each process (not in tests or CLI commands)."""
+    if app.testing:
+        return
+
+    @app.before_request
+    def start_expiry_sweeper():
+        sweeper.ensure_started()
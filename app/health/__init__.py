@@ -0,0 +1,46 @@
+from flask import Blueprint, jsonify
+import time
+from app.db import replica_breaker, supabase
+from app.resilience import data_breaker
+
+
+health_bp = Blueprint("health", __name__)
+
+# Warmup phase (see app/warmup.py): None when it was never requested
+# (run.py, tests), False while it runs, True once it has finished
+state = {'ready': None, 'warmup_seconds': None}
+
+
+@health_bp.route("/live", methods=["GET"])
+def live():
+    """Liveness: the process is up and serving requests. Never touches the backend."""
+    return jsonify({'status': 'ok'}), 200
+
+
+@health_bp.route("/ready", methods=["GET"])
+def ready():
+    """
+    Readiness: warmup finished (or was never requested) and the backend
+    answers. Reports the latency of a one-row backend query and the
+    breaker state.
+    """
+    body = {
+        'warmed_up': state['ready'],
+        'warmup_seconds': state['warmup_seconds'],
+        'circuit': data_breaker.state,
+    }
+    if supabase.replica is not None:
+        body['replica_circuit'] = replica_breaker.state
+
+    started = time.perf_counter()
+    try:
+        supabase.primary.get().table("donation_points").select("id").limit(1).execute()
+        body['backend'] = 'ok'
+    except Exception as e:
+        body['backend'] = 'error'
+        body['backend_error'] = str(e)
+    body['backend_latency_ms'] = round((time.perf_counter() - started) * 1000, 2)
+
+    healthy = state['ready'] is not False and body['backend'] == 'ok'
+    body['status'] = 'ready' if healthy else 'unavailable'
+    return jsonify(body), 200 if healthy else 503
@@ -0,0 +1,249 @@
+# app/idempotency.py
+import functools
+import hashlib
+import json
+import os
+import threading
+import time
+
+from flask import Response, jsonify, make_response, request
+
+from app import metrics
+from app.cache import LRUCache
+from app.ratelimit import jwt_identity
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+TTL = float(os.getenv("IDEMPOTENCY_TTL", "86400"))
+# Seconds a retry waits for the original request still being processed
+WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "30"))
+# Lifetime of a claim on the shared tier, so a worker dying mid-request
+# does not block its key for the whole TTL; a running handler keeps
+# renewing it, so a slow one does not lose its claim
+CLAIM_SECONDS = float(os.getenv("IDEMPOTENCY_CLAIM_SECONDS", "60"))
+# How often a retry on another worker checks whether the original finished
+POLL_SECONDS = 0.1
+
+responses = LRUCache(maxsize=int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000")), ttl=TTL)
+idempotent_requests = metrics.counter("idempotent_requests_total", "Requests carrying an Idempotency-Key, by outcome")
+
+
+class _InFlight:
+    def __init__(self, fingerprint):
+        self.fingerprint = fingerprint
+        self.done = threading.Event()
+
+
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+
+class SharedResponses:
+    """
+    Claims and completed responses on the shared cache tier's Redis, so a
+    retry reaching another worker waits for the original and is replayed.
+    A claim is a record without a status: (fingerprint, None, None, None).
+    Redis errors fall back to what this process knows.
+    """
+
+    def __init__(self, client, prefix="pd:idem:"):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        try:
+            raw = self.client.get(self.prefix + key)
+        except Exception:
+            return None
+        return tuple(json.loads(raw)) if raw is not None else None
+
+    def claim(self, key, fingerprint):
+        """Mark the key as being processed here; False if another request holds it or already finished."""
+        try:
+            claimed = self.client.set(self.prefix + key, json.dumps((fingerprint, None, None, None)),
+                                      ex=max(1, int(CLAIM_SECONDS)), nx=True)
+        except Exception:
+            return True
+        return bool(claimed)
+
+    def refresh(self, key):
+        """Extend the claim of a request still being processed here."""
+        try:
+            self.client.expire(self.prefix + key, max(1, int(CLAIM_SECONDS)))
+        except Exception:
+            pass
+
+    def set(self, key, record):
+        try:
+            self.client.set(self.prefix + key, json.dumps(record), ex=int(TTL))
+        except Exception:
+            pass
+
+    def release(self, key):
+        """Drop a claim whose request failed, so a retry runs the handler again."""
+        try:
+            self.client.delete(self.prefix + key)
+        except Exception:
+            pass
+
+
+def _build_shared():
+    from app.cache import entity_cache
+    return SharedResponses(entity_cache.shared.client) if entity_cache.shared is not None else None
+
+
+shared = _build_shared()
+
+
+def _lookup(key):
+    record = responses.get(key)
+    if record is None and shared is not None:
+        record = shared.get(key)
+        if record is not None and record[1] is not None:
+            responses.set(key, record)
+    return record
+
+
+def _scoped_key(idempotency_key):
+    """
+    Keys are scoped per JWT identity when there is one. Anonymous keys are
+    scoped by path only: the client address changes between retries
+    (mobile networks, proxies), and the body fingerprint already keeps a
+    key from being replayed to a different request.
+    """
+    identity = jwt_identity()
+    scope = f"user:{identity}" if identity is not None else "anon"
+    return f"{scope}:{request.path}:{idempotency_key}"
+
+
+class _ClaimHeartbeat:
+    """Renews a shared claim every third of CLAIM_SECONDS until stopped."""
+
+    def __init__(self, key):
+        self.key = key
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="idempotency-claim", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while not self.stopped.wait(max(0.1, CLAIM_SECONDS / 3)):
+            shared.refresh(self.key)
+
+    def stop(self):
+        # Joined, so no renewal lands after the response record is stored
+        self.stopped.set()
+        self.thread.join()
+
+
+def _replay(record):
+    _, status, body, mimetype = record
+    response = Response(body, status=status, mimetype=mimetype)
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _mismatch():
+    idempotent_requests.inc(outcome="mismatch")
+    return jsonify({'error': f"{HEADER} was already used with a different request body"}), 422
+
+
+def _still_processing():
+    response = jsonify({'error': f"A request with this {HEADER} is still being processed"})
+    response.headers['Retry-After'] = '1'
+    return response, 409
+
+
+def _finish(key, entry):
+    with _in_flight_lock:
+        _in_flight.pop(key, None)
+    entry.done.set()
+
+
+def idempotent(view):
+    """
+    Honour an Idempotency-Key header on a create endpoint: the first
+    response per identity, path and key (unless it is a 5xx) is kept for
+    IDEMPOTENCY_TTL seconds and replayed to retries. A retry arriving
+    while the original is still running waits for it instead of running
+    the handler twice, on the same worker (an event) or, with the shared
+    Redis tier, on any other (the original claims the key first and the
+    retry polls for its response; the claim is renewed while the handler
+    runs). Requests without the header are unaffected.
+    """
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        idempotency_key = request.headers.get(HEADER)
+        if not idempotency_key:
+            return view(*args, **kwargs)
+        if len(idempotency_key) > MAX_KEY_LENGTH:
+            return jsonify({'error': f"{HEADER} must be at most {MAX_KEY_LENGTH} characters"}), 400
+
+        key = _scoped_key(idempotency_key)
+        fingerprint = hashlib.sha256(request.get_data()).hexdigest()
+        deadline = time.monotonic() + WAIT_SECONDS
+        waited = False
+
+        while True:
+            record = _lookup(key)
+            if record is not None:
+                if record[0] != fingerprint:
+                    return _mismatch()
+                if record[1] is not None:
+                    idempotent_requests.inc(outcome="replayed")
+                    return _replay(record)
+                # Claimed by a request still running on another worker
+                if not waited:
+                    idempotent_requests.inc(outcome="waited")
+                    waited = True
+                if time.monotonic() >= deadline:
+                    return _still_processing()
+                time.sleep(POLL_SECONDS)
+                continue
+
+            entry = None
+            with _in_flight_lock:
+                original = _in_flight.get(key)
+                # A response stored while this request waited for the lock is replayed on the next pass
+                if original is None and responses.get(key) is None:
+                    entry = _in_flight[key] = _InFlight(fingerprint)
+            if entry is not None:
+                if shared is None or shared.claim(key, fingerprint):
+                    break
+                # Another worker claimed the key first: wait for its response
+                _finish(key, entry)
+                continue
+            if original is None:
+                continue
+
+            if original.fingerprint != fingerprint:
+                return _mismatch()
+            if not waited:
+                idempotent_requests.inc(outcome="waited")
+                waited = True
+            if not original.done.wait(max(0.0, deadline - time.monotonic())):
+                return _still_processing()
+            # Loop: replay the stored response, or run the handler if the original failed
+
+        stored = False
+        heartbeat = _ClaimHeartbeat(key) if shared is not None else None
+        try:
+            try:
+                response = make_response(view(*args, **kwargs))
+            finally:
+                if heartbeat is not None:
+                    heartbeat.stop()
+            if response.status_code < 500:
+                record = (fingerprint, response.status_code, response.get_data(as_text=True), response.mimetype)
+                responses.set(key, record)
+                if shared is not None:
+                    shared.set(key, record)
+                stored = True
+            idempotent_requests.inc(outcome="executed")
+            return response
+        finally:
+            if not stored and shared is not None:
+                shared.release(key)
+            _finish(key, entry)
+
+    return wrapper
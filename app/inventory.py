@@ -0,0 +1,141 @@
+# app/inventory.py
+import logging
+import os
+from datetime import datetime, timezone
+
+from app import metrics
+from app.db import select_in
+
+RECONCILE_BATCH_SIZE = int(os.getenv("INVENTORY_RECONCILE_BATCH_SIZE", "500"))
+LEDGER = "donation_point_inventory"
+
+inventory_corrections = metrics.counter("inventory_reconcile_corrections_total",
+                                        "Ledger rows rewritten by inventory reconciliation")
+logger = logging.getLogger(__name__)
+
+
+def read_inventory(supabase, id_point):
+    """
+    What a donation point is holding, by food category (one ledger row per category).
+    Quantities are converted to kg like /donors/stats.
+    """
+    rows = supabase.table(LEDGER) \
+        .select("category,items,quantity,updated_at") \
+        .eq('id_point', id_point) \
+        .execute().data
+
+    categories = [
+        {
+            'category': row['category'],
+            'items': row['items'],
+            'kg': round(float(row['quantity']) / 100, 2),
+            'updated_at': row.get('updated_at'),
+        }
+        for row in rows if row['items'] > 0
+    ]
+    categories.sort(key=lambda row: row['kg'], reverse=True)
+    return {
+        'id_point': id_point,
+        'categories': categories,
+        'total_items': sum(row['items'] for row in categories),
+        'total_kg': round(sum(row['kg'] for row in categories), 2),
+    }
+
+
+def _pending_donations(supabase, batch_size):
+    after_id = None
+    while True:
+        query = supabase.table("donations") \
+            .select("id,id_point") \
+            .eq('pending', True)
+        if after_id is not None:
+            query = query.gt('id', after_id)
+
+        rows = query.order('id').limit(batch_size).execute().data
+        if rows:
+            yield rows
+        if len(rows) < batch_size:
+            return
+        after_id = rows[-1]['id']
+
+
+def rebuild_totals(supabase, batch_size=RECONCILE_BATCH_SIZE):
+    """
+    Recompute {(id_point, category): [items, quantity]} from the pending
+    donations and their food, one keyset page of donations at a time, so
+    memory is bounded by the number of ledger rows, not donations.
+    """
+    totals = {}
+    donations = 0
+    for rows in _pending_donations(supabase, batch_size):
+        donations += len(rows)
+        points = {row['id']: row['id_point'] for row in rows if row.get('id_point') is not None}
+        if not points:
+            continue
+        food = select_in(supabase, "food", "id_donation,category,quantity", 'id_donation', list(points))
+        for item in food:
+            key = (points[item['id_donation']], item.get('category') or 'uncategorized')
+            entry = totals.setdefault(key, [0, 0])
+            entry[0] += 1
+            entry[1] += item.get('quantity') or 0
+    return totals, donations
+
+
+def _ledger_rows(supabase, batch_size):
+    start = 0
+    while True:
+        rows = supabase.table(LEDGER) \
+            .select("id_point,category,items,quantity") \
+            .order('id_point') \
+            .order('category') \
+            .range(start, start + batch_size - 1) \
+            .execute().data
+        yield from rows
+        if len(rows) < batch_size:
+            return
+        start += batch_size
+
+
+def reconcile(supabase, batch_size=RECONCILE_BATCH_SIZE, dry_run=False):
+    """
+    Rebuild the ledger from donations and food and rewrite only the rows
+    that drifted, in upsert batches of `batch_size`.
+
+    Writes that land while the pass is running can be overwritten with
+    the totals read a moment earlier; the next run corrects them.
+    """
+    totals, donations = rebuild_totals(supabase, batch_size)
+
+    current = {
+        (row['id_point'], row['category']): [row['items'], float(row['quantity'])]
+        for row in _ledger_rows(supabase, batch_size)
+    }
+
+    now = datetime.now(timezone.utc).isoformat()
+    corrections = [
+        {'id_point': point, 'category': category, 'items': items, 'quantity': quantity, 'updated_at': now}
+        for (point, category), (items, quantity) in totals.items()
+        if current.get((point, category)) != [items, float(quantity)]
+    ]
+    # Ledger rows with nothing pending behind them go back to zero
+    corrections += [
+        {'id_point': point, 'category': category, 'items': 0, 'quantity': 0, 'updated_at': now}
+        for (point, category), (items, quantity) in current.items()
+        if (point, category) not in totals and (items or quantity)
+    ]
+
+    if not dry_run:
+        for start in range(0, len(corrections), batch_size):
+            supabase.table(LEDGER) \
+                .upsert(corrections[start:start + batch_size], on_conflict="id_point,category") \
+                .execute()
+        inventory_corrections.inc(len(corrections))
+
+    result = {
+        'donations_scanned': donations,
+        'ledger_rows': len(totals),
+        'corrected_rows': len(corrections),
+        'dry_run': dry_run,
+    }
+    logger.info("inventory reconciled", extra=result)
+    return result
@@ -0,0 +1,335 @@
+# app/leaderboard.py
+import atexit
+import bisect
+import heapq
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+from app import archive, metrics
+from app.db import select_in
+from app.pubsub import broker
+
+LEADERBOARD_SIZE = int(os.getenv("LEADERBOARD_SIZE", "100"))
+PERSIST_SECONDS = float(os.getenv("LEADERBOARD_PERSIST_SECONDS", "60"))
+BATCH_SIZE = int(os.getenv("LEADERBOARD_BATCH_SIZE", "500"))
+TABLE = "donor_leaderboard"
+GLOBAL = "global"
+
+leaderboard_rows_persisted = metrics.counter("leaderboard_rows_persisted_total",
+                                             "Donor totals written to donor_leaderboard")
+logger = logging.getLogger(__name__)
+
+
+def campaign_scope(campaign_id):
+    return f"campaign:{campaign_id}"
+
+
+def _scopes(campaign_id):
+    return [GLOBAL, campaign_scope(campaign_id)] if campaign_id else [GLOBAL]
+
+
+class Leaderboard:
+    """
+    Running kg totals per donor plus the top `size` entries kept sorted.
+    Increments only touch the sorted top list (bisect), decrements that
+    push a donor out of it refill it with one nlargest pass. Reads return
+    a ready-made snapshot, so serving the top N costs the same whatever
+    the number of donors.
+    """
+
+    def __init__(self, size=LEADERBOARD_SIZE):
+        self.size = size
+        self.totals = {}
+        self._top = []          # (-quantity, donor_id), ascending
+        self.snapshot = ()
+
+    def add(self, donor_id, delta):
+        old = self.totals.get(donor_id, 0)
+        new = old + delta
+        self.totals[donor_id] = new
+
+        index = bisect.bisect_left(self._top, (-old, donor_id))
+        in_top = index < len(self._top) and self._top[index] == (-old, donor_id)
+        if in_top:
+            del self._top[index]
+            if delta < 0 and len(self.totals) > len(self._top) + 1:
+                return self._refill()
+
+        if new > 0 and (len(self._top) < self.size or (-new, donor_id) < self._top[-1]):
+            bisect.insort(self._top, (-new, donor_id))
+            del self._top[self.size:]
+        elif not in_top:
+            return
+        self._publish()
+
+    def replace(self, totals):
+        self.totals = dict(totals)
+        self._refill()
+
+    def _refill(self):
+        self._top = sorted(heapq.nsmallest(
+            self.size, ((-quantity, donor_id) for donor_id, quantity in self.totals.items() if quantity > 0)
+        ))
+        self._publish()
+
+    def _publish(self):
+        self.snapshot = tuple(
+            {'rank': rank, 'donor_id': donor_id, 'kg': round(-quantity / 100, 2)}
+            for rank, (quantity, donor_id) in enumerate(self._top, start=1)
+        )
+
+    def top(self, n):
+        return list(self.snapshot[:n])
+
+
+class Leaderboards:
+    """
+    One Leaderboard per scope ('global' and 'campaign:<id>') for this process.
+
+    Every food write is a delta numbered by the worker that recorded it
+    (origin, seq). That worker applies it at once and publishes it as a
+    'leaderboard' event; with the shared Redis tier every other worker
+    applies it too. Every PERSIST_SECONDS each worker adds its own deltas
+    to donor_leaderboard (leaderboard_add: quantity = quantity + delta)
+    together with the highest seq written, in one transaction, so
+    concurrent workers never overwrite each other's totals. Then it
+    reloads: the snapshot carries every origin's watermark, so each delta
+    held in memory is counted either from the table or from memory, never
+    both or neither, and deltas whose event never reached this worker
+    arrive through the table.
+    """
+
+    def __init__(self, size=LEADERBOARD_SIZE):
+        self.size = size
+        self._boards = {}
+        self._deltas = {}       # origin -> [(seq, scope, donor_id, quantity)] the loaded snapshot does not cover
+        self._watermarks = {}   # origin -> highest seq covered by the loaded snapshot
+        self._seq = 0
+        self._persisted = 0     # highest seq of this worker written to donor_leaderboard
+        self._id = uuid.uuid4().hex
+        self._lock = threading.RLock()
+        self._load_lock = threading.Lock()
+        self._persist_lock = threading.Lock()
+        self._pid = None
+
+    @property
+    def origin(self):
+        # Per process, so forked workers number their deltas separately
+        return f"{self._id}:{os.getpid()}"
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._boards, self._deltas, self._watermarks = {}, {}, {}
+            self._seq = self._persisted = 0
+            try:
+                self._load()
+            except Exception:
+                logger.exception("leaderboard load failed")
+            broker.listen("leaderboard", self._on_event)
+            threading.Thread(target=self._persist_loop, name="leaderboard-persist", daemon=True).start()
+            atexit.register(self._persist_quietly)
+
+    def _board(self, scope):
+        board = self._boards.get(scope)
+        if board is None:
+            board = self._boards[scope] = Leaderboard(self.size)
+        return board
+
+    def _apply(self, origin, seq, donor_id, campaign_id, quantity):
+        log = self._deltas.setdefault(origin, [])
+        for scope in _scopes(campaign_id):
+            log.append((seq, scope, donor_id, quantity))
+            self._board(scope).add(donor_id, quantity)
+
+    # Writes
+
+    def record(self, donor_id, campaign_id, quantity):
+        """Publish a change of `quantity` (food units) for a donor and, if any, a campaign."""
+        if not donor_id or not quantity:
+            return
+        self._ensure_started()
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+            self._apply(self.origin, seq, donor_id, campaign_id, quantity)
+        broker.publish("leaderboard", "leaderboard.delta", {
+            'origin': self.origin, 'seq': seq,
+            'donor_id': donor_id, 'id_campaign': campaign_id, 'quantity': quantity,
+        })
+
+    def _on_event(self, event_type, payload):
+        if event_type == "leaderboard.reload":
+            threading.Thread(target=self.reload, daemon=True).start()
+            return
+        origin = payload.get('origin')
+        if origin == self.origin:
+            # Applied when it was recorded
+            return
+        with self._lock:
+            if payload.get('seq', 0) <= self._watermarks.get(origin, 0):
+                # Already in the loaded snapshot
+                return
+            self._apply(origin, payload.get('seq', 0), payload['donor_id'], payload.get('id_campaign'),
+                        payload['quantity'])
+
+    # Reads
+
+    def top(self, scope, n=LEADERBOARD_SIZE):
+        self._ensure_started()
+        board = self._boards.get(scope)
+        return board.top(n) if board is not None else []
+
+    # Persistence
+
+    def _load(self, supabase=None):
+        if supabase is None:
+            from app.db import supabase
+        # Loads run one at a time, so the watermarks never move backwards
+        with self._load_lock:
+            snapshot = supabase.rpc("leaderboard_snapshot", {}).execute().data or {}
+            watermarks = {origin: int(seq) for origin, seq in (snapshot.get('watermarks') or {}).items()}
+            boards = {}
+            for scope, donor_id, quantity in snapshot.get('rows') or []:
+                boards.setdefault(scope, {})[donor_id] = float(quantity)
+
+            with self._lock:
+                # Deltas recorded or received here that the snapshot does not contain yet
+                for origin, log in list(self._deltas.items()):
+                    covered = watermarks.get(origin, 0)
+                    log = [entry for entry in log if entry[0] > covered]
+                    if log:
+                        self._deltas[origin] = log
+                    else:
+                        del self._deltas[origin]
+                    for _, scope, donor_id, quantity in log:
+                        totals = boards.setdefault(scope, {})
+                        totals[donor_id] = totals.get(donor_id, 0) + quantity
+                self._watermarks = watermarks
+                self._boards = {}
+                for scope, totals in boards.items():
+                    self._board(scope).replace(totals)
+
+    def reload(self):
+        try:
+            self._load()
+        except Exception:
+            logger.exception("leaderboard reload failed")
+
+    def persist(self, supabase=None):
+        """
+        Add the deltas recorded here since the last successful call to
+        donor_leaderboard (one atomic increment per row) along with their
+        highest seq, in one transaction; returns the number of rows
+        written. After a failure the same deltas are sent again next time.
+        """
+        if supabase is None:
+            from app.db import supabase
+        with self._persist_lock:
+            with self._lock:
+                upto = self._seq
+                totals = {}
+                for seq, scope, donor_id, quantity in self._deltas.get(self.origin, ()):
+                    if self._persisted < seq <= upto:
+                        totals[(scope, donor_id)] = totals.get((scope, donor_id), 0) + quantity
+            if upto == self._persisted:
+                return 0
+            rows = [
+                {'scope': scope, 'donor_id': donor_id, 'quantity': delta}
+                for (scope, donor_id), delta in totals.items() if delta
+            ]
+            supabase.rpc("leaderboard_add", {'p_deltas': rows, 'p_origin': self.origin, 'p_seq': upto}).execute()
+            self._persisted = upto
+        leaderboard_rows_persisted.inc(len(rows))
+        return len(rows)
+
+    def _persist_quietly(self):
+        try:
+            self.persist()
+        except Exception:
+            logger.exception("leaderboard persist failed")
+
+    def _persist_loop(self):
+        pid = os.getpid()
+        while self._pid == pid:
+            time.sleep(PERSIST_SECONDS)
+            self._persist_quietly()
+            self.reload()
+
+
+leaderboards = Leaderboards()
+
+
+def _nonzero_rows(supabase, batch_size):
+    start = 0
+    while True:
+        rows = supabase.table(TABLE) \
+            .select("scope,donor_id") \
+            .neq('quantity', 0) \
+            .order('scope') \
+            .order('donor_id') \
+            .range(start, start + batch_size - 1) \
+            .execute().data
+        yield from rows
+        if len(rows) < batch_size:
+            return
+        start += batch_size
+
+
+def rebuild(supabase, batch_size=BATCH_SIZE):
+    """
+    Batch recompute: sum food quantities per donor, globally and per
+    campaign, from every donation, archived ones included (keyset pages of
+    `batch_size`), rewrite donor_leaderboard and tell running workers to
+    reload it.
+    """
+    donations_table, food_table = archive.tables(include_archived=True)
+    totals = {}
+    donations, after_id = 0, None
+    while True:
+        query = supabase.table(donations_table).select("id,id_donor,id_campaign")
+        if after_id is not None:
+            query = query.gt('id', after_id)
+        rows = query.order('id').limit(batch_size).execute().data
+        donations += len(rows)
+
+        owners = {row['id']: row for row in rows if row.get('id_donor')}
+        if owners:
+            for item in select_in(supabase, food_table, "id_donation,quantity", 'id_donation', list(owners)):
+                donation = owners[item['id_donation']]
+                for scope in _scopes(donation.get('id_campaign')):
+                    key = (scope, donation['id_donor'])
+                    totals[key] = totals.get(key, 0) + (item.get('quantity') or 0)
+
+        if len(rows) < batch_size:
+            break
+        after_id = rows[-1]['id']
+
+    # Rows for donors that no longer have any food go back to zero
+    now = datetime.now(timezone.utc).isoformat()
+    stale = [
+        {'scope': row['scope'], 'donor_id': row['donor_id'], 'quantity': 0, 'updated_at': now}
+        for row in _nonzero_rows(supabase, batch_size)
+        if (row['scope'], row['donor_id']) not in totals
+    ]
+    rows = [
+        {'scope': scope, 'donor_id': donor_id, 'quantity': quantity, 'updated_at': now}
+        for (scope, donor_id), quantity in totals.items()
+    ] + stale
+    for start in range(0, len(rows), batch_size):
+        supabase.table(TABLE).upsert(rows[start:start + batch_size], on_conflict="scope,donor_id").execute()
+
+    broker.publish("leaderboard", "leaderboard.reload", {})
+    return {
+        'donations_scanned': donations,
+        'rows_written': len(rows),
+        'scopes': len({scope for scope, _ in totals}),
+    }
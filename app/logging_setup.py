@@ -0,0 +1,161 @@
+# app/logging_setup.py
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import uuid
+from logging.handlers import QueueHandler, QueueListener
+
+from flask import g, has_request_context, request
+
+from app import metrics
+
+logs_dropped = metrics.counter("log_records_dropped_total", "Log records dropped because the log queue was full")
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+def _truncate(value, limit):
+    if isinstance(value, str) and len(value) > limit:
+        return f"{value[:limit]}...[{len(value) - limit} more chars]"
+    return value
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; long strings (QR blobs, payloads) are truncated."""
+
+    def __init__(self, max_field_length=512):
+        super().__init__()
+        self.max_field_length = max_field_length
+
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': _truncate(record.getMessage(), self.max_field_length),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and not key.startswith('_'):
+                entry[key] = _truncate(value if isinstance(value, (int, float, bool, type(None))) else str(value),
+                                       self.max_field_length)
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry)
+
+
+class RequestContextFilter(logging.Filter):
+    """Adds the request id and endpoint, and applies per-route sampling to INFO and below."""
+
+    def __init__(self, sample_rates=None):
+        super().__init__()
+        self.sample_rates = sample_rates or {}
+
+    def filter(self, record):
+        if not has_request_context():
+            return True
+        record.request_id = g.get('request_id')
+        record.endpoint = request.endpoint
+        if record.levelno <= logging.INFO:
+            rate = self.sample_rates.get(request.endpoint, self.sample_rates.get('default', 1.0))
+            if rate < 1.0 and random.random() >= rate:
+                return False
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to a background listener thread through a bounded queue.
+    Records are dropped (and counted) rather than blocking a request when
+    the queue is full. The listener is restarted after fork.
+    """
+
+    def __init__(self, target, maxsize=10000):
+        super().__init__(queue.Queue(maxsize=maxsize))
+        self.target = target
+        self._listener = None
+        self._pid = None
+        self._listener_lock = threading.Lock()
+
+    def _ensure_listener(self):
+        if self._pid == os.getpid():
+            return
+        # Threads logging at the same time must not start a listener each
+        with self._listener_lock:
+            if self._pid != os.getpid():
+                self._listener = QueueListener(self.queue, self.target, respect_handler_level=True)
+                self._listener.start()
+                atexit.register(self._listener.stop)
+                self._pid = os.getpid()
+
+    def prepare(self, record):
+        # Only resolve the message here; JSON formatting happens on the listener thread
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            logs_dropped.inc()
+
+    def emit(self, record):
+        self._ensure_listener()
+        super().emit(record)
+
+
+def parse_sample_rates(spec):
+    """'donations.get_qr_code=0.01,default=1' -> {'donations.get_qr_code': 0.01, 'default': 1.0}"""
+    rates = {}
+    for item in (spec or "").split(","):
+        if "=" in item:
+            endpoint, rate = item.split("=", 1)
+            rates[endpoint.strip()] = float(rate)
+    return rates
+
+
+def init_app(app):
+    """Route app logging through a JSON, queue-based handler and tag records with request ids."""
+    stream = logging.StreamHandler(sys.stderr)
+    stream.setFormatter(JsonFormatter(app.config.get('LOG_MAX_FIELD_LENGTH', 512)))
+
+    handler = NonBlockingQueueHandler(stream, app.config.get('LOG_QUEUE_SIZE', 10000))
+    handler.addFilter(RequestContextFilter(parse_sample_rates(app.config.get('LOG_SAMPLE_RATES'))))
+
+    root = logging.getLogger('app')
+    root.handlers = [handler]
+    root.setLevel(app.config.get('LOG_LEVEL', 'INFO'))
+    root.propagate = False
+
+    access_log = logging.getLogger('app.access')
+
+    @app.before_request
+    def assign_request_id():
+        g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def log_request(response):
+        response.headers['X-Request-ID'] = g.get('request_id', '')
+        started = g.get('request_started')
+        if started is not None:
+            access_log.info("request", extra={
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'ms': round((time.perf_counter() - started) * 1000, 2),
+            })
+        return response
@@ -0,0 +1,74 @@
+# app/metrics.py
+import threading
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    kind = "counter"
+
+    def __init__(self, name, description):
+        self.name = name
+        self.description = description
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(sorted(labels.items())), 0)
+
+    def samples(self):
+        with self._lock:
+            return list(self._values.items())
+
+
+class Gauge(Counter):
+    """Value that can go up and down."""
+
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = value
+
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def _get_or_create(cls, name, description):
+    with _registry_lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = cls(name, description)
+            _registry[name] = metric
+        return metric
+
+
+def counter(name, description=""):
+    return _get_or_create(Counter, name, description)
+
+
+def gauge(name, description=""):
+    return _get_or_create(Gauge, name, description)
+
+
+def render():
+    """Render every registered metric in the Prometheus text format."""
+    lines = []
+    for name in sorted(_registry):
+        metric = _registry[name]
+        lines.append(f"# HELP {name} {metric.description}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        for labels, value in sorted(metric.samples()):
+            if labels:
+                label_str = ",".join(f'{k}="{v}"' for k, v in labels)
+                lines.append(f"{name}{{{label_str}}} {value}")
+            else:
+                lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,90 @@
+# app/pickup.py
+import os
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+MAX_STOPS = int(os.getenv("ROUTES_MAX_STOPS", "2000"))
+MAX_TWO_OPT_PASSES = int(os.getenv("ROUTES_TWO_OPT_PASSES", "50"))
+
+
+def haversine_matrix(lat, lon):
+    """Pairwise great-circle distances in km for coordinate arrays (degrees)."""
+    lat, lon = np.radians(lat), np.radians(lon)
+    dlat = lat[:, None] - lat[None, :]
+    dlon = lon[:, None] - lon[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def nearest_neighbour(dist, stops):
+    """Tour over `stops` (matrix indices) starting and ending at the depot (index 0)."""
+    remaining = np.array(stops, dtype=np.int64)
+    route = [0]
+    while len(remaining):
+        nearest = int(np.argmin(dist[route[-1], remaining]))
+        route.append(int(remaining[nearest]))
+        remaining = np.delete(remaining, nearest)
+    route.append(0)
+    return np.array(route, dtype=np.int64)
+
+
+def two_opt(dist, route, max_passes=MAX_TWO_OPT_PASSES):
+    """
+    Improve a closed route (depot at both ends) with 2-opt moves. For each
+    edge (a, b) the gain of every candidate edge (c, d) after it is
+    computed at once, and the best improving reversal is applied.
+    """
+    route = route.copy()
+    n = len(route)
+    for _ in range(max_passes):
+        improved = False
+        for i in range(1, n - 2):
+            a, b = route[i - 1], route[i]
+            c, d = route[i + 1:n - 1], route[i + 2:n]
+            delta = dist[a, c] + dist[b, d] - dist[a, b] - dist[c, d]
+            j = int(np.argmin(delta))
+            if delta[j] < -1e-9:
+                route[i:i + j + 2] = route[i:i + j + 2][::-1]
+                improved = True
+        if not improved:
+            break
+    return route
+
+
+def route_length(dist, route):
+    return float(dist[route[:-1], route[1:]].sum())
+
+
+def sweep_clusters(lat, lon, vehicles):
+    """
+    Split the stops (matrix indices 1..n) into `vehicles` groups of near
+    equal size by polar angle around the depot (index 0).
+    """
+    angles = np.arctan2(lat[1:] - lat[0], (lon[1:] - lon[0]) * np.cos(np.radians(lat[0])))
+    order = np.argsort(angles, kind='stable') + 1
+    if len(order) == 0:
+        return [np.empty(0, dtype=np.int64) for _ in range(vehicles)]
+    # Start the sweep at the widest angular gap so no cluster straddles it
+    sorted_angles = np.sort(angles)
+    gaps = np.diff(np.concatenate([sorted_angles, sorted_angles[:1] + 2 * np.pi]))
+    order = np.roll(order, -(int(np.argmax(gaps)) + 1))
+    return np.array_split(order, vehicles)
+
+
+def plan_routes(depot, stops, vehicles=1):
+    """
+    Build `vehicles` closed pickup routes from `depot` (lat, lon) over
+    `stops` (dicts with 'lat' and 'lon'): sweep clustering, then
+    nearest-neighbour and 2-opt per vehicle over one haversine matrix.
+    Returns [(stop_indices_in_visit_order, distance_km), ...].
+    """
+    lat = np.array([depot[0]] + [stop['lat'] for stop in stops], dtype=np.float64)
+    lon = np.array([depot[1]] + [stop['lon'] for stop in stops], dtype=np.float64)
+    dist = haversine_matrix(lat, lon)
+
+    routes = []
+    for cluster in sweep_clusters(lat, lon, vehicles):
+        route = two_opt(dist, nearest_neighbour(dist, cluster))
+        routes.append(([int(index) - 1 for index in route[1:-1]], route_length(dist, route)))
+    return routes
@@ -0,0 +1,103 @@
+from flask import Blueprint, jsonify
+import time
+from app.db import PAGE_SIZE, select_in, supabase
+from app.pickup import MAX_STOPS, plan_routes
+from app.schemas import parse_body, RoutePlanRequest
+
+
+pickup_routes_bp = Blueprint("pickup_routes", __name__)
+
+MAX_VEHICLES = 50
+
+
+def _pending_load(page_size=None):
+    """
+    Items and kg per point holding pending donations, from the inventory
+    ledger (one row per point and category) read in pages, so max-rows
+    never drops a stop. Stops reading once more than MAX_STOPS points
+    were found.
+    """
+    page_size = page_size or PAGE_SIZE
+    load, start = {}, 0
+    while len(load) <= MAX_STOPS:
+        rows = supabase.table("donation_point_inventory") \
+            .select("id_point,items,quantity") \
+            .gt('items', 0) \
+            .order('id_point') \
+            .order('category') \
+            .range(start, start + page_size - 1) \
+            .execute().data
+        for row in rows:
+            entry = load.setdefault(row['id_point'], {'items': 0, 'kg': 0.0})
+            entry['items'] += row['items']
+            entry['kg'] += float(row['quantity']) / 100
+        if len(rows) < page_size:
+            break
+        start += page_size
+    return load
+
+
+@pickup_routes_bp.route("/plan", methods=["POST"])
+def plan():
+    """
+    Planea rutas de recolección sobre los Donation Points con donaciones
+    pendientes (según el inventario por punto).
+
+    Request JSON:
+    {
+        "depot_lat": float,
+        "depot_lon": float,
+        "vehicles": int (opcional, default 1)
+    }
+
+    Response: una ruta por vehículo (depot -> paradas -> depot) con las
+    paradas en orden de visita y la distancia en km.
+    """
+    try:
+        data, error = parse_body(RoutePlanRequest)
+        if error:
+            return error
+
+        if not 1 <= data.vehicles <= MAX_VEHICLES:
+            return jsonify({'error': f"vehicles must be between 1 and {MAX_VEHICLES}"}), 400
+
+        # Points holding pending donations, with what each one holds
+        load = _pending_load()
+
+        if len(load) > MAX_STOPS:
+            return jsonify({'error': f"Too many stops to plan at once (max {MAX_STOPS})"}), 400
+
+        points = select_in(supabase, "donation_points", "id,name,address,lat,lon", 'id', list(load))
+        points = [point for point in points if point.get('lat') is not None and point.get('lon') is not None]
+
+        started = time.perf_counter()
+        routes = plan_routes((data.depot_lat, data.depot_lon), points, data.vehicles)
+        planning_ms = round((time.perf_counter() - started) * 1000, 2)
+
+        plans = []
+        for vehicle, (order, distance) in enumerate(routes, start=1):
+            stops = [
+                {
+                    **points[index],
+                    'items': load[points[index]['id']]['items'],
+                    'kg': round(load[points[index]['id']]['kg'], 2),
+                }
+                for index in order
+            ]
+            plans.append({
+                'vehicle': vehicle,
+                'stops': stops,
+                'distance_km': round(distance, 3),
+                'kg': round(sum(stop['kg'] for stop in stops), 2),
+            })
+
+        return jsonify({
+            'depot': {'lat': data.depot_lat, 'lon': data.depot_lon},
+            'routes': plans,
+            'total_stops': len(points),
+            'total_distance_km': round(sum(route['distance_km'] for route in plans), 3),
+            'planning_ms': planning_ms,
+        }), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
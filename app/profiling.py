@@ -0,0 +1,101 @@
+# app/profiling.py
+import cProfile
+import hmac
+import json
+import os
+import random
+import time
+import uuid
+from datetime import datetime, timezone
+
+from flask import g, request
+
+from app import metrics
+from app.resilience import call_listeners
+
+profiles_written = metrics.counter("profiles_written_total", "Request profiles written to disk")
+
+
+def _record_backend_call(backend_request, elapsed, status):
+    calls = g.get('profile_backend_calls')
+    if calls is not None:
+        calls.append({
+            'method': backend_request.method,
+            # /rest/v1/<table> -> <table>
+            'table': backend_request.url.path.rsplit('/', 1)[-1],
+            'status': status,
+            'ms': round(elapsed * 1000, 3),
+        })
+
+
+def _should_profile(app):
+    token = app.config.get('PROFILE_TOKEN')
+    header = request.headers.get('X-Profile')
+    if token and header and hmac.compare_digest(header, token):
+        return True
+    rate = app.config.get('PROFILE_SAMPLE_RATE') or 0
+    return rate > 0 and random.random() < rate
+
+
+def _backend_breakdown(calls):
+    by_table = {}
+    for call in calls:
+        entry = by_table.setdefault(call['table'], {'calls': 0, 'ms': 0.0})
+        entry['calls'] += 1
+        entry['ms'] = round(entry['ms'] + call['ms'], 3)
+    return by_table
+
+
+def init_app(app):
+    """
+    Opt-in cProfile around a request, enabled by an `X-Profile` header
+    matching PROFILE_TOKEN or by PROFILE_SAMPLE_RATE. Each profile is
+    written to PROFILE_DIR as <id>.pstats plus <id>.json with the route,
+    timings and per-table backend calls.
+    """
+    if _record_backend_call not in call_listeners:
+        call_listeners.append(_record_backend_call)
+
+    @app.before_request
+    def start_profile():
+        if not _should_profile(app):
+            return
+        g.profile_backend_calls = []
+        g.profile_started = time.perf_counter()
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+    @app.after_request
+    def stop_profile(response):
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return response
+        profiler.disable()
+        wall_ms = (time.perf_counter() - g.profile_started) * 1000
+        calls = g.pop('profile_backend_calls', [])
+
+        profile_id = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{request.endpoint}-{uuid.uuid4().hex[:8]}"
+        directory = app.config.get('PROFILE_DIR') or 'profiles'
+        try:
+            os.makedirs(directory, exist_ok=True)
+            profiler.dump_stats(os.path.join(directory, f"{profile_id}.pstats"))
+            backend_ms = sum(call['ms'] for call in calls)
+            with open(os.path.join(directory, f"{profile_id}.json"), 'w') as f:
+                json.dump({
+                    'id': profile_id,
+                    'method': request.method,
+                    'path': request.path,
+                    'route': request.url_rule.rule if request.url_rule else None,
+                    'endpoint': request.endpoint,
+                    'status': response.status_code,
+                    'wall_ms': round(wall_ms, 3),
+                    'backend_ms': round(backend_ms, 3),
+                    'app_ms': round(wall_ms - backend_ms, 3),
+                    'backend_by_table': _backend_breakdown(calls),
+                    'backend_calls': calls,
+                }, f, indent=2)
+            profiles_written.inc(endpoint=request.endpoint)
+            response.headers['X-Profile-Id'] = profile_id
+        except OSError:
+            pass
+        return response
@@ -0,0 +1,174 @@
+# app/pubsub.py
+import itertools
+import json
+import logging
+import os
+import threading
+import uuid
+from collections import deque
+
+from app import metrics
+from app.cache import entity_cache
+
+events_published = metrics.counter("events_published_total", "Events published by topic")
+events_dropped = metrics.counter("events_dropped_total", "Events dropped because a subscriber queue was full")
+subscriber_count = metrics.gauge("events_subscribers", "Open event stream subscriptions")
+logger = logging.getLogger(__name__)
+
+
+class TooManySubscribers(Exception):
+    """Raised when the per-process subscriber limit is reached."""
+
+
+class Subscription:
+    """
+    One open event stream. Events are kept in a bounded deque: a slow
+    client loses the oldest events instead of growing memory without limit.
+    """
+
+    def __init__(self, topics, id_point=None, maxlen=100):
+        self.topics = set(topics)
+        self.id_point = id_point
+        self.queue = deque(maxlen=maxlen)
+        self.ready = threading.Event()
+
+    def matches(self, topic, payload):
+        if topic not in self.topics:
+            return False
+        if self.id_point is not None and topic == "donations":
+            return str(payload.get("id_point")) == str(self.id_point)
+        return True
+
+    def push(self, event):
+        if len(self.queue) == self.queue.maxlen:
+            events_dropped.inc()
+        self.queue.append(event)
+        self.ready.set()
+
+    def drain(self, timeout):
+        """Wait up to `timeout` seconds and return the pending events."""
+        if not self.queue:
+            self.ready.wait(timeout)
+        self.ready.clear()
+        events = []
+        while self.queue:
+            events.append(self.queue.popleft())
+        return events
+
+
+class Broker:
+    """
+    In-process fan-out of change events to open subscriptions.
+    When a shared Redis tier is configured (CACHE_REDIS_URL), events are
+    also relayed through it so subscribers on every worker see them.
+    """
+
+    def __init__(self, max_subscribers=5000, queue_size=100, redis_client=None):
+        self.max_subscribers = max_subscribers
+        self.queue_size = queue_size
+        self.redis = redis_client
+        self.channel = "pd:events"
+        self._origin_id = uuid.uuid4().hex
+        self._subscriptions = set()
+        self._listeners = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._relay_pid = None
+
+    @property
+    def origin(self):
+        # Per process, so forked workers do not ignore each other's events
+        return f"{self._origin_id}:{os.getpid()}"
+
+    def subscribe(self, topics, id_point=None):
+        self._ensure_relay()
+        subscription = Subscription(topics, id_point, self.queue_size)
+        with self._lock:
+            if len(self._subscriptions) >= self.max_subscribers:
+                raise TooManySubscribers()
+            self._subscriptions.add(subscription)
+            subscriber_count.set(len(self._subscriptions))
+        return subscription
+
+    def listen(self, topic, callback):
+        """
+        Call `callback(event_type, payload)` in-process for every event on
+        `topic`, including ones relayed from other workers. Idempotent.
+        """
+        with self._lock:
+            self._listeners.setdefault(topic, set()).add(callback)
+        self._ensure_relay()
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+            subscriber_count.set(len(self._subscriptions))
+
+    def publish(self, topic, event_type, payload):
+        events_published.inc(topic=topic)
+        self._deliver(topic, event_type, payload)
+        if self.redis is not None:
+            try:
+                self.redis.publish(self.channel, json.dumps({
+                    'origin': self.origin,
+                    'topic': topic,
+                    'type': event_type,
+                    'payload': payload,
+                }, default=str))
+            except Exception:
+                pass
+
+    def _deliver(self, topic, event_type, payload):
+        event = (next(self._ids), event_type, payload)
+        with self._lock:
+            subscriptions = [s for s in self._subscriptions if s.matches(topic, payload)]
+            listeners = list(self._listeners.get(topic, ()))
+        for subscription in subscriptions:
+            subscription.push(event)
+        for callback in listeners:
+            try:
+                callback(event_type, payload)
+            except Exception:
+                logger.exception("event listener failed", extra={'topic': topic, 'event_type': event_type})
+
+    def _ensure_relay(self):
+        if self.redis is None or self._relay_pid == os.getpid():
+            return
+        self._relay_pid = os.getpid()
+        threading.Thread(target=self._relay, name="events-relay", daemon=True).start()
+
+    def _relay(self):
+        pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self.channel)
+        for message in pubsub.listen():
+            try:
+                event = json.loads(message["data"])
+            except (TypeError, ValueError):
+                continue
+            if event.get('origin') != self.origin:
+                self._deliver(event['topic'], event['type'], event['payload'])
+
+
+def _build_broker():
+    shared = entity_cache.shared
+    return Broker(
+        max_subscribers=int(os.getenv("EVENTS_MAX_SUBSCRIBERS", "5000")),
+        queue_size=int(os.getenv("EVENTS_QUEUE_SIZE", "100")),
+        redis_client=shared.client if shared is not None else None,
+    )
+
+
+broker = _build_broker()
+
+# Donation fields pushed to subscribers; the QR blob is deliberately left out.
+DONATION_EVENT_FIELDS = ('id', 'date', 'time', 'state', 'id_donor', 'id_point', 'type', 'pending', 'updated_at')
+
+
+def publish_donation(event_type, donation):
+    broker.publish("donations", event_type, {
+        field: donation.get(field) for field in DONATION_EVENT_FIELDS if field in donation
+    })
+
+
+def publish_campaign(event_type, campaign):
+    broker.publish("campaigns", event_type, campaign)
@@ -0,0 +1,160 @@
+# app/qr_sheet.py
+import io
+import multiprocessing
+import os
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+import qrcode
+from PIL import Image, ImageDraw, ImageFont
+
+from app import metrics
+
+# A4 at 150 dpi
+PAGE_SIZE = (1240, 1754)
+MARGIN = 60
+CAPTION_HEIGHT = 40
+MAX_LABELS = int(os.getenv("QR_SHEET_MAX_LABELS", "2000"))
+# 0 renders in the request thread (tests, tiny deployments)
+WORKERS = int(os.getenv("QR_SHEET_WORKERS", str(os.cpu_count() or 1)))
+CHUNK_SIZE = 16
+
+labels_rendered = metrics.counter("qr_labels_rendered_total", "QR labels rendered for label sheets")
+
+
+def render_label(token, size):
+    """
+    Runs in a pool process: one QR code as a 1-bit square of `size` px.
+    Returns raw bytes so nothing has to be PNG-encoded and decoded again.
+    """
+    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_L, box_size=10, border=2)
+    qr.add_data(token)
+    qr.make(fit=True)
+    image = qr.make_image(fill='black', back_color='white').get_image().convert('1')
+    image = image.resize((size, size), Image.NEAREST)
+    return image.tobytes()
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    """One process pool per server process, created on first use (never inherited across fork)."""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            # spawn: forking a threaded server process is not safe
+            _pool = ProcessPoolExecutor(max_workers=WORKERS, mp_context=multiprocessing.get_context("spawn"))
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def _render_all(tokens, size):
+    """Yield rendered labels in order as the pool finishes them."""
+    if WORKERS <= 0:
+        for token in tokens:
+            yield render_label(token, size)
+        return
+    yield from _get_pool().map(render_label, tokens, [size] * len(tokens), chunksize=CHUNK_SIZE)
+
+
+class SheetLayout:
+    def __init__(self, columns=3, rows=4):
+        self.columns = columns
+        self.rows = rows
+        self.cell_width = (PAGE_SIZE[0] - 2 * MARGIN) // columns
+        self.cell_height = (PAGE_SIZE[1] - 2 * MARGIN) // rows
+        self.qr_size = min(self.cell_width, self.cell_height - CAPTION_HEIGHT) - 20
+
+    @property
+    def per_page(self):
+        return self.columns * self.rows
+
+    def origin(self, slot):
+        row, column = divmod(slot, self.columns)
+        return MARGIN + column * self.cell_width, MARGIN + row * self.cell_height
+
+
+def _font():
+    try:
+        return ImageFont.load_default(size=24)
+    except TypeError:
+        return ImageFont.load_default()
+
+
+def pages(labels, layout):
+    """
+    Compose labels into 1-bit page images, yielding each page as soon as
+    it is full. `labels` is a list of (token, caption).
+    """
+    font = _font()
+    size = layout.qr_size
+    page = draw = None
+    for index, raw in enumerate(_render_all([token for token, _ in labels], size)):
+        slot = index % layout.per_page
+        if slot == 0:
+            if page is not None:
+                yield page
+            page = Image.new('1', PAGE_SIZE, 1)
+            draw = ImageDraw.Draw(page)
+
+        x, y = layout.origin(slot)
+        page.paste(Image.frombytes('1', (size, size), raw), (x + (layout.cell_width - size) // 2, y))
+        draw.text((x + layout.cell_width // 2, y + size + 8), labels[index][1], fill=0, font=font, anchor="ma")
+        labels_rendered.inc()
+    if page is not None:
+        yield page
+
+
+def write_pdf(labels, layout, out):
+    """All pages into one PDF (Pillow keeps the 1-bit pages until the file is written)."""
+    page_iter = pages(labels, layout)
+    first = next(page_iter, None)
+    if first is None:
+        return
+    first.save(out, 'PDF', resolution=150, save_all=True, append_images=page_iter)
+
+
+def write_png(labels, layout, out):
+    """One page: a PNG. Several pages: a ZIP of page PNGs, each encoded and released as it is composed."""
+    if len(labels) <= layout.per_page:
+        for page in pages(labels, layout):
+            page.save(out, 'PNG', optimize=False)
+        return 'image/png'
+    with zipfile.ZipFile(out, 'w', zipfile.ZIP_STORED) as archive:
+        for number, page in enumerate(pages(labels, layout), start=1):
+            buffer = io.BytesIO()
+            page.save(buffer, 'PNG')
+            archive.writestr(f"labels-{number:03d}.png", buffer.getvalue())
+    return 'application/zip'
+
+
+def build_sheet(labels, fmt='pdf', columns=3, rows=4):
+    """
+    Render the label sheet into a spooled temporary file (kept in memory
+    up to 8 MB, on disk beyond) and return (file, mimetype).
+    """
+    layout = SheetLayout(columns, rows)
+    out = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+    if fmt == 'pdf':
+        write_pdf(labels, layout, out)
+        mimetype = 'application/pdf'
+    else:
+        mimetype = write_png(labels, layout, out)
+    out.seek(0)
+    return out, mimetype
+
+
+def stream_file(handle, chunk_size=64 * 1024):
+    try:
+        while True:
+            chunk = handle.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        handle.close()
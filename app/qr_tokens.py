@@ -0,0 +1,79 @@
+# app/qr_tokens.py
+import base64
+import hashlib
+import hmac
+import threading
+
+from flask import current_app
+
+from app.cache import LRUCache
+
+TOKEN_VERSION = "PD1"
+
+
+class SigningKeyMissing(RuntimeError):
+    """QR_SIGNING_KEY is not configured: codes are neither issued nor accepted."""
+
+
+def _secret():
+    key = current_app.config.get('QR_SIGNING_KEY')
+    if not key:
+        raise SigningKeyMissing("QR_SIGNING_KEY is not configured")
+    return key.encode()
+
+
+def _signature(message, secret=None):
+    digest = hmac.new(secret or _secret(), message.encode(), hashlib.sha256).digest()
+    # 128 bits is plenty for a printed code and keeps the QR small
+    return base64.urlsafe_b64encode(digest[:16]).decode().rstrip("=")
+
+
+def sign_qr_token(donation_id, id_point):
+    """Build the signed payload printed in a donation's QR code."""
+    message = f"{TOKEN_VERSION}.{donation_id}.{id_point}"
+    return f"{message}.{_signature(message)}"
+
+
+def verify_qr_token(token):
+    """
+    Check a scanned QR payload without touching the database.
+    Returns (donation_id, id_point) as strings, or None if the token is
+    malformed or was not signed with our key. With QR_ACCEPT_LEGACY_IDS,
+    the bare donation ids printed before signed codes are accepted as
+    (donation_id, None) while those codes are still in circulation.
+    Raises SigningKeyMissing when QR_SIGNING_KEY is not set.
+    """
+    if not isinstance(token, str):
+        return None
+    secret = _secret()
+    if token.isdigit() and current_app.config.get('QR_ACCEPT_LEGACY_IDS'):
+        return token, None
+    parts = token.split(".")
+    if len(parts) != 4 or parts[0] != TOKEN_VERSION:
+        return None
+    message = ".".join(parts[:3])
+    if not hmac.compare_digest(_signature(message, secret), parts[3]):
+        return None
+    return parts[1], parts[2]
+
+
+class RedeemedSet:
+    """Bounded in-memory record of recently redeemed donations, for replay protection."""
+
+    def __init__(self, maxsize=100000, ttl=86400):
+        self._cache = LRUCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def claim(self, donation_id):
+        """Mark as redeemed; returns False if it already was."""
+        with self._lock:
+            if self._cache.get(donation_id):
+                return False
+            self._cache.set(donation_id, True)
+            return True
+
+    def release(self, donation_id):
+        self._cache.delete(donation_id)
+
+
+redeemed = RedeemedSet()
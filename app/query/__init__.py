@@ -0,0 +1,50 @@
+from flask import Blueprint, jsonify
+from app.composite import QueryError, resolve
+from app.dataloader import get_loaders
+from app.schemas import parse_body, CompositeQuery
+
+
+query_bp = Blueprint("query", __name__)
+
+
+@query_bp.route("", methods=["POST"])
+def query():
+    """
+    Consulta compuesta: varias entidades relacionadas en una sola petición.
+
+    Request JSON:
+    {
+        "root": "donors" | "donations" | "campaigns" | "donation_points",
+        "ids": [int],
+        "include": {relación: {"include": {...}}, ...}
+    }
+
+    Relaciones:
+    donors: donations, campaigns, stats
+    donations: food, donor, point, campaign
+    campaigns: donations, donors
+    donation_points: donations
+
+    Ejemplo (pantalla del donante):
+    {"root": "donors", "ids": [1], "include": {
+        "donations": {"include": {"food": {}}}, "campaigns": {}, "stats": {}}}
+
+    Cada relación se resuelve con una consulta in_() por nivel para todos
+    los padres a la vez, y las filas ya leídas en la petición se reutilizan.
+    Una consulta que lee más de COMPOSITE_MAX_ROWS filas en total se
+    rechaza con 400.
+    """
+    try:
+        data, error = parse_body(CompositeQuery)
+        if error:
+            return error
+
+        try:
+            rows = resolve(get_loaders(), data.root, data.ids, data.include)
+        except QueryError as e:
+            return jsonify({'error': str(e)}), 400
+
+        return jsonify({data.root: rows}), 200
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,187 @@
+# app/ratelimit.py
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from flask import g, jsonify, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+
+from app import metrics
+
+rejections = metrics.counter("ratelimit_rejections_total", "Requests shed before any backend call, by path and reason")
+in_flight = metrics.gauge("requests_in_flight", "Requests currently admitted")
+
+# Refills in Redis: one hash per bucket, tokens and last refill time.
+# Floats are returned as strings, Redis would truncate Lua numbers.
+_TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+
+def parse_limits(spec):
+    """'/donors/login=10/60,...' -> {'/donors/login': (10, 60.0)} (requests per window in seconds)."""
+    limits = {}
+    for entry in (spec or '').split(','):
+        path, _, limit = entry.partition('=')
+        count, _, window = limit.partition('/')
+        try:
+            count, window = int(count), float(window)
+        except ValueError:
+            continue
+        if path.strip() and count > 0 and window > 0:
+            limits[path.strip()] = (count, window)
+    return limits
+
+
+class LocalBuckets:
+    """
+    Token buckets in this process. Least recently used buckets are dropped
+    past `maxsize`; a dropped bucket comes back full, which only errs on
+    the side of letting a request through.
+    """
+
+    def __init__(self, maxsize=100000):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate):
+        """Take one token; returns seconds until one is available (0 when taken)."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+class RedisBuckets:
+    """Token buckets shared by every worker, on the shared cache tier's Redis (CACHE_REDIS_URL)."""
+
+    def __init__(self, client, prefix="pd:rl:", fallback=None):
+        self.client = client
+        self.prefix = prefix
+        self.script = client.register_script(_TAKE_SCRIPT)
+        self.fallback = fallback or LocalBuckets()
+
+    def take(self, key, capacity, rate):
+        try:
+            allowed, tokens = self.script(keys=[self.prefix + key], args=[capacity, rate, time.time()])
+        except Exception:
+            # Redis unavailable: limit per process rather than not at all
+            return self.fallback.take(key, capacity, rate)
+        return 0.0 if int(allowed) else (1 - float(tokens)) / rate
+
+
+class Admission:
+    """Caps the requests handled at once by this process; the rest are shed immediately."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._active = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            if self._active >= self.limit:
+                return False
+            self._active += 1
+            in_flight.set(self._active)
+            return True
+
+    def release(self):
+        with self._lock:
+            self._active -= 1
+            in_flight.set(self._active)
+
+
+def jwt_identity():
+    """The JWT identity when the request carries a valid token, otherwise None."""
+    try:
+        verify_jwt_in_request(optional=True)
+        return get_jwt_identity()
+    except Exception:
+        return None
+
+
+def client_identity(trust_proxy=False):
+    """The JWT identity when the request carries a valid token, otherwise the client address."""
+    identity = jwt_identity()
+    if identity is not None:
+        return f"user:{identity}"
+    address = request.access_route[0] if trust_proxy and request.access_route else request.remote_addr
+    return f"ip:{address}"
+
+
+def _rejected(status, message, retry_after, reason):
+    rejections.inc(path=request.path, reason=reason)
+    response = jsonify({'error': message})
+    response.status_code = status
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def _build_buckets(store):
+    if store == 'redis':
+        from app.cache import entity_cache
+        if entity_cache.shared is not None:
+            return RedisBuckets(entity_cache.shared.client)
+    return LocalBuckets()
+
+
+def init_app(app):
+    """
+    Shed load before any backend call: per-client token buckets on the
+    routes listed in RATE_LIMITS (429), then a cap on concurrent requests
+    per process, MAX_CONCURRENT_REQUESTS (503). Both answer with
+    Retry-After. Buckets live in the process unless RATE_LIMIT_STORE=redis
+    and the shared cache tier is configured.
+    """
+    limits = parse_limits(app.config.get('RATE_LIMITS'))
+    buckets = _build_buckets(app.config.get('RATE_LIMIT_STORE', 'local'))
+    trust_proxy = app.config.get('RATE_LIMIT_TRUST_PROXY', False)
+    max_concurrent = app.config.get('MAX_CONCURRENT_REQUESTS') or 0
+    admission = Admission(max_concurrent) if max_concurrent > 0 else None
+    exempt = tuple(path for path in app.config.get('ADMISSION_EXEMPT_PATHS', '').split(',') if path)
+
+    @app.before_request
+    def shed_load():
+        limit = limits.get(request.path)
+        if limit is not None and request.method != 'OPTIONS':
+            count, window = limit
+            wait = buckets.take(f"{request.path}:{client_identity(trust_proxy)}", count, count / window)
+            if wait > 0:
+                return _rejected(429, 'Too many requests', wait, 'rate_limit')
+
+        if admission is not None and not request.path.startswith(exempt):
+            if not admission.acquire():
+                return _rejected(503, 'Server busy, retry shortly', 1, 'overload')
+            g.admitted = True
+
+    @app.teardown_request
+    def release_admission(exc):
+        if g.pop('admitted', False):
+            admission.release()
@@ -0,0 +1,208 @@
+# app/resilience.py
+import os
+import threading
+import time
+
+import httpx
+from flask import jsonify
+
+from app import metrics
+from app.cache import LRUCache, refilling
+
+breaker_state = metrics.gauge("backend_circuit_open", "1 while the backend circuit breaker is open")
+breaker_rejections = metrics.counter("backend_circuit_rejections_total", "Backend calls rejected by the open circuit")
+stale_responses = metrics.counter("stale_responses_total", "Read responses served from last known good data")
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the backend while the circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Classic closed / open / half-open breaker.
+    After `failure_threshold` consecutive failures the circuit opens and
+    every call fails fast for `reset_timeout` seconds; then one probe call
+    is let through and its outcome decides whether to close again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            # Let one probe through per reset_timeout while open or half-open,
+            # so a probe that never reports back cannot wedge the breaker.
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._opened_at = time.monotonic()
+                return True
+            return False
+
+    def is_open(self):
+        return self.state != self.CLOSED and time.monotonic() - self._opened_at < self.reset_timeout
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self.state = self.CLOSED
+        breaker_state.set(0)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                breaker_state.set(1)
+
+
+# Callables notified after every backend call with (request, seconds, status);
+# status is None when the call raised. Used by the profiler.
+call_listeners = []
+
+
+def _notify(request, elapsed, status):
+    for listener in call_listeners:
+        try:
+            listener(request, elapsed, status)
+        except Exception:
+            pass
+
+
+class BreakerTransport(httpx.BaseTransport):
+    """httpx transport that routes every request through a circuit breaker."""
+
+    def __init__(self, transport, breaker):
+        self.transport = transport
+        self.breaker = breaker
+
+    def handle_request(self, request):
+        if not self.breaker.allow():
+            breaker_rejections.inc()
+            raise CircuitOpenError("Backend unavailable (circuit open)")
+        started = time.perf_counter()
+        try:
+            response = self.transport.handle_request(request)
+        except httpx.TransportError:
+            self.breaker.record_failure()
+            _notify(request, time.perf_counter() - started, None)
+            raise
+        _notify(request, time.perf_counter() - started, response.status_code)
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    def close(self):
+        self.transport.close()
+
+
+data_breaker = CircuitBreaker(
+    failure_threshold=int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5")),
+    reset_timeout=float(os.getenv("BREAKER_RESET_TIMEOUT", "30")),
+)
+
+# Seconds a read result is served without touching the backend.
+STALE_FRESH_TTL = float(os.getenv("STALE_FRESH_TTL", "5"))
+# Window after that in which the old result is served while a refresh runs.
+STALE_WHILE_REVALIDATE = float(os.getenv("STALE_WHILE_REVALIDATE", "30"))
+# How long the last known good result may be served when the backend fails.
+STALE_IF_ERROR = float(os.getenv("STALE_IF_ERROR", "86400"))
+
+_last_good = LRUCache(maxsize=int(os.getenv("STALE_MAXSIZE", "1024")), ttl=STALE_IF_ERROR)
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+
+def _store(key, data):
+    _last_good.set(key, (time.time(), data))
+
+
+def _refresh_in_background(key, loader):
+    with _refreshing_lock:
+        if key in _refreshing:
+            return
+        _refreshing.add(key)
+
+    def run():
+        try:
+            with refilling():
+                _store(key, loader())
+        except Exception:
+            pass
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(key)
+
+    threading.Thread(target=run, name=f"revalidate:{key}", daemon=True).start()
+
+
+def stale_read(key, loader):
+    """
+    Read `key` with a stale-while-revalidate / stale-if-error policy.
+    Returns (data, age) where age is None for fresh data and the age of
+    the served copy in seconds when it is stale.
+    """
+    entry = _last_good.get(key)
+    if entry is not None:
+        fetched_at, data = entry
+        age = time.time() - fetched_at
+        if age <= STALE_FRESH_TTL:
+            return data, None
+        if data_breaker.is_open():
+            stale_responses.inc(reason="circuit_open")
+            return data, age
+        if age <= STALE_FRESH_TTL + STALE_WHILE_REVALIDATE:
+            _refresh_in_background(key, loader)
+            stale_responses.inc(reason="revalidate")
+            return data, age
+
+    try:
+        with refilling():
+            data = loader()
+    except Exception:
+        if entry is None:
+            raise
+        stale_responses.inc(reason="error")
+        return entry[1], time.time() - entry[0]
+
+    _store(key, data)
+    return data, None
+
+
+def mark_stale(prefix):
+    """
+    Force the next read of every key starting with `prefix` to go to the
+    backend, while keeping the old copy as a stale-if-error fallback.
+    Called by write handlers so their changes are visible immediately.
+    """
+    expired_at = time.time() - STALE_FRESH_TTL - STALE_WHILE_REVALIDATE - 1
+    for key in _last_good.keys():
+        if key.startswith(prefix):
+            entry = _last_good.get(key)
+            if entry is not None:
+                _last_good.set(key, (min(entry[0], expired_at), entry[1]))
+
+
+def stale_response(payload, age, status=200):
+    """jsonify `payload`, flagging it as stale when `age` is not None."""
+    response = jsonify(payload)
+    response.status_code = status
+    if age is not None:
+        response.headers['Age'] = str(int(age))
+        response.headers['Warning'] = '110 - "Response is Stale"'
+        response.headers['X-Data-Stale'] = 'true'
+    return response
@@ -0,0 +1,210 @@
+# app/schemas.py
+from datetime import date as Date, time as Time
+from typing import Dict, List, Optional, Union
+
+from flask import jsonify, request
+from pydantic import BaseModel, ConfigDict, ValidationError
+
+
+class Schema(BaseModel):
+    model_config = ConfigDict(extra='ignore')
+
+
+# Donors
+
+class DonorCreate(Schema):
+    name: str
+    email: str
+    phone: str
+    password: str
+
+
+class DonorLogin(Schema):
+    email: str
+    password: str
+
+
+class DonorUpdate(Schema):
+    id: int
+    name: Optional[str] = None
+    email: Optional[str] = None
+    phone: Optional[str] = None
+
+
+class DonorImport(Schema):
+    """CSV import row; donors imported without a password cannot log in until one is set."""
+    name: str
+    email: str
+    phone: str
+    password: Optional[str] = None
+
+
+class DuplicateGroup(Schema):
+    canonical_id: int
+    duplicate_ids: List[int]
+
+
+class DonorMerge(Schema):
+    groups: List[DuplicateGroup] = []
+    all: bool = False
+
+
+class DonorOut(Schema):
+    """Public view of a donor row; the password hash is never serialized."""
+    id: int
+    name: Optional[str] = None
+    email: Optional[str] = None
+    phone: Optional[str] = None
+    created_at: Optional[str] = None
+    updated_at: Optional[str] = None
+
+
+# Donations
+
+class FoodIn(Schema):
+    name: str
+    quantity: Union[int, float]
+    category: str
+    perishable: bool
+
+
+class DonationCreate(Schema):
+    id: int
+    date: Date
+    time: Time
+    state: str
+    id_donor: int
+    id_point: int
+    type: str
+    pending: bool
+    id_campaign: Optional[int] = None
+    foods: List[FoodIn]
+
+
+class DonationUpdate(Schema):
+    id: int
+    date: Optional[Date] = None
+    time: Optional[Time] = None
+    state: Optional[str] = None
+    id_donor: Optional[int] = None
+    id_calendar: Optional[int] = None
+    id_point: Optional[int] = None
+    id_campaign: Optional[int] = None
+    type: Optional[str] = None
+    pending: Optional[bool] = None
+
+
+class DonationRedeem(Schema):
+    token: str
+    id_point: Optional[int] = None
+    state: Optional[str] = None
+
+
+class QrSheetRequest(Schema):
+    ids: Optional[List[int]] = None
+    id_point: Optional[int] = None
+    pending: bool = True
+    format: str = 'pdf'
+    columns: int = 3
+    rows: int = 4
+
+
+class ById(Schema):
+    id: int
+
+
+# Campaigns
+
+class CampaignCreate(Schema):
+    name: str
+    start_date: Date
+    end_date: Date
+    active: bool = True
+    address: Optional[str] = None
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+    description: Optional[str] = None
+
+
+class CampaignUpdate(Schema):
+    name: Optional[str] = None
+    start_date: Optional[Date] = None
+    end_date: Optional[Date] = None
+    active: Optional[bool] = None
+    description: Optional[str] = None
+    address: Optional[str] = None
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+
+
+class CampaignDonorIn(Schema):
+    campaign_id: int
+    donor_id: int
+
+
+# Donation points
+
+class DonationPointCreate(Schema):
+    name: str
+    address: str
+    lat: float
+    lon: float
+
+
+class DonationPointUpdate(Schema):
+    name: Optional[str] = None
+    address: Optional[str] = None
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+
+
+# Pickup routes
+
+class RoutePlanRequest(Schema):
+    depot_lat: float
+    depot_lon: float
+    vehicles: int = 1
+
+
+# Composite queries
+
+class QueryNode(Schema):
+    include: Dict[str, 'QueryNode'] = {}
+
+
+class CompositeQuery(Schema):
+    root: str
+    ids: List[int]
+    include: Dict[str, QueryNode] = {}
+
+
+def error_message(error):
+    field = ".".join(str(part) for part in error['loc'])
+    if error['type'] == 'missing':
+        return f"Missing required field: {field}"
+    if error['type'] == 'json_invalid' or not field:
+        return "Invalid JSON body"
+    return f"Invalid value for field {field}: {error['msg']}"
+
+
+def parse_body(schema):
+    """
+    Decode and validate the raw request body straight into `schema`
+    (pydantic-core parses the bytes, no intermediate dict).
+    Returns (obj, None) on success or (None, error_response) so handlers
+    can reject bad payloads before any backend call.
+    """
+    try:
+        return schema.model_validate_json(request.get_data() or b'{}'), None
+    except ValidationError as e:
+        errors = e.errors(include_url=False, include_context=False, include_input=False)
+        response = jsonify({
+            'error': error_message(errors[0]),
+            'details': [error_message(error) for error in errors]
+        })
+        return None, (response, 400)
+
+
+def dump(obj, **kwargs):
+    """JSON-ready dict of a schema instance (dates as ISO strings)."""
+    return obj.model_dump(mode='json', **kwargs)
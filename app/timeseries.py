@@ -0,0 +1,195 @@
+# app/timeseries.py
+import os
+from datetime import date, timedelta
+
+import numpy as np
+
+from app import archive, metrics
+from app.cache import LRUCache
+from app.db import select_in
+
+CHUNK_SIZE = int(os.getenv("ANALYTICS_CHUNK_SIZE", "1000"))
+MAX_DAYS = int(os.getenv("ANALYTICS_MAX_DAYS", "731"))
+GRANULARITIES = {'day': 1, 'week': 7}
+
+analytics_cache = LRUCache(
+    maxsize=int(os.getenv("ANALYTICS_CACHE_SIZE", "256")),
+    ttl=float(os.getenv("ANALYTICS_CACHE_TTL", "300")),
+)
+analytics_requests = metrics.counter("analytics_timeseries_total", "Time-series requests by cache result")
+
+
+class DonationColumns:
+    """
+    Column arrays for the donations in a date range and their food rows.
+    Food rows point at their donation by position (`food_donation`), so
+    every aggregate is a bincount over integer codes.
+    """
+
+    def __init__(self, ids, days, points, food_donation, quantity, category, perishable, categories):
+        self.ids = ids                        # int64, sorted
+        self.days = days                      # datetime64[D]
+        self.points = points                  # int64 (-1 when missing)
+        self.food_donation = food_donation    # int64 index into ids
+        self.quantity = quantity              # float64, hundredths of a kg
+        self.category = category              # int64 code into categories
+        self.perishable = perishable          # bool
+        self.categories = categories          # list of category names
+
+
+def _select_chunks(supabase, start, end, id_point=None):
+    """Donations in [start, end], read in keyset pages of CHUNK_SIZE ordered by id."""
+    donations_table, _ = archive.tables_for_range(start)
+    after_id = None
+    while True:
+        query = supabase.table(donations_table) \
+            .select("id,date,id_point") \
+            .gte('date', start.isoformat()) \
+            .lte('date', end.isoformat())
+        if id_point is not None:
+            query = query.eq('id_point', id_point)
+        if after_id is not None:
+            query = query.gt('id', after_id)
+
+        rows = query.order('id').limit(CHUNK_SIZE).execute().data
+        if rows:
+            yield rows
+        if len(rows) < CHUNK_SIZE:
+            return
+        after_id = rows[-1]['id']
+
+
+def load_columns(supabase, start, end, id_point=None):
+    """Load the donation and food columns for the range into NumPy arrays, chunk by chunk."""
+    _, food_table = archive.tables_for_range(start)
+    ids, days, points = [], [], []
+    food_ids, quantity, category_names, perishable = [], [], [], []
+
+    for rows in _select_chunks(supabase, start, end, id_point):
+        chunk_ids = [row['id'] for row in rows]
+        ids.append(np.fromiter(chunk_ids, dtype=np.int64, count=len(rows)))
+        days.append(np.array([row['date'][:10] for row in rows], dtype='datetime64[D]'))
+        points.append(np.fromiter((row.get('id_point') or -1 for row in rows), dtype=np.int64, count=len(rows)))
+
+        food = select_in(supabase, food_table, "id_donation,quantity,category,perishable", 'id_donation', chunk_ids)
+        food_ids.append(np.fromiter((item['id_donation'] for item in food), dtype=np.int64, count=len(food)))
+        quantity.append(np.fromiter((item.get('quantity') or 0 for item in food), dtype=np.float64, count=len(food)))
+        perishable.append(np.fromiter((bool(item.get('perishable')) for item in food), dtype=bool, count=len(food)))
+        category_names.extend(item.get('category') or 'uncategorized' for item in food)
+
+    ids = np.concatenate(ids) if ids else np.empty(0, dtype=np.int64)
+    order = np.argsort(ids, kind='stable')
+    ids = ids[order]
+    days = (np.concatenate(days) if days else np.empty(0, dtype='datetime64[D]'))[order]
+    points = (np.concatenate(points) if points else np.empty(0, dtype=np.int64))[order]
+
+    food_ids = np.concatenate(food_ids) if food_ids else np.empty(0, dtype=np.int64)
+    categories, category = np.unique(np.array(category_names, dtype=object), return_inverse=True) \
+        if category_names else (np.empty(0, dtype=object), np.empty(0, dtype=np.int64))
+
+    return DonationColumns(
+        ids=ids,
+        days=days,
+        points=points,
+        food_donation=np.searchsorted(ids, food_ids),
+        quantity=np.concatenate(quantity) if quantity else np.empty(0),
+        category=category.astype(np.int64).reshape(-1),
+        perishable=np.concatenate(perishable) if perishable else np.empty(0, dtype=bool),
+        categories=[str(name) for name in categories],
+    )
+
+
+def bucket_starts(start, end, granularity):
+    """First day of every bucket covering [start, end]; weeks start on Monday."""
+    step = GRANULARITIES[granularity]
+    first = start - timedelta(days=start.weekday()) if granularity == 'week' else start
+    return np.arange(np.datetime64(first), np.datetime64(end) + 1, step).astype('datetime64[D]')
+
+
+def aggregate(columns, start, end, granularity='day'):
+    """Bucketed totals: donations, kg, perishable ratio, kg per category, and the same per donation point."""
+    starts = bucket_starts(start, end, granularity)
+    n_buckets = len(starts)
+    step = GRANULARITIES[granularity]
+
+    donation_bucket = ((columns.days - starts[0]).astype(np.int64) // step) if len(columns.ids) else \
+        np.empty(0, dtype=np.int64)
+    # Rows outside the range (e.g. from a racing write) are ignored
+    in_range = (donation_bucket >= 0) & (donation_bucket < n_buckets)
+    food_in_range = in_range[columns.food_donation]
+    food_bucket = donation_bucket[columns.food_donation][food_in_range]
+    food_category = columns.category[food_in_range]
+    kg = columns.quantity[food_in_range] / 100
+    perishable = columns.perishable[food_in_range]
+    points = columns.points[in_range]
+    food_points = columns.points[columns.food_donation][food_in_range]
+    donation_bucket = donation_bucket[in_range]
+
+    donations = np.bincount(donation_bucket, minlength=n_buckets)
+    total_kg = np.bincount(food_bucket, weights=kg, minlength=n_buckets)
+    perishable_kg = np.bincount(food_bucket, weights=kg * perishable, minlength=n_buckets)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        perishable_ratio = np.where(total_kg > 0, perishable_kg / total_kg, 0.0)
+
+    n_categories = len(columns.categories)
+    by_category = np.bincount(food_category * n_buckets + food_bucket, weights=kg,
+                              minlength=n_categories * n_buckets).reshape(n_categories, n_buckets)
+
+    # Per point: one bincount over (point, category, bucket) codes
+    point_ids, point_code = np.unique(np.concatenate([points, food_points]), return_inverse=True)
+    point_code, food_point = point_code[:len(points)], point_code[len(points):]
+    n_points = len(point_ids)
+    point_donations = np.bincount(point_code * n_buckets + donation_bucket,
+                                  minlength=n_points * n_buckets).reshape(n_points, n_buckets)
+    point_categories = np.bincount((food_point * n_categories + food_category) * n_buckets + food_bucket,
+                                   weights=kg, minlength=n_points * n_categories * n_buckets) \
+        .reshape(n_points, n_categories, n_buckets)
+
+    def series(values):
+        return np.round(values, 2).tolist()
+
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'granularity': granularity,
+        'buckets': [str(day) for day in starts],
+        'donations': donations.tolist(),
+        'kg': series(total_kg),
+        'perishable_ratio': series(perishable_ratio),
+        'categories': {name: series(by_category[i]) for i, name in enumerate(columns.categories)},
+        'points': {
+            str(point_id) if point_id >= 0 else 'unassigned': {
+                'donations': point_donations[p].tolist(),
+                'kg': series(point_categories[p].sum(axis=0)),
+                'categories': {
+                    name: series(point_categories[p, i])
+                    for i, name in enumerate(columns.categories) if point_categories[p, i].any()
+                },
+            }
+            for p, point_id in enumerate(point_ids.tolist())
+        },
+    }
+
+
+def timeseries(supabase, start, end, granularity='day', id_point=None):
+    """Cached bucketed aggregates for the range; the cache key is the range, granularity and point."""
+    key = (start.isoformat(), end.isoformat(), granularity, id_point)
+    result = analytics_cache.get(key)
+    if result is not None:
+        analytics_requests.inc(cache="hit")
+        return result
+
+    analytics_requests.inc(cache="miss")
+    result = aggregate(load_columns(supabase, start, end, id_point), start, end, granularity)
+    analytics_cache.set(key, result)
+    return result
+
+
+def parse_range(start, end):
+    """Validate ISO dates; returns (start, end) as dates or raises ValueError."""
+    start, end = date.fromisoformat(start), date.fromisoformat(end)
+    if start > end:
+        raise ValueError("start_date must be on or before end_date")
+    if (end - start).days >= MAX_DAYS:
+        raise ValueError(f"Date range is limited to {MAX_DAYS} days")
+    return start, end
@@ -0,0 +1,29 @@
+# app/warmup.py
+import os
+import time
+
+from app.health import state
+
+# Read endpoints whose caches are primed before the app takes traffic
+DEFAULT_WARMUP_PATHS = "/campaigns/active,/campaigns/list,/donation_points/list"
+
+
+def warmup(app):
+    """
+    Prime the entity and last-known-good caches by running the hot read
+    endpoints once, then mark the app ready. Backend failures are
+    tolerated: the app still starts, readiness will report the backend.
+    """
+    state['ready'] = False
+    started = time.perf_counter()
+    paths = [p for p in os.getenv("WARMUP_PATHS", DEFAULT_WARMUP_PATHS).split(",") if p]
+
+    client = app.test_client()
+    for path in paths:
+        try:
+            client.get(path)
+        except Exception:
+            pass
+
+    state['warmup_seconds'] = round(time.perf_counter() - started, 3)
+    state['ready'] = True
@@ -7,15 +7,32 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///app.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'jwt-secret-key')
+    QR_SIGNING_KEY = os.environ.get('QR_SIGNING_KEY')
+    # Transition only: also redeem QR codes that hold a bare, unsigned donation id
+    QR_ACCEPT_LEGACY_IDS = os.environ.get('QR_ACCEPT_LEGACY_IDS', 'false').lower() == 'true'
     GOOGLE_CLIENT_ID = os.environ.get('GOOGLE_CLIENT_ID')
     GOOGLE_CLIENT_SECRET = os.environ.get('GOOGLE_CLIENT_SECRET')
     ODOO_URL = os.environ.get('ODOO_URL', 'http://localhost:8069')
     ODOO_DB = os.environ.get('ODOO_DB', 'mydb')
+    PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN')
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+    PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    LOG_SAMPLE_RATES = os.environ.get('LOG_SAMPLE_RATES', '')
+    LOG_MAX_FIELD_LENGTH = int(os.environ.get('LOG_MAX_FIELD_LENGTH', '512'))
+    LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', '10000'))
+    # path=requests/seconds per client (JWT identity, else address)
+    RATE_LIMITS = os.environ.get('RATE_LIMITS', '/donors/login=10/60,/donors/create=10/60,/donations/create=60/60')
+    RATE_LIMIT_STORE = os.environ.get('RATE_LIMIT_STORE', 'local')
+    RATE_LIMIT_TRUST_PROXY = os.environ.get('RATE_LIMIT_TRUST_PROXY', 'false').lower() == 'true'
+    MAX_CONCURRENT_REQUESTS = int(os.environ.get('MAX_CONCURRENT_REQUESTS', '64'))
+    ADMISSION_EXEMPT_PATHS = os.environ.get('ADMISSION_EXEMPT_PATHS', '/health,/metrics,/events')
 
 class TestConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     JWT_SECRET_KEY = 'test-secret-key'
+    QR_SIGNING_KEY = 'test-qr-signing-key'
     GOOGLE_CLIENT_ID = 'test-client-id'
     GOOGLE_CLIENT_SECRET = 'test-client-secret'
     WTF_CSRF_ENABLED = False
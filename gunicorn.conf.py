@@ -0,0 +1,37 @@
+# gunicorn.conf.py
+import multiprocessing
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+
+# gthread for the JSON API; /events only streams with gevent workers
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", "1000"))
+
+# Import the app (and run warmup) once in the master so workers fork warm.
+# gevent has to monkey-patch before the app is imported, so no preload there.
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true" and worker_class != "gevent"
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "0"))
+
+# The app writes its own structured access log; set GUNICORN_ACCESSLOG
+# ("-" for stdout) to also get gunicorn's
+accesslog = os.getenv("GUNICORN_ACCESSLOG") or None
+
+
+def post_fork(server, worker):
+    # The Supabase client is per process anyway; drop the master's copy
+    # explicitly so no pooled connection crosses the fork.
+    from app.db import supabase
+    supabase.reset()
+
+    # /events refuses to stream unless the workers can hold idle
+    # connections (gevent) and reach each other (Redis relay)
+    from app.events import configure_workers
+    configure_workers(server.cfg.worker_class_str, server.cfg.workers)
@@ -0,0 +1,22 @@
+-- Change tracking for incremental sync (/donations/changes).
+-- The API also sets updated_at itself; the trigger covers writes made
+-- outside of it (dashboard edits, SQL scripts).
+
+alter table donations
+    add column if not exists updated_at timestamptz not null default now();
+
+create index if not exists donations_updated_at_id_idx
+    on donations (updated_at, id);
+
+create or replace function donations_touch_updated_at()
+returns trigger as $$
+begin
+    new.updated_at = now();
+    return new;
+end;
+$$ language plpgsql;
+
+drop trigger if exists donations_touch_updated_at on donations;
+create trigger donations_touch_updated_at
+    before update on donations
+    for each row execute function donations_touch_updated_at();
@@ -0,0 +1,31 @@
+-- Trigram indexes and ranked search function for /donors/search.
+-- Both the prefix (LIKE 'q%') and fuzzy (%) predicates are served by the
+-- GIN indexes, so a keystroke never scans the donors table.
+
+create extension if not exists pg_trgm;
+
+create index if not exists donors_name_trgm_idx
+    on donors using gin (lower(name) gin_trgm_ops);
+
+create index if not exists donors_email_trgm_idx
+    on donors using gin (lower(email) gin_trgm_ops);
+
+create or replace function search_donors(q text, k int default 10)
+returns table (id bigint, name text, email text, phone text, score real)
+language sql stable as $$
+    with term as (
+        select lower(q) as t,
+               replace(replace(replace(lower(q), '\', '\\'), '%', '\%'), '_', '\_') || '%' as prefix
+    )
+    select d.id::bigint, d.name::text, d.email::text, d.phone::text,
+           (greatest(similarity(lower(d.name), term.t), similarity(lower(d.email), term.t))
+            + case when lower(d.name) like term.prefix or lower(d.email) like term.prefix
+                   then 1 else 0 end)::real as score
+    from donors d, term
+    where lower(d.name) like term.prefix
+       or lower(d.email) like term.prefix
+       or lower(d.name) % term.t
+       or lower(d.email) % term.t
+    order by score desc, d.id
+    limit k;
+$$;
@@ -0,0 +1,53 @@
+-- Grouped aggregates for /campaigns/<id>/dashboard.
+-- One round trip returns the enrolled-donor count, donation totals and
+-- kg per food category and per day; the rows never leave the database.
+-- Quantities are stored in hundredths of a kg (see /donors/stats).
+
+alter table donations add column if not exists id_campaign bigint references campaigns (id);
+
+create index if not exists donations_id_campaign_idx on donations (id_campaign, date);
+create index if not exists food_id_donation_idx on food (id_donation);
+create index if not exists campaign_donors_campaign_id_idx on campaign_donors (campaign_id);
+
+create or replace function campaign_dashboard(p_campaign_id bigint)
+returns json
+language sql stable as $$
+    with campaign_donations as (
+        select id, id_donor, date, pending
+        from donations
+        where id_campaign = p_campaign_id
+    ),
+    campaign_food as (
+        select d.date, f.category, f.quantity, f.perishable
+        from campaign_donations d
+        join food f on f.id_donation = d.id
+    )
+    select json_build_object(
+        'enrolled_donors', (select count(*) from campaign_donors where campaign_id = p_campaign_id),
+        'donations', (select count(*) from campaign_donations),
+        'pending_donations', (select count(*) from campaign_donations where pending),
+        'donating_donors', (select count(distinct id_donor) from campaign_donations),
+        'total_kg', (select coalesce(sum(quantity), 0) / 100.0 from campaign_food),
+        'by_category', coalesce((
+            select json_agg(c order by c.kg desc)
+            from (
+                select category, count(*) as items,
+                       sum(quantity) / 100.0 as kg,
+                       sum(case when perishable then quantity else 0 end) / 100.0 as perishable_kg
+                from campaign_food
+                group by category
+            ) c
+        ), '[]'::json),
+        'by_day', coalesce((
+            select json_agg(d order by d.day)
+            from (
+                select cd.date as day,
+                       count(distinct cd.id) as donations,
+                       coalesce(sum(f.quantity), 0) / 100.0 as kg
+                from campaign_donations cd
+                left join food f on f.id_donation = cd.id
+                group by cd.date
+            ) d
+        ), '[]'::json)
+    );
+$$;
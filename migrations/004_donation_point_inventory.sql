@@ -0,0 +1,100 @@
+-- Running inventory per donation point and food category.
+-- A point holds the food of its pending donations (dropped off, not yet
+-- picked up). Triggers keep the ledger in step with every write, from
+-- the API or not, in the same transaction; /donation_points/<id>/inventory
+-- reads it in O(categories). `flask inventory-reconcile` rebuilds it
+-- from donations and food if it ever drifts.
+-- Quantities are in the same units as food.quantity (hundredths of a kg).
+
+create table if not exists donation_point_inventory (
+    id_point bigint not null,
+    category text not null,
+    items integer not null default 0,
+    quantity numeric not null default 0,
+    updated_at timestamptz not null default now(),
+    primary key (id_point, category)
+);
+
+create or replace function inventory_apply(p_point bigint, p_category text, p_items integer, p_quantity numeric)
+returns void
+language sql as $$
+    insert into donation_point_inventory as inv (id_point, category, items, quantity)
+    values (p_point, p_category, p_items, p_quantity)
+    on conflict (id_point, category) do update
+        set items = inv.items + excluded.items,
+            quantity = inv.quantity + excluded.quantity,
+            updated_at = now();
+$$;
+
+-- Food added to / removed from a pending donation
+create or replace function inventory_food_changed()
+returns trigger as $$
+declare
+    d record;
+begin
+    if tg_op in ('UPDATE', 'DELETE') then
+        select id_point, pending into d from donations where id = old.id_donation;
+        if found and d.pending and d.id_point is not null then
+            perform inventory_apply(d.id_point, coalesce(old.category, 'uncategorized'), -1, -coalesce(old.quantity, 0));
+        end if;
+    end if;
+    if tg_op in ('INSERT', 'UPDATE') then
+        select id_point, pending into d from donations where id = new.id_donation;
+        if found and d.pending and d.id_point is not null then
+            perform inventory_apply(d.id_point, coalesce(new.category, 'uncategorized'), 1, coalesce(new.quantity, 0));
+        end if;
+    end if;
+    return null;
+end;
+$$ language plpgsql;
+
+drop trigger if exists inventory_food_changed on food;
+create trigger inventory_food_changed
+    after insert or update or delete on food
+    for each row execute function inventory_food_changed();
+
+-- Donation resolved, reopened, moved to another point or deleted.
+-- On delete the donation's food is subtracted here; food rows removed
+-- afterwards by a cascade no longer find their donation and are skipped.
+create or replace function inventory_donation_changed()
+returns trigger as $$
+declare
+    f record;
+begin
+    if tg_op = 'UPDATE'
+       and old.pending is not distinct from new.pending
+       and old.id_point is not distinct from new.id_point then
+        return null;
+    end if;
+
+    for f in
+        select coalesce(category, 'uncategorized') as category, count(*)::integer as items,
+               coalesce(sum(quantity), 0) as quantity
+        from food where id_donation = old.id
+        group by 1
+    loop
+        if old.pending and old.id_point is not null then
+            perform inventory_apply(old.id_point, f.category, -f.items, -f.quantity);
+        end if;
+        if tg_op = 'UPDATE' and new.pending and new.id_point is not null then
+            perform inventory_apply(new.id_point, f.category, f.items, f.quantity);
+        end if;
+    end loop;
+
+    -- A before-delete trigger must return the row or the delete is skipped
+    if tg_op = 'DELETE' then
+        return old;
+    end if;
+    return null;
+end;
+$$ language plpgsql;
+
+drop trigger if exists inventory_donation_updated on donations;
+create trigger inventory_donation_updated
+    after update of pending, id_point on donations
+    for each row execute function inventory_donation_changed();
+
+drop trigger if exists inventory_donation_deleted on donations;
+create trigger inventory_donation_deleted
+    before delete on donations
+    for each row execute function inventory_donation_changed();
@@ -0,0 +1,15 @@
+-- Persisted donor totals behind the in-memory leaderboards (app/leaderboard.py).
+-- scope is 'global' or 'campaign:<id>'; quantity is in food units
+-- (hundredths of a kg). Workers upsert the totals that changed every
+-- LEADERBOARD_PERSIST_SECONDS and load the table on start;
+-- `flask leaderboard-rebuild` recomputes it from donations and food.
+
+create table if not exists donor_leaderboard (
+    scope text not null,
+    donor_id bigint not null,
+    quantity numeric not null default 0,
+    updated_at timestamptz not null default now(),
+    primary key (scope, donor_id)
+);
+
+create index if not exists donations_id_donor_idx on donations (id_donor);
@@ -0,0 +1,15 @@
+-- Natural keys for CSV bulk import (app/bulk_import.py), which upserts
+-- with ON CONFLICT DO NOTHING on them so re-running an import is safe.
+-- Merge existing duplicate donors first (`flask donors-dedup --merge`),
+-- otherwise the donors constraint cannot be created.
+
+do $$
+begin
+    if not exists (select 1 from pg_constraint where conname = 'donors_email_key') then
+        alter table donors add constraint donors_email_key unique (email);
+    end if;
+    if not exists (select 1 from pg_constraint where conname = 'donation_points_name_address_key') then
+        alter table donation_points add constraint donation_points_name_address_key unique (name, address);
+    end if;
+end;
+$$;
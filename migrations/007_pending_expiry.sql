@@ -0,0 +1,8 @@
+-- Expiry sweeper (app/expiry.py): overdue pending donations are found by
+-- type and scheduled date. The partial index only covers the pending set,
+-- which the sweeper keeps small, so it stays cheap as donations grow.
+-- Expired donations keep their row: pending = false, state = 'expired'.
+
+create index if not exists donations_pending_type_date_idx
+    on donations (type, date, id)
+    where pending;
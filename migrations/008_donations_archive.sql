@@ -0,0 +1,55 @@
+-- Hot/archive split for donations and food (app/archive.py).
+-- Closed donations (pending = false) older than the archive horizon are
+-- moved, with their food, into donations_archive / food_archive by
+-- `flask donations-archive`, so the API's default queries only scan the
+-- recent rows. donations_all / food_all read both tiers and back the
+-- `include_archived=true` list option, analytics and leaderboard rebuilds.
+-- The archive tables mirror the hot ones column for column: add any new
+-- donations/food column to both.
+
+create table if not exists donations_archive (like donations including all);
+create table if not exists food_archive (like food including all);
+
+create index if not exists donations_archive_id_donor_date_idx on donations_archive (id_donor, date);
+create index if not exists donations_archive_date_idx on donations_archive (date);
+create index if not exists food_archive_id_donation_idx on food_archive (id_donation);
+create index if not exists donations_closed_date_idx on donations (date, id) where not pending;
+
+create or replace view donations_all as
+    select * from donations
+    union all
+    select * from donations_archive;
+
+create or replace view food_all as
+    select * from food
+    union all
+    select * from food_archive;
+
+-- Move up to p_limit closed donations dated before p_before, and their
+-- food, in one transaction. Closed donations hold no inventory, so the
+-- inventory triggers leave the ledger untouched. Returns the number moved.
+create or replace function archive_donations(p_before date, p_limit integer)
+returns integer
+language plpgsql as $$
+declare
+    moved bigint[];
+begin
+    select array_agg(id) into moved from (
+        select id from donations
+        where not pending and date < p_before
+        order by id
+        limit p_limit
+        for update skip locked
+    ) batch;
+
+    if moved is null then
+        return 0;
+    end if;
+
+    insert into food_archive select * from food where id_donation = any(moved);
+    insert into donations_archive select * from donations where id = any(moved);
+    delete from food where id_donation = any(moved);
+    delete from donations where id = any(moved);
+    return cardinality(moved);
+end;
+$$;
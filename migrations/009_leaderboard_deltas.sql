@@ -0,0 +1,17 @@
+-- Workers add the deltas they recorded to donor_leaderboard instead of
+-- writing the totals they hold in memory, so concurrent workers never
+-- overwrite each other (app/leaderboard.py). p_deltas is a JSON array of
+-- {scope, donor_id, quantity} with at most one entry per (scope, donor_id).
+-- Deltas for donors that no longer exist (merged, deleted) are dropped.
+
+create or replace function leaderboard_add(p_deltas jsonb)
+returns void
+language sql as $$
+    insert into donor_leaderboard as lb (scope, donor_id, quantity, updated_at)
+    select d.scope, d.donor_id, d.quantity, now()
+    from jsonb_to_recordset(p_deltas) as d(scope text, donor_id bigint, quantity numeric)
+    where exists (select 1 from donors where donors.id = d.donor_id)
+    on conflict (scope, donor_id) do update
+        set quantity = lb.quantity + excluded.quantity,
+            updated_at = now();
+$$;
@@ -0,0 +1,59 @@
+-- Donor merge in one transaction (app/dedup.py, `flask donors-dedup
+-- --merge`, POST /donors/merge). Re-pointing the duplicates' donations
+-- (hot and archived) and campaign enrolments, moving their leaderboard
+-- totals and deleting them either all happens or none of it does, so a
+-- failure half way can no longer leave donations pointing at deleted
+-- donors or a donor enrolled twice in a campaign.
+
+create or replace function merge_donors(p_canonical bigint, p_duplicates bigint[])
+returns json
+language plpgsql as $$
+declare
+    moved_donations bigint;
+    moved_archived bigint;
+    moved_enrolments bigint;
+    dropped_enrolments bigint;
+begin
+    p_duplicates := array_remove(p_duplicates, p_canonical);
+
+    -- Concurrent merges touching the same donors wait for each other
+    perform 1 from donors where id = p_canonical or id = any(p_duplicates) order by id for update;
+
+    update donations set id_donor = p_canonical where id_donor = any(p_duplicates);
+    get diagnostics moved_donations = row_count;
+    update donations_archive set id_donor = p_canonical where id_donor = any(p_duplicates);
+    get diagnostics moved_archived = row_count;
+
+    -- One enrolment per campaign survives, the canonical donor's own first
+    delete from campaign_donors where id in (
+        select id from (
+            select id, row_number() over (
+                partition by campaign_id order by donor_id = p_canonical desc, id
+            ) as position
+            from campaign_donors
+            where donor_id = p_canonical or donor_id = any(p_duplicates)
+        ) enrolments
+        where position > 1
+    );
+    get diagnostics dropped_enrolments = row_count;
+    update campaign_donors set donor_id = p_canonical where donor_id = any(p_duplicates);
+    get diagnostics moved_enrolments = row_count;
+
+    insert into donor_leaderboard as lb (scope, donor_id, quantity, updated_at)
+    select scope, p_canonical, sum(quantity), now()
+    from donor_leaderboard
+    where donor_id = any(p_duplicates)
+    group by scope
+    on conflict (scope, donor_id) do update
+        set quantity = lb.quantity + excluded.quantity, updated_at = now();
+    delete from donor_leaderboard where donor_id = any(p_duplicates);
+
+    delete from donors where id = any(p_duplicates);
+
+    return json_build_object(
+        'donations', moved_donations + moved_archived,
+        'campaign_donors', moved_enrolments,
+        'campaign_donors_dropped', dropped_enrolments
+    );
+end;
+$$;
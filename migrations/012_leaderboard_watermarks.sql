@@ -0,0 +1,54 @@
+-- Leaderboard deltas are numbered per worker (origin, seq), so a worker
+-- reloading donor_leaderboard knows which of the deltas it holds in memory
+-- the table already contains (app/leaderboard.py). leaderboard_add writes
+-- a worker's deltas and its highest seq in one transaction, and
+-- leaderboard_snapshot returns the totals and every watermark from one
+-- statement, so both describe the same moment. The snapshot is a single
+-- JSON value, which PostgREST's max-rows does not truncate.
+
+create table if not exists leaderboard_watermarks (
+    origin text primary key,
+    seq bigint not null,
+    updated_at timestamptz not null default now()
+);
+
+drop function if exists leaderboard_add(jsonb);
+
+create or replace function leaderboard_add(p_deltas jsonb, p_origin text, p_seq bigint)
+returns void
+language plpgsql as $$
+begin
+    insert into donor_leaderboard as lb (scope, donor_id, quantity, updated_at)
+    select d.scope, d.donor_id, d.quantity, now()
+    from jsonb_to_recordset(p_deltas) as d(scope text, donor_id bigint, quantity numeric)
+    where exists (select 1 from donors where donors.id = d.donor_id)
+    on conflict (scope, donor_id) do update
+        set quantity = lb.quantity + excluded.quantity,
+            updated_at = now();
+
+    insert into leaderboard_watermarks as w (origin, seq, updated_at)
+    values (p_origin, p_seq, now())
+    on conflict (origin) do update
+        set seq = greatest(w.seq, excluded.seq),
+            updated_at = now();
+
+    -- Origins silent for a day belong to workers long gone; every running
+    -- worker has reloaded past their deltas since
+    delete from leaderboard_watermarks where updated_at < now() - interval '1 day';
+end;
+$$;
+
+create or replace function leaderboard_snapshot()
+returns json
+language sql stable as $$
+    select json_build_object(
+        'rows', coalesce((
+            select json_agg(json_build_array(scope, donor_id, quantity))
+            from donor_leaderboard
+            where quantity <> 0
+        ), '[]'::json),
+        'watermarks', coalesce((
+            select json_object_agg(origin, seq) from leaderboard_watermarks
+        ), '{}'::json)
+    );
+$$;
@@ -0,0 +1,12 @@
+-- Results of the donor duplicate scan (`flask donors-dedup`, app/dedup.py).
+-- Scanning streams and compares the whole donors table, so it runs as a
+-- job; GET /donors/duplicates and POST /donors/merge {"all": true} read
+-- the latest row while it is younger than DEDUP_SCAN_TTL.
+
+create table if not exists donor_duplicate_scans (
+    id bigserial primary key,
+    groups jsonb not null,
+    created_at timestamptz not null default now()
+);
+
+create index if not exists donor_duplicate_scans_created_at_idx on donor_duplicate_scans (created_at);
@@ -16,6 +16,7 @@ class TestConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     JWT_SECRET_KEY = 'test-secret-key'
+    QR_SIGNING_KEY = 'test-qr-signing-key'
     GOOGLE_CLIENT_ID = 'test-client-id'
     GOOGLE_CLIENT_SECRET = 'test-client-secret'
     WTF_CSRF_ENABLED = False
@@ -0,0 +1,102 @@
+import unittest
+from datetime import date
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+from app import archive, create_app
+from tests import TestConfig
+
+
+class CappedQuery:
+    def __init__(self, supabase, name):
+        self.supabase = supabase
+        self.rows = list(supabase.tables.get(name, []))
+        self.count = None
+
+    def select(self, columns, count=None):
+        self.count = count
+        return self
+
+    def eq(self, column, value):
+        self.rows = [row for row in self.rows if row.get(column) == value]
+        return self
+
+    def in_(self, column, values):
+        self.supabase.in_sizes.append(len(values))
+        self.rows = [row for row in self.rows if row.get(column) in values]
+        return self
+
+    def gt(self, column, value):
+        self.rows = [row for row in self.rows if row[column] > value]
+        return self
+
+    def order(self, column):
+        self.rows = sorted(self.rows, key=lambda row: row[column])
+        return self
+
+    def limit(self, count):
+        self.rows = self.rows[:count]
+        return self
+
+    def execute(self):
+        # Like PostgREST's max-rows: longer results are cut without an error
+        return SimpleNamespace(data=self.rows[:self.supabase.max_rows],
+                               count=len(self.rows) if self.count else None)
+
+
+class CappedSupabase:
+    def __init__(self, max_rows, **tables):
+        self.max_rows = max_rows
+        self.tables = tables
+        self.in_sizes = []
+
+    def table(self, name):
+        return CappedQuery(self, name)
+
+
+class TestArchive(unittest.TestCase):
+    """Test the hot/archive split of donations."""
+
+    def test_archive_moves_batches_until_one_is_short(self):
+        supabase = MagicMock()
+        supabase.rpc.return_value.execute.side_effect = [
+            SimpleNamespace(data=2), SimpleNamespace(data=2), SimpleNamespace(data=1)]
+
+        result = archive.archive(supabase, horizon_days=30, batch_size=2, today=date(2024, 3, 31))
+
+        self.assertEqual(result, {'archived': 5, 'batches': 3, 'before': '2024-03-01'})
+        supabase.rpc.assert_called_with("archive_donations", {'p_before': '2024-03-01', 'p_limit': 2})
+
+    def test_ranges_before_the_horizon_read_both_tiers(self):
+        today = date(2024, 12, 31)
+        self.assertEqual(archive.tables_for_range(date(2024, 12, 1), today), archive.HOT)
+        self.assertEqual(archive.tables_for_range(date(2023, 1, 1), today), archive.ALL)
+
+    @patch('app.donations.supabase')
+    def test_list_reads_hot_table_unless_archived_requested(self, mock_supabase):
+        mock_supabase.table.return_value.select.return_value \
+            .gte.return_value.lte.return_value.order.return_value.execute.return_value = SimpleNamespace(data=[])
+        client = create_app(TestConfig).test_client()
+
+        client.get('/donations/by_date_range?start_date=2020-01-01&end_date=2020-12-31')
+        mock_supabase.table.assert_called_with("donations")
+
+        client.get('/donations/by_date_range?start_date=2020-01-01&end_date=2020-12-31&include_archived=true')
+        mock_supabase.table.assert_called_with("donations_all")
+
+    def test_donor_stats_read_every_page_of_both_tiers(self):
+        supabase = CappedSupabase(
+            3,
+            donations_all=[{'id': n, 'id_donor': 1} for n in range(1, 8)],
+            food_all=[{'id': n, 'id_donation': 1 + n % 7, 'quantity': 100} for n in range(14)],
+            campaign_donors=[],
+        )
+        with patch('app.donors.supabase', supabase), patch('app.db.PAGE_SIZE', 3), patch('app.db.IN_CHUNK_SIZE', 4):
+            response = create_app(TestConfig).test_client().get('/donors/stats/1')
+
+        self.assertEqual(response.get_json()['total_kg_donated'], 14.0)
+        # The donation ids go out in short in_() lists
+        self.assertTrue(all(size <= 4 for size in supabase.in_sizes))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import io
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+from app import create_app
+from app.bulk_import import import_csv
+from tests import TestConfig
+
+
+class TestBulkImport(unittest.TestCase):
+    """Test streaming CSV imports."""
+
+    def setUp(self):
+        self.supabase = MagicMock()
+        self.upsert = self.supabase.table.return_value.upsert
+        self.upsert.return_value.execute.side_effect = lambda: SimpleNamespace(
+            data=self.upsert.call_args[0][0])
+
+    def test_rows_are_upserted_in_batches(self):
+        csv_text = "name,email,phone\n" + "".join(f"Donor {i},d{i}@x.com,55{i:08d}\n" for i in range(5))
+
+        result = import_csv(self.supabase, "donors", io.StringIO(csv_text), batch_size=2)
+
+        self.assertEqual(result['imported'], 5)
+        self.assertEqual([len(call[0][0]) for call in self.upsert.call_args_list], [2, 2, 1])
+        self.assertEqual(self.upsert.call_args[1], {'on_conflict': 'email', 'ignore_duplicates': True})
+        self.assertNotIn('Donor', self.upsert.call_args[0][0][0]['password'])
+
+    def test_invalid_and_repeated_rows_are_reported_by_line(self):
+        csv_text = ("name,email,phone\n"
+                    "Ana,ana@x.com,5511111111\n"
+                    "Sin correo,,5522222222\n"
+                    "Ana bis,ANA@x.com,5533333333\n")
+
+        result = import_csv(self.supabase, "donors", io.StringIO(csv_text))
+
+        self.assertEqual(result['imported'], 1)
+        self.assertEqual(result['errors'], [
+            {'row': 3, 'error': 'Missing required field: email'},
+            {'row': 4, 'error': 'Duplicate of row 2 (email)'},
+        ])
+
+    def test_failed_batch_is_retried_row_by_row(self):
+        def execute():
+            rows = self.upsert.call_args[0][0]
+            if any(row['name'] == 'Broken' for row in rows):
+                raise Exception('value too long')
+            return SimpleNamespace(data=rows)
+        self.upsert.return_value.execute.side_effect = execute
+        csv_text = "name,address,lat,lon\nA,St 1,19.4,-99.1\nBroken,St 2,19.4,-99.1\nC,St 3,19.4,-99.1\n"
+
+        result = import_csv(self.supabase, "donation_points", io.StringIO(csv_text))
+
+        self.assertEqual(result['imported'], 2)
+        self.assertEqual(result['errors'], [{'row': 3, 'error': 'value too long'}])
+
+
+class TestBulkImportRoutes(unittest.TestCase):
+    """Test the CSV upload endpoints."""
+
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.client = self.app.test_client()
+
+    def _fake_upsert(self, mock_supabase):
+        upsert = mock_supabase.table.return_value.upsert
+        upsert.return_value.execute.side_effect = lambda: SimpleNamespace(data=upsert.call_args[0][0])
+        return upsert
+
+    @patch('app.donors.supabase')
+    def test_donors_import_accepts_a_multipart_file(self, mock_supabase):
+        upsert = self._fake_upsert(mock_supabase)
+        csv_bytes = "\ufeffname,email,phone\nAna,ana@x.com,5511111111\nLuis,luis@x.com,5522222222\n".encode()
+
+        response = self.client.post('/donors/import', query_string={'batch_size': 1},
+                                    data={'file': (io.BytesIO(csv_bytes), 'donors.csv')},
+                                    content_type='multipart/form-data')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['imported'], 2)
+        mock_supabase.table.assert_called_with('donors')
+        self.assertEqual([call[0][0][0]['email'] for call in upsert.call_args_list], ['ana@x.com', 'luis@x.com'])
+
+    @patch('app.donation_points.supabase')
+    def test_donation_points_import_accepts_a_csv_body(self, mock_supabase):
+        upsert = self._fake_upsert(mock_supabase)
+        csv_text = "name,address,lat,lon\nCentro,Calle 1,19.43,-99.13\nSin lat,Calle 2,,-99.1\n"
+
+        response = self.client.post('/donation_points/import', data=csv_text, content_type='text/csv')
+
+        self.assertEqual(response.status_code, 200)
+        body = response.get_json()
+        self.assertEqual(body['imported'], 1)
+        self.assertEqual([error['row'] for error in body['errors']], [3])
+        mock_supabase.table.assert_called_with('donation_points')
+        self.assertEqual(upsert.call_args[0][0][0]['name'], 'Centro')
+
+
+if __name__ == '__main__':
+    unittest.main()
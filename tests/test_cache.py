@@ -0,0 +1,132 @@
+import threading
+import time
+import unittest
+from app.cache import LRUCache, EntityCache, RedisTier, cache_hits, cache_misses
+
+
+class FakeSharedTier:
+    """In-memory stand-in for the Redis tier."""
+
+    def __init__(self):
+        self.data = {}
+        self.published = []
+
+    def get(self, key):
+        from app.cache import _MISSING
+        return self.data.get(key, _MISSING)
+
+    def set(self, key, value):
+        self.data[key] = value
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def publish(self, key):
+        self.published.append(key)
+
+    def listen(self, callback, on_reconnect=None):
+        return None
+
+
+class FlakyRedis:
+    """Redis client whose first pub/sub connection drops; the next delivers one message and then stays idle."""
+
+    def __init__(self):
+        self.connections = 0
+        self.idle = threading.Event()
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        self.connections += 1
+        client = self
+
+        class PubSub:
+            def subscribe(self, channel):
+                pass
+
+            def listen(self):
+                if client.connections == 1:
+                    raise ConnectionError("connection reset")
+                yield {'data': b'donors:1'}
+                client.idle.wait()
+
+            def close(self):
+                pass
+
+        return PubSub()
+
+
+class TestLRUCache(unittest.TestCase):
+    """Test the per-process LRU cache."""
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(maxsize=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+
+    def test_entries_expire(self):
+        cache = LRUCache(maxsize=2, ttl=0.01)
+        cache.set('a', 1)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get('a'))
+
+
+class TestEntityCache(unittest.TestCase):
+    """Test the two-tier read-through cache."""
+
+    def test_read_through_and_invalidate(self):
+        shared = FakeSharedTier()
+        cache = EntityCache(LRUCache(maxsize=10, ttl=60), shared)
+        calls = []
+
+        def loader():
+            calls.append(1)
+            return {'id': 1}
+
+        misses = cache_misses.value()
+        self.assertEqual(cache.get_or_load('donors:1', loader), {'id': 1})
+        self.assertEqual(cache.get_or_load('donors:1', loader), {'id': 1})
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache_misses.value(), misses + 1)
+
+        cache.invalidate('donors:1')
+        self.assertEqual(shared.published, ['donors:1'])
+        cache.get_or_load('donors:1', loader)
+        self.assertEqual(len(calls), 2)
+
+    def test_shared_tier_fills_local(self):
+        shared = FakeSharedTier()
+        shared.set('campaigns:3', {'id': 3})
+        cache = EntityCache(LRUCache(maxsize=10, ttl=60), shared)
+        hits = cache_hits.value(tier='shared')
+        value = cache.get_or_load('campaigns:3', lambda: self.fail('loader called'))
+        self.assertEqual(value, {'id': 3})
+        self.assertEqual(cache_hits.value(tier='shared'), hits + 1)
+
+    def test_missing_rows_are_not_cached(self):
+        cache = EntityCache(LRUCache(maxsize=10, ttl=60))
+        self.assertIsNone(cache.get_or_load('donors:9', lambda: None))
+        self.assertEqual(cache.get_or_load('donors:9', lambda: {'id': 9}), {'id': 9})
+
+    def test_listener_reconnects_and_drops_local_copies(self):
+        tier = RedisTier.__new__(RedisTier)
+        tier.client, tier.channel, tier.retry_initial = FlakyRedis(), "pd:invalidate", 0.01
+        cache = EntityCache(LRUCache(maxsize=10, ttl=60), tier)
+        cache.local.set('donors:1', {'id': 1})
+        cache.local.set('campaigns:2', {'id': 2})
+
+        cache._ensure_listener()
+        deadline = time.monotonic() + 5
+        while len(cache.local) and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        self.assertEqual(tier.client.connections, 2)
+        self.assertEqual(len(cache.local), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
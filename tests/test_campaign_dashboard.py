@@ -0,0 +1,46 @@
+import unittest
+from unittest.mock import patch
+from app import create_app
+from app.resilience import _last_good
+from tests import TestConfig
+
+
+class TestCampaignDashboard(unittest.TestCase):
+    """Test /campaigns/<id>/dashboard."""
+
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.client = self.app.test_client()
+        _last_good.clear()
+
+    @patch('app.campaigns.get_entity')
+    @patch('app.campaigns.supabase')
+    def test_dashboard_uses_one_aggregate_call(self, mock_supabase, mock_get_entity):
+        mock_get_entity.return_value = {'id': 1, 'name': 'Invierno', 'active': True}
+        mock_supabase.rpc.return_value.execute.return_value.data = {
+            'enrolled_donors': 4,
+            'donations': 2,
+            'total_kg': 7.5,
+            'by_category': [{'category': 'grain', 'items': 2, 'kg': 7.5, 'perishable_kg': 0}],
+            'by_day': [{'day': '2024-05-01', 'donations': 2, 'kg': 7.5}],
+        }
+
+        response = self.client.get('/campaigns/1/dashboard')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json['enrolled_donors'], 4)
+        self.assertEqual(response.json['campaign']['name'], 'Invierno')
+        mock_supabase.rpc.assert_called_once_with("campaign_dashboard", {'p_campaign_id': 1})
+        mock_supabase.table.assert_not_called()
+
+    @patch('app.campaigns.get_entity', return_value=None)
+    @patch('app.campaigns.supabase')
+    def test_unknown_campaign(self, mock_supabase, mock_get_entity):
+        response = self.client.get('/campaigns/99/dashboard')
+
+        self.assertEqual(response.status_code, 404)
+        mock_supabase.rpc.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
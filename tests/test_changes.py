@@ -0,0 +1,51 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch, MagicMock
+from app import create_app
+from tests import TestConfig
+
+
+class TestChanges(unittest.TestCase):
+    """Test the /donations/changes incremental sync feed."""
+
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.client = self.app.test_client()
+
+    @patch('app.donations.supabase')
+    def test_invalid_since_is_rejected_before_any_query(self, mock_supabase):
+        response = self.client.get('/donations/changes', query_string={
+            'since': '2024-01-01",id.gt.0,updated_at.gt."2024', 'after_id': 1})
+
+        self.assertEqual(response.status_code, 400)
+        mock_supabase.table.assert_not_called()
+
+    @patch('app.donations.supabase')
+    def test_reads_settled_changes_without_qr(self, mock_supabase):
+        query = mock_supabase.table.return_value.select.return_value.lte.return_value
+        query.or_.return_value.order.return_value.order.return_value.limit.return_value.execute.return_value = \
+            MagicMock(data=[{'id': 8, 'updated_at': '2024-05-01T10:00:01+00:00'}])
+
+        response = self.client.get('/donations/changes', query_string={
+            'since': '2024-05-01T10:00:00+00:00', 'after_id': 7, 'limit': 0})
+
+        self.assertEqual(response.status_code, 200)
+        columns = mock_supabase.table.return_value.select.call_args[0][0]
+        self.assertNotIn('qr', columns.split(','))
+        self.assertNotEqual(columns, '*')
+
+        column, settled = mock_supabase.table.return_value.select.return_value.lte.call_args[0]
+        self.assertEqual(column, 'updated_at')
+        lag = datetime.now(timezone.utc) - datetime.fromisoformat(settled)
+        self.assertTrue(timedelta(seconds=4) < lag < timedelta(seconds=6))
+
+        self.assertEqual(query.or_.call_args[0][0],
+                         'updated_at.gt."2024-05-01T10:00:00+00:00",'
+                         'and(updated_at.eq."2024-05-01T10:00:00+00:00",id.gt.7)')
+        # limit=0 is raised to one change per page
+        query.or_.return_value.order.return_value.order.return_value.limit.assert_called_once_with(2)
+        self.assertEqual(response.get_json()['watermark'], {'since': '2024-05-01T10:00:01+00:00', 'after_id': 8})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import unittest
+from unittest.mock import patch
+from types import SimpleNamespace
+from app.composite import QueryError, resolve
+from app.dataloader import Loaders
+from app.schemas import CompositeQuery
+
+
+class FakeQuery:
+    def __init__(self, supabase, name):
+        self.supabase = supabase
+        self.name = name
+        self.rows = list(supabase.tables[name])
+
+    def select(self, *args):
+        return self
+
+    def in_(self, column, values):
+        self.supabase.queries.append((self.name, column, sorted(values)))
+        self.rows = [row for row in self.rows if row.get(column) in values]
+        return self
+
+    def gt(self, column, value):
+        self.rows = [row for row in self.rows if row[column] > value]
+        return self
+
+    def order(self, column):
+        self.rows = sorted(self.rows, key=lambda row: row[column])
+        return self
+
+    def limit(self, count):
+        self.rows = self.rows[:count]
+        return self
+
+    def execute(self):
+        # Like PostgREST's max-rows: longer results are cut without an error
+        return SimpleNamespace(data=[dict(row) for row in self.rows[:self.supabase.max_rows]])
+
+
+class FakeSupabase:
+    def __init__(self, max_rows=None, **tables):
+        self.tables = tables
+        self.max_rows = max_rows
+        self.queries = []
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+
+class TestComposite(unittest.TestCase):
+    """Test composite queries resolved through per-request dataloaders."""
+
+    def setUp(self):
+        donations = [
+            {'id': 10, 'id_donor': 1, 'id_campaign': 5},
+            {'id': 11, 'id_donor': 1, 'id_campaign': None},
+            {'id': 12, 'id_donor': 2, 'id_campaign': 5},
+        ]
+        food = [
+            {'id': 100, 'id_donation': 10, 'quantity': 150},
+            {'id': 101, 'id_donation': 12, 'quantity': 50},
+        ]
+        self.supabase = FakeSupabase(
+            donors=[{'id': 1, 'name': 'Ana'}, {'id': 2, 'name': 'Luis'}],
+            donations=donations, donations_all=donations, food=food, food_all=food,
+            campaigns=[{'id': 5, 'name': 'Invierno'}],
+            campaign_donors=[{'id': 1, 'campaign_id': 5, 'donor_id': 1}, {'id': 2, 'campaign_id': 5, 'donor_id': 2}],
+        )
+
+    def query(self, body):
+        data = CompositeQuery.model_validate(body)
+        return resolve(Loaders(self.supabase), data.root, data.ids, data.include)
+
+    def test_one_batched_query_per_relation(self):
+        donors = self.query({'root': 'donors', 'ids': [1, 2, 1], 'include': {
+            'donations': {'include': {'food': {}, 'donor': {}}}, 'campaigns': {}}})
+
+        self.assertEqual([donor['id'] for donor in donors], [1, 2])
+        self.assertEqual([d['id'] for d in donors[0]['donations']], [10, 11])
+        self.assertEqual(donors[0]['donations'][0]['food'][0]['quantity'], 150)
+        self.assertEqual(donors[1]['campaigns'], [{'id': 5, 'name': 'Invierno'}])
+        # The donors of the donations were already loaded as roots
+        self.assertEqual([query[0] for query in self.supabase.queries],
+                         ['donors', 'donations', 'food', 'campaign_donors', 'campaigns'])
+
+    def test_donor_stats(self):
+        donors = self.query({'root': 'donors', 'ids': [1], 'include': {'stats': {}}})
+
+        self.assertEqual(donors[0]['stats'], {'total_donations': 2, 'total_campaigns': 1, 'total_kg_donated': 1.5})
+
+    def test_unknown_relation(self):
+        with self.assertRaises(QueryError):
+            self.query({'root': 'donations', 'ids': [10], 'include': {'food': {'include': {'donor': {}}}}})
+
+    def test_capped_responses_are_paged_before_caching(self):
+        donations = [{'id': n, 'id_donor': 1, 'id_campaign': None} for n in range(1, 8)]
+        supabase = FakeSupabase(max_rows=3, donors=[{'id': 1, 'name': 'Ana'}], donations=donations)
+        loaders = Loaders(supabase)
+        with patch('app.db.PAGE_SIZE', 3):
+            found = loaders.get('donations', 'id_donor').load_many([1])
+            again = loaders.get('donations', 'id_donor').load_many([1])
+
+        self.assertEqual([row['id'] for row in found[1]], list(range(1, 8)))
+        self.assertEqual(again, found)
+        # Three pages, then served from the loader
+        self.assertEqual(len(supabase.queries), 3)
+
+    def test_row_budget_rejects_the_query_before_reading_everything(self):
+        donations = [{'id': n, 'id_point': 1 + n % 2} for n in range(1, 31)]
+        supabase = FakeSupabase(max_rows=3, donation_points=[{'id': 1}, {'id': 2}], donations=donations)
+        data = CompositeQuery.model_validate({'root': 'donation_points', 'ids': [1, 2], 'include': {'donations': {}}})
+
+        with patch('app.db.PAGE_SIZE', 3), self.assertRaises(QueryError):
+            resolve(Loaders(supabase, max_rows=5), data.root, data.ids, data.include)
+
+        # The points, then two pages of donations: paging stopped past the budget
+        self.assertEqual([query[0] for query in supabase.queries], ['donation_points', 'donations', 'donations'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import time
+import unittest
+from unittest.mock import MagicMock
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token
+from app.cache import refilling
+from app.db import RoutingClient
+from app.resilience import CircuitBreaker, stale_read
+
+
+class FakeProcessLocal:
+    """Stands in for ProcessLocalClient around a mock Supabase client."""
+
+    def __init__(self):
+        self.client = MagicMock()
+
+    def get(self):
+        return self.client
+
+    def reset(self):
+        pass
+
+
+class TestRoutingClient(unittest.TestCase):
+    """Test read-replica routing and read-your-writes stickiness."""
+
+    def setUp(self):
+        self.primary = FakeProcessLocal()
+        self.replica = FakeProcessLocal()
+        self.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+        self.router = RoutingClient(self.primary, self.replica, self.breaker, sticky_seconds=5)
+        self.app = Flask(__name__)
+        self.app.config['JWT_SECRET_KEY'] = 'test-routing-secret-key-32-bytes!'
+        JWTManager(self.app)
+        self.router.init_app(self.app)
+
+    def test_get_selects_use_replica(self):
+        with self.app.test_request_context('/donors/list', method='GET'):
+            self.router.table("donors").select("*")
+        self.replica.client.table.assert_called_once_with("donors")
+        self.primary.client.table.assert_not_called()
+
+    def test_writes_and_post_reads_use_primary(self):
+        with self.app.test_request_context('/donors/create', method='POST'):
+            self.router.table("donors").select("id")
+            self.router.table("donors").insert({'name': 'Ana'})
+        self.assertEqual(self.primary.client.table.call_count, 2)
+        self.replica.client.table.assert_not_called()
+
+    def test_write_sets_sticky_cookie(self):
+        @self.app.route('/write', methods=['POST'])
+        def write():
+            self.router.table("donations").update({'pending': False})
+            return 'ok'
+
+        response = self.app.test_client().post('/write')
+        cookie = response.headers.get('Set-Cookie', '')
+        self.assertIn(RoutingClient.COOKIE, cookie)
+
+    def test_sticky_window_reads_from_primary(self):
+        until = str(time.time() + 5)
+        with self.app.test_request_context('/donors/1', method='GET',
+                                           headers={'Cookie': f"{RoutingClient.COOKIE}={until}"}):
+            self.router.table("donors").select("*")
+        self.primary.client.table.assert_called_once_with("donors")
+        self.replica.client.table.assert_not_called()
+
+    def test_expired_window_reads_from_replica(self):
+        with self.app.test_request_context('/donors/1', method='GET',
+                                           headers={'Cookie': f"{RoutingClient.COOKIE}={time.time() - 1}"}):
+            self.router.table("donors").select("*")
+        self.replica.client.table.assert_called_once_with("donors")
+
+    def test_sticky_window_follows_the_token_without_cookies(self):
+        @self.app.route('/write', methods=['POST'])
+        def write():
+            self.router.table("donations").update({'pending': False})
+            return 'ok'
+
+        with self.app.app_context():
+            token = create_access_token(identity='7')
+        headers = {'Authorization': f"Bearer {token}"}
+        self.app.test_client().post('/write', headers=headers)
+
+        # Same donor, new connection without the cookie (mobile client)
+        with self.app.test_request_context('/donors/7', method='GET', headers=headers):
+            self.router.table("donors").select("*")
+        self.primary.client.table.assert_called_with("donors")
+        self.replica.client.table.assert_not_called()
+
+        with self.app.test_request_context('/donors/7', method='GET'):
+            self.router.table("donors").select("*")
+        self.replica.client.table.assert_called_once_with("donors")
+
+    def test_cache_refills_read_from_primary(self):
+        with self.app.test_request_context('/campaigns/active', method='GET'):
+            with refilling():
+                self.router.table("campaigns").select("*")
+            stale_read("test:db_routing:refill", lambda: self.router.rpc("campaign_dashboard", {}))
+        self.primary.client.table.assert_called_once_with("campaigns")
+        self.primary.client.rpc.assert_called_once()
+        self.replica.client.table.assert_not_called()
+        self.replica.client.rpc.assert_not_called()
+
+    def test_open_replica_circuit_falls_back_to_primary(self):
+        self.breaker.record_failure()
+        with self.app.test_request_context('/donors/1', method='GET'):
+            self.router.table("donors").select("*")
+        self.primary.client.table.assert_called_once_with("donors")
+
+    def test_without_replica_everything_uses_primary(self):
+        router = RoutingClient(self.primary)
+        with self.app.test_request_context('/donors/1', method='GET'):
+            router.table("donors").select("*")
+            router.rpc("search_donors", {'q': 'an'})
+        self.primary.client.table.assert_called_once_with("donors")
+        self.primary.client.rpc.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+import unittest
+from types import SimpleNamespace
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+from app import create_app
+from app.dedup import find_duplicates, merge_group, merge_groups, normalize_email, normalize_phone, unverified_groups
+from tests import TestConfig
+
+DONORS = [
+    {'id': 1, 'name': 'José Pérez', 'email': 'jose.perez@gmail.com', 'phone': '+52 55 1234 5678'},
+    {'id': 2, 'name': 'Jose Perez', 'email': 'joseperez+food@gmail.com', 'phone': '5512345678'},
+    {'id': 3, 'name': 'Ana Ruiz', 'email': 'ana@x.com', 'phone': '5511111111'},
+]
+
+
+def donors_query(supabase):
+    return supabase.table.return_value.select.return_value.in_.return_value.order.return_value.limit.return_value
+
+
+class TestDedup(unittest.TestCase):
+    """Test donor duplicate detection and merging."""
+
+    def test_normalization(self):
+        self.assertEqual(normalize_phone('+52 (55) 1234-5678'), '5512345678')
+        self.assertIsNone(normalize_phone('123'))
+        self.assertEqual(normalize_email('Jose.Perez+food@Gmail.com'), ('joseperez', 'gmail.com'))
+
+    def test_groups_by_email_phone_and_similar_names(self):
+        donors = [
+            {'id': 1, 'name': 'José Pérez', 'email': 'jose.perez@gmail.com', 'phone': '+52 55 1234 5678'},
+            {'id': 2, 'name': 'Jose Perez', 'email': 'joseperez+food@gmail.com', 'phone': '5512345678'},
+            {'id': 3, 'name': 'Ana Ruiz', 'email': 'ana@x.com', 'phone': '5511111111'},
+            {'id': 4, 'name': 'Ana Ruíz', 'email': 'anaruiz@y.com', 'phone': '55-1111-1111'},
+            {'id': 5, 'name': 'Maria Lopez', 'email': 'mlopez@x.com', 'phone': '5511111111'},
+            {'id': 6, 'name': 'Jose Perez', 'email': 'jperez@z.com', 'phone': '5533333333'},
+        ]
+
+        groups = find_duplicates(donors)
+
+        self.assertEqual([(g['canonical_id'], g['duplicate_ids']) for g in groups], [(1, [2]), (3, [4])])
+
+    def test_chains_are_merged_transitively(self):
+        donors = [
+            {'id': 7, 'name': 'Luis Gomez', 'email': 'luis@x.com', 'phone': '5500000001'},
+            {'id': 8, 'name': 'Luis Gomez', 'email': 'luis@y.com', 'phone': '5500000002'},
+            {'id': 9, 'name': 'Luis Gomez', 'email': 'lg@z.com', 'phone': '5500000002'},
+        ]
+
+        groups = find_duplicates(donors)
+
+        self.assertEqual(groups[0]['canonical_id'], 7)
+        self.assertEqual(groups[0]['duplicate_ids'], [8, 9])
+
+    def test_oversized_blocks_of_every_kind_are_skipped(self):
+        # Same placeholder phone on every record: not compared at all past the cap
+        donors = [
+            {'id': n, 'name': f'Donor {n}', 'email': f'donor{n}@x.com', 'phone': '5500000000'}
+            for n in range(1, 6)
+        ]
+        with patch('app.dedup.MAX_BLOCK_SIZE', 4), patch('app.dedup.match_reason') as match_reason:
+            match_reason.return_value = None
+            find_duplicates(donors)
+
+        # Every shared block (the phone, the "donor" trigrams) holds all 5 donors
+        match_reason.assert_not_called()
+
+    def test_merge_is_one_transaction(self):
+        supabase = MagicMock()
+        supabase.rpc.return_value.execute.return_value = SimpleNamespace(
+            data={'donations': 2, 'campaign_donors': 1, 'campaign_donors_dropped': 1})
+
+        moved = merge_group(supabase, 1, [1, 2, 3])
+
+        self.assertEqual(moved, {'donations': 2, 'campaign_donors': 1, 'campaign_donors_dropped': 1})
+        supabase.rpc.assert_called_once_with("merge_donors", {'p_canonical': 1, 'p_duplicates': [2, 3]})
+        supabase.table.assert_not_called()
+
+    @patch('app.dedup.broker')
+    def test_merged_groups_reload_the_leaderboards(self, broker):
+        supabase = MagicMock()
+        supabase.rpc.return_value.execute.return_value = SimpleNamespace(
+            data={'donations': 1, 'campaign_donors': 0, 'campaign_donors_dropped': 0})
+
+        totals = merge_groups(supabase, [{'canonical_id': 1, 'duplicate_ids': [2]},
+                                         {'canonical_id': 5, 'duplicate_ids': [6, 7]}])
+
+        self.assertEqual(totals['donors_removed'], 3)
+        self.assertEqual(totals['donations'], 2)
+        broker.publish.assert_called_once_with("leaderboard", "leaderboard.reload", {})
+
+    def test_submitted_groups_are_verified(self):
+        supabase = MagicMock()
+        donors_query(supabase).execute.return_value = SimpleNamespace(data=DONORS)
+
+        rejected = unverified_groups(supabase, [{'canonical_id': 1, 'duplicate_ids': [2]},
+                                                {'canonical_id': 1, 'duplicate_ids': [3]},
+                                                {'canonical_id': 2, 'duplicate_ids': [404]}])
+
+        self.assertEqual(rejected, [1, 2])
+
+
+class TestDedupRoutes(unittest.TestCase):
+    """Test the duplicate listing and merge endpoints."""
+
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.client = self.app.test_client()
+
+    def scan(self, supabase, age):
+        created_at = (datetime.now(timezone.utc) - timedelta(seconds=age)).isoformat()
+        supabase.table.return_value.select.return_value.order.return_value.limit.return_value \
+            .execute.return_value = SimpleNamespace(data=[
+                {'groups': [{'canonical_id': 1, 'duplicate_ids': [2], 'reasons': ['email']}], 'created_at': created_at}])
+
+    @patch('app.donors.supabase')
+    def test_duplicates_are_served_from_the_last_scan(self, mock_supabase):
+        self.scan(mock_supabase, 60)
+
+        response = self.client.get('/donors/duplicates')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['total'], 1)
+        mock_supabase.table.assert_called_once_with("donor_duplicate_scans")
+
+    @patch('app.donors.supabase')
+    @patch('app.dedup.SCAN_TTL', 3600)
+    def test_expired_scan_is_not_served(self, mock_supabase):
+        self.scan(mock_supabase, 7200)
+
+        response = self.client.get('/donors/duplicates')
+
+        self.assertEqual(response.status_code, 404)
+
+    @patch('app.donors.supabase')
+    def test_merge_rejects_groups_that_do_not_match(self, mock_supabase):
+        donors_query(mock_supabase).execute.return_value = SimpleNamespace(data=DONORS)
+
+        response = self.client.post('/donors/merge', json={'groups': [{'canonical_id': 1, 'duplicate_ids': [3]}]})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()['canonical_ids'], [1])
+        mock_supabase.rpc.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+from unittest.mock import patch
+from app import create_app, events
+from app.pubsub import Broker, TooManySubscribers
+from tests import TestConfig
+
+
+class TestBroker(unittest.TestCase):
+    """Test the in-process event broker behind /events."""
+
+    def test_filters_donations_by_point(self):
+        broker = Broker()
+        point_1 = broker.subscribe(['donations'], id_point='1')
+        everything = broker.subscribe(['donations', 'campaigns'])
+
+        broker.publish('donations', 'donation.created', {'id': 10, 'id_point': 1})
+        broker.publish('donations', 'donation.created', {'id': 11, 'id_point': 2})
+        broker.publish('campaigns', 'campaign.updated', {'id': 3})
+
+        self.assertEqual([e[2]['id'] for e in point_1.drain(0)], [10])
+        self.assertEqual([e[1] for e in everything.drain(0)],
+                         ['donation.created', 'donation.created', 'campaign.updated'])
+
+    def test_queue_is_bounded(self):
+        broker = Broker(queue_size=2)
+        subscription = broker.subscribe(['campaigns'])
+        for i in range(5):
+            broker.publish('campaigns', 'campaign.updated', {'id': i})
+        self.assertEqual([e[2]['id'] for e in subscription.drain(0)], [3, 4])
+
+    def test_subscriber_limit(self):
+        broker = Broker(max_subscribers=1)
+        subscription = broker.subscribe(['campaigns'])
+        with self.assertRaises(TooManySubscribers):
+            broker.subscribe(['campaigns'])
+        broker.unsubscribe(subscription)
+        broker.subscribe(['campaigns'])
+
+
+class TestEventsRoute(unittest.TestCase):
+    """Test that /events only streams where the deployment can hold the connections."""
+
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        events._served_by = None
+
+    def test_threaded_workers_are_refused(self):
+        events.configure_workers("gthread", 1)
+
+        response = self.client.get('/events')
+
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('gevent', response.get_json()['error'])
+
+    @patch('app.events.broker')
+    def test_several_workers_need_the_redis_relay(self, broker):
+        broker.redis = None
+        events.configure_workers("gevent", 4)
+        self.assertEqual(self.client.get('/events').status_code, 503)
+
+        broker.redis = object()
+        self.assertIsNone(events.serving_problem())
+
+    def test_single_gevent_worker_streams(self):
+        events.configure_workers("gevent", 1)
+
+        response = self.client.get('/events?topics=campaigns')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        response.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
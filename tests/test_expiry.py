@@ -0,0 +1,96 @@
+import unittest
+from datetime import date
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+from app.expiry import EXPIRED_STATE, Sweeper, SweepLock, parse_policy, sweep
+
+
+class TestExpiry(unittest.TestCase):
+    """Test the pending donation expiry sweeper."""
+
+    def test_parse_policy(self):
+        self.assertEqual(parse_policy("drop:3, pickup:14,*:7,bad:x,neg:-1"), {'drop': 3, 'pickup': 14, '*': 7})
+
+    @patch('app.expiry.publish_donation')
+    def test_sweep_expires_in_batches_per_type(self, publish):
+        supabase = MagicMock()
+        table = supabase.table.return_value
+        select = table.select.return_value.eq.return_value.lt.return_value
+        select.eq.return_value.order.return_value.limit.return_value.execute.side_effect = [
+            SimpleNamespace(data=[{'id': 1}, {'id': 2}]),
+            SimpleNamespace(data=[{'id': 3}]),
+        ]
+        select.or_.return_value.order.return_value.limit.return_value.execute.return_value = SimpleNamespace(data=[])
+        update = table.update.return_value.in_.return_value.eq.return_value.execute
+        update.side_effect = [
+            SimpleNamespace(data=[{'id': 1, 'id_campaign': None}, {'id': 2, 'id_campaign': None}]),
+            # id 3 was redeemed between the select and the update
+            SimpleNamespace(data=[]),
+        ]
+
+        result = sweep(supabase, policy={'drop': 3, '*': 7}, batch_size=2, today=date(2024, 6, 10))
+
+        self.assertEqual(result, {'expired': {'drop': 2}, 'batches': 2})
+        table.select.return_value.eq.return_value.lt.assert_any_call('date', '2024-06-07')
+        select.eq.assert_called_with('type', 'drop')
+        select.or_.assert_called_once_with('type.is.null,type.not.in.("drop")')
+        table.update.return_value.in_.assert_any_call('id', [1, 2])
+        self.assertEqual(table.update.call_args[0][0]['state'], EXPIRED_STATE)
+        self.assertEqual(publish.call_count, 2)
+
+    def test_dry_run_does_not_update(self):
+        supabase = MagicMock()
+        table = supabase.table.return_value
+        table.select.return_value.eq.return_value.lt.return_value \
+            .order.return_value.limit.return_value.execute.return_value = SimpleNamespace(data=[{'id': 1}])
+
+        result = sweep(supabase, policy={'*': 7}, dry_run=True)
+
+        self.assertEqual(result['expired'], {'*': 1})
+        table.update.assert_not_called()
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.values:
+            return None
+        self.values[key] = value
+        return True
+
+
+class TestSweeper(unittest.TestCase):
+    """Test that one worker sweeps per interval."""
+
+    @patch('app.expiry.sweep')
+    def test_only_the_lock_holder_sweeps(self, sweep):
+        redis = FakeRedis()
+        workers = [Sweeper(interval=900, lock=SweepLock(redis)) for _ in range(4)]
+
+        for worker in workers:
+            worker.run_once()
+
+        self.assertEqual(sweep.call_count, 1)
+
+    @patch('app.expiry.sweep')
+    def test_lock_errors_skip_the_sweep(self, sweep):
+        redis = MagicMock()
+        redis.set.side_effect = ConnectionError("down")
+
+        Sweeper(interval=900, lock=SweepLock(redis)).run_once()
+
+        sweep.assert_not_called()
+
+    @patch('app.expiry.threading.Thread')
+    def test_no_thread_without_a_lock_unless_allowed(self, thread):
+        Sweeper(interval=900, lock=None).ensure_started()
+        thread.assert_not_called()
+
+        Sweeper(interval=900, lock=None, without_lock=True).ensure_started()
+        thread.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
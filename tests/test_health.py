@@ -0,0 +1,61 @@
+import unittest
+from unittest.mock import patch
+from app import create_app
+from app.health import state
+from app.warmup import warmup
+from tests import TestConfig
+
+
+class TestHealth(unittest.TestCase):
+    """Test the liveness and readiness probes."""
+
+    def setUp(self):
+        self.saved = dict(state)
+        self.app = create_app(TestConfig)
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        state.update(self.saved)
+
+    def test_live_never_touches_the_backend(self):
+        with patch('app.health.supabase') as mock_supabase:
+            response = self.client.get('/health/live')
+
+        self.assertEqual(response.status_code, 200)
+        mock_supabase.primary.get.assert_not_called()
+
+    @patch('app.health.supabase')
+    def test_ready_without_warmup(self, mock_supabase):
+        state.update(ready=None, warmup_seconds=None)
+        mock_supabase.replica = None
+
+        response = self.client.get('/health/ready')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['backend'], 'ok')
+
+    @patch('app.health.supabase')
+    def test_not_ready_while_warming_up(self, mock_supabase):
+        mock_supabase.replica = None
+        state['ready'] = False
+
+        self.assertEqual(self.client.get('/health/ready').status_code, 503)
+
+        with patch.dict('os.environ', {'WARMUP_PATHS': '/health/live'}):
+            warmup(self.app)
+        self.assertEqual(self.client.get('/health/ready').status_code, 200)
+        self.assertIsNotNone(state['warmup_seconds'])
+
+    @patch('app.health.supabase')
+    def test_backend_failure_is_unavailable(self, mock_supabase):
+        mock_supabase.replica = None
+        mock_supabase.primary.get.return_value.table.side_effect = ConnectionError("refused")
+
+        response = self.client.get('/health/ready')
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.get_json()['backend'], 'error')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,179 @@
+import hashlib
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+from flask_jwt_extended import create_access_token
+from app import create_app
+from app.idempotency import SharedResponses, _scoped_key, responses
+from tests import TestConfig
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+        self.expires = []
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, ex=None, nx=False):
+        with self.lock:
+            if nx and key in self.values:
+                return None
+            self.values[key] = value
+            return True
+
+    def expire(self, key, seconds):
+        self.expires.append((key, seconds))
+
+    def delete(self, key):
+        self.values.pop(key, None)
+
+
+class TestIdempotency(unittest.TestCase):
+    """Test Idempotency-Key handling on create endpoints."""
+
+    def setUp(self):
+        responses.clear()
+        self.app = create_app(TestConfig)
+        self.app.config['JWT_SECRET_KEY'] = 'test-idempotency-secret-key-32-bytes'
+        self.body = {'name': 'Ana', 'email': 'ana@x.com', 'phone': '5512345678', 'password': 'pw'}
+
+    def post(self, body=None, key='key-1', address='10.0.0.1', user=None):
+        headers = {'Idempotency-Key': key}
+        if user is not None:
+            with self.app.app_context():
+                headers['Authorization'] = f"Bearer {create_access_token(identity=user)}"
+        return self.app.test_client().post('/donors/create', json=body or self.body, headers=headers,
+                                           environ_base={'REMOTE_ADDR': address})
+
+    @patch('app.donors.supabase')
+    def test_retry_is_replayed(self, mock_supabase):
+        insert = mock_supabase.table.return_value.insert
+        insert.return_value.execute.return_value = SimpleNamespace(data=[{'id': 7, 'name': 'Ana'}])
+
+        first = self.post()
+        retry = self.post()
+
+        self.assertEqual(insert.call_count, 1)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.get_json(), first.get_json())
+        self.assertEqual(retry.headers['Idempotent-Replayed'], 'true')
+        self.assertEqual(self.post(key='key-2').status_code, 201)
+        self.assertEqual(insert.call_count, 2)
+
+    @patch('app.donors.supabase')
+    def test_key_reused_with_another_body(self, mock_supabase):
+        mock_supabase.table.return_value.insert.return_value.execute.return_value = SimpleNamespace(data=[{'id': 7}])
+        self.post()
+
+        self.assertEqual(self.post(dict(self.body, name='Otra')).status_code, 422)
+
+    @patch('app.donors.supabase')
+    def test_concurrent_duplicate_waits_for_the_original(self, mock_supabase):
+        def slow_insert():
+            time.sleep(0.2)
+            return SimpleNamespace(data=[{'id': 7, 'name': 'Ana'}])
+        insert = mock_supabase.table.return_value.insert
+        insert.return_value.execute.side_effect = slow_insert
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.post())) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(insert.call_count, 1)
+        self.assertEqual([response.status_code for response in results], [201, 201, 201])
+
+    @patch('app.donors.supabase')
+    def test_server_errors_are_not_stored(self, mock_supabase):
+        insert = mock_supabase.table.return_value.insert
+        insert.return_value.execute.side_effect = [Exception('down'), SimpleNamespace(data=[{'id': 7}])]
+
+        self.assertEqual(self.post().status_code, 500)
+        self.assertEqual(self.post().status_code, 201)
+
+    @patch('app.donors.supabase')
+    def test_keys_are_scoped_per_identity(self, mock_supabase):
+        insert = mock_supabase.table.return_value.insert
+        insert.return_value.execute.return_value = SimpleNamespace(data=[{'id': 7}])
+
+        self.post(user='1')
+        response = self.post(user='2')
+
+        self.assertEqual(insert.call_count, 2)
+        self.assertNotIn('Idempotent-Replayed', response.headers)
+
+    @patch('app.donors.supabase')
+    def test_anonymous_retry_from_another_address_is_replayed(self, mock_supabase):
+        insert = mock_supabase.table.return_value.insert
+        insert.return_value.execute.return_value = SimpleNamespace(data=[{'id': 7}])
+
+        self.post(address='10.0.0.1')
+        response = self.post(address='10.0.0.2')
+
+        self.assertEqual(insert.call_count, 1)
+        self.assertEqual(response.headers['Idempotent-Replayed'], 'true')
+
+    @patch('app.donors.supabase')
+    def test_retry_on_another_worker_waits_for_the_claim(self, mock_supabase):
+        redis = FakeRedis()
+        shared = SharedResponses(redis)
+        insert = mock_supabase.table.return_value.insert
+        with patch('app.idempotency.shared', shared):
+            with self.app.test_request_context('/donors/create', method='POST', json=self.body,
+                                               environ_base={'REMOTE_ADDR': '10.0.0.1'}) as context:
+                key = _scoped_key('key-1')
+                fingerprint = hashlib.sha256(context.request.get_data()).hexdigest()
+            # Another worker claimed the key and is still running the handler
+            self.assertTrue(shared.claim(key, fingerprint))
+
+            def finish_elsewhere():
+                time.sleep(0.3)
+                shared.set(key, (fingerprint, 201, '{"id": 9}', 'application/json'))
+            threading.Thread(target=finish_elsewhere).start()
+
+            response = self.post()
+
+        insert.assert_not_called()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.get_json(), {'id': 9})
+        self.assertEqual(response.headers['Idempotent-Replayed'], 'true')
+
+    @patch('app.donors.supabase')
+    def test_failed_request_releases_its_claim(self, mock_supabase):
+        redis = FakeRedis()
+        insert = mock_supabase.table.return_value.insert
+        insert.return_value.execute.side_effect = [Exception('down'), SimpleNamespace(data=[{'id': 7}])]
+        with patch('app.idempotency.shared', SharedResponses(redis)):
+            self.assertEqual(self.post().status_code, 500)
+            self.assertEqual(redis.values, {})
+            self.assertEqual(self.post().status_code, 201)
+
+        self.assertEqual(len(redis.values), 1)
+
+    @patch('app.idempotency.CLAIM_SECONDS', 0.3)
+    @patch('app.donors.supabase')
+    def test_slow_handler_keeps_renewing_its_claim(self, mock_supabase):
+        redis = FakeRedis()
+        def slow_insert():
+            time.sleep(0.5)
+            return SimpleNamespace(data=[{'id': 7}])
+        mock_supabase.table.return_value.insert.return_value.execute.side_effect = slow_insert
+        with patch('app.idempotency.shared', SharedResponses(redis)):
+            self.assertEqual(self.post().status_code, 201)
+            renewals = len(redis.expires)
+            time.sleep(0.2)
+
+        self.assertGreaterEqual(renewals, 2)
+        # Renewals stop with the handler, so the stored response keeps its TTL
+        self.assertEqual(len(redis.expires), renewals)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import unittest
+from unittest.mock import patch
+from types import SimpleNamespace
+from app.inventory import read_inventory, reconcile
+
+
+class FakeQuery:
+    """Chainable query over in-memory rows supporting the calls the ledger code makes."""
+
+    def __init__(self, table):
+        self.table = table
+        self.rows = list(table.rows)
+        self.limit_count = None
+
+    def select(self, *args):
+        return self
+
+    def eq(self, column, value):
+        self.rows = [row for row in self.rows if row.get(column) == value]
+        return self
+
+    def gt(self, column, value):
+        self.rows = [row for row in self.rows if row.get(column) > value]
+        return self
+
+    def in_(self, column, values):
+        self.rows = [row for row in self.rows if row.get(column) in values]
+        return self
+
+    def order(self, column):
+        self.rows.sort(key=lambda row: row[column])
+        return self
+
+    def limit(self, count):
+        self.rows = self.rows[:count]
+        return self
+
+    def range(self, start, end):
+        self.rows = self.rows[start:end + 1]
+        return self
+
+    def upsert(self, rows, on_conflict):
+        self.table.upserts.append(rows)
+        return self
+
+    def execute(self):
+        # Like PostgREST's max-rows: longer results are cut without an error
+        return SimpleNamespace(data=self.rows[:self.table.max_rows])
+
+
+class FakeTable:
+    def __init__(self, rows, max_rows=None):
+        self.rows = rows
+        self.max_rows = max_rows
+        self.upserts = []
+
+
+class FakeSupabase:
+    def __init__(self, max_rows=None, **tables):
+        self.tables = {name: FakeTable(rows, max_rows) for name, rows in tables.items()}
+
+    def table(self, name):
+        return FakeQuery(self.tables[name])
+
+
+class TestInventory(unittest.TestCase):
+    """Test the donation point inventory ledger."""
+
+    def setUp(self):
+        self.supabase = FakeSupabase(
+            donations=[
+                {'id': 1, 'id_point': 10, 'pending': True},
+                {'id': 2, 'id_point': 10, 'pending': True},
+                {'id': 3, 'id_point': 10, 'pending': False},
+                {'id': 4, 'id_point': 20, 'pending': True},
+            ],
+            food=[
+                {'id': 1, 'id_donation': 1, 'category': 'grain', 'quantity': 200},
+                {'id': 2, 'id_donation': 2, 'category': 'grain', 'quantity': 300},
+                {'id': 3, 'id_donation': 3, 'category': 'grain', 'quantity': 900},
+                {'id': 4, 'id_donation': 4, 'category': 'dairy', 'quantity': 100},
+            ],
+            donation_point_inventory=[
+                {'id_point': 10, 'category': 'grain', 'items': 2, 'quantity': 500},
+                {'id_point': 10, 'category': 'dairy', 'items': 1, 'quantity': 50},
+            ],
+        )
+
+    def test_reconcile_rewrites_only_drifted_rows(self):
+        result = reconcile(self.supabase, batch_size=2)
+
+        self.assertEqual(result['donations_scanned'], 3)
+        upserted = [row for batch in self.supabase.tables['donation_point_inventory'].upserts for row in batch]
+        by_key = {(row['id_point'], row['category']): row for row in upserted}
+        self.assertEqual(set(by_key), {(20, 'dairy'), (10, 'dairy')})
+        self.assertEqual(by_key[(20, 'dairy')]['quantity'], 100)
+        self.assertEqual(by_key[(10, 'dairy')]['items'], 0)
+
+    def test_dry_run_writes_nothing(self):
+        result = reconcile(self.supabase, dry_run=True)
+
+        self.assertEqual(result['corrected_rows'], 2)
+        self.assertEqual(self.supabase.tables['donation_point_inventory'].upserts, [])
+
+    def test_read_inventory_in_kg(self):
+        inventory = read_inventory(self.supabase, 10)
+
+        self.assertEqual(inventory['total_items'], 3)
+        self.assertEqual(inventory['categories'][0], {'category': 'grain', 'items': 2, 'kg': 5.0, 'updated_at': None})
+
+    def test_reconcile_reads_every_page_when_responses_are_capped(self):
+        # One pending donation with 7 food rows and 5 ledger rows, responses capped at 2 rows
+        supabase = FakeSupabase(
+            max_rows=2,
+            donations=[{'id': 1, 'id_point': 10, 'pending': True}],
+            food=[{'id': n, 'id_donation': 1, 'category': 'grain', 'quantity': 100} for n in range(7)],
+            donation_point_inventory=[{'id_point': 10, 'category': 'grain', 'items': 7, 'quantity': 700}] + [
+                {'id_point': point, 'category': 'dairy', 'items': 1, 'quantity': 50} for point in range(20, 24)
+            ],
+        )
+        with patch('app.db.PAGE_SIZE', 2):
+            result = reconcile(supabase, batch_size=2)
+
+        upserted = [row for batch in supabase.tables['donation_point_inventory'].upserts for row in batch]
+        # The grain row is already right; every stale dairy row goes back to zero
+        self.assertEqual(result['ledger_rows'], 1)
+        self.assertEqual(sorted(row['id_point'] for row in upserted), [20, 21, 22, 23])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,256 @@
+import random
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from app import create_app
+from app.leaderboard import GLOBAL, LEADERBOARD_SIZE, Leaderboard, Leaderboards, campaign_scope, rebuild
+from tests import TestConfig
+
+
+class FakeIncrementRpc:
+    """
+    leaderboard_add() and leaderboard_snapshot() as the database runs them:
+    quantity = quantity + delta plus the origin's watermark in one step.
+    """
+
+    def __init__(self):
+        self.totals = {}
+        self.watermarks = {}
+        self.lock = threading.Lock()
+
+    def rpc(self, name, params):
+        with self.lock:
+            if name == "leaderboard_snapshot":
+                data = {'rows': [[scope, donor_id, quantity] for (scope, donor_id), quantity in self.totals.items()],
+                        'watermarks': dict(self.watermarks)}
+                return SimpleNamespace(execute=lambda: SimpleNamespace(data=data))
+            assert name == "leaderboard_add"
+            for row in params['p_deltas']:
+                key = (row['scope'], row['donor_id'])
+                self.totals[key] = self.totals.get(key, 0) + row['quantity']
+            self.watermarks[params['p_origin']] = max(self.watermarks.get(params['p_origin'], 0), params['p_seq'])
+        return SimpleNamespace(execute=lambda: SimpleNamespace(data=None))
+
+
+class TestLeaderboard(unittest.TestCase):
+    """Test the incremental top-K donor leaderboard."""
+
+    def test_increments_keep_top_sorted(self):
+        board = Leaderboard(size=2)
+        board.add(1, 500)
+        board.add(2, 300)
+        board.add(3, 900)
+        board.add(2, 700)
+
+        self.assertEqual(board.top(10), [
+            {'rank': 1, 'donor_id': 2, 'kg': 10.0},
+            {'rank': 2, 'donor_id': 3, 'kg': 9.0},
+        ])
+
+    def test_decrement_refills_from_outside_the_top(self):
+        board = Leaderboard(size=2)
+        for donor_id, quantity in [(1, 500), (2, 300), (3, 900)]:
+            board.add(donor_id, quantity)
+
+        board.add(3, -900)
+
+        self.assertEqual([entry['donor_id'] for entry in board.top(2)], [1, 2])
+
+    def test_matches_full_sort_after_random_writes(self):
+        rng = random.Random(7)
+        board = Leaderboard(size=5)
+        for _ in range(500):
+            board.add(rng.randint(1, 30), rng.choice([-1, 1]) * rng.randint(1, 1000))
+
+        expected = sorted(((-q, d) for d, q in board.totals.items() if q > 0))[:5]
+        self.assertEqual([(entry['donor_id']) for entry in board.top(5)], [d for _, d in expected])
+
+    def test_replace(self):
+        board = Leaderboard(size=3)
+        board.replace({1: 100, 2: 0, 3: 250})
+
+        self.assertEqual(board.top(3), [
+            {'rank': 1, 'donor_id': 3, 'kg': 2.5},
+            {'rank': 2, 'donor_id': 1, 'kg': 1.0},
+        ])
+
+
+
+class CappedQuery:
+    """Chainable query over in-memory rows; like PostgREST's max-rows, responses stop at `max_rows`."""
+
+    def __init__(self, supabase, name):
+        self.supabase = supabase
+        self.name = name
+        self.rows = list(supabase.tables.get(name, []))
+
+    def select(self, *args):
+        return self
+
+    def in_(self, column, values):
+        self.rows = [row for row in self.rows if row[column] in values]
+        return self
+
+    def gt(self, column, value):
+        self.rows = [row for row in self.rows if row[column] > value]
+        return self
+
+    def neq(self, column, value):
+        self.rows = [row for row in self.rows if row[column] != value]
+        return self
+
+    def order(self, column):
+        self.rows.sort(key=lambda row: row[column])
+        return self
+
+    def limit(self, count):
+        self.rows = self.rows[:count]
+        return self
+
+    def range(self, start, end):
+        self.rows = self.rows[start:end + 1]
+        return self
+
+    def upsert(self, rows, on_conflict):
+        self.supabase.upserts.extend(rows)
+        return self
+
+    def execute(self):
+        return SimpleNamespace(data=self.rows[:self.supabase.max_rows])
+
+
+class CappedSupabase:
+    def __init__(self, max_rows, **tables):
+        self.max_rows = max_rows
+        self.tables = tables
+        self.upserts = []
+
+    def table(self, name):
+        return CappedQuery(self, name)
+
+
+class TestLeaderboardsPersist(unittest.TestCase):
+    """Workers add their own deltas to donor_leaderboard instead of overwriting totals."""
+
+    def test_concurrent_workers_do_not_lose_updates(self):
+        database = FakeIncrementRpc()
+        workers = [Leaderboards(size=10), Leaderboards(size=10)]
+
+        recorded = [{}, {}]
+
+        def write(worker, seed, sent):
+            rng = random.Random(seed)
+            for _ in range(200):
+                donor_id, quantity = rng.randint(1, 5), rng.randint(1, 100)
+                worker.record(donor_id, 7, quantity)
+                for scope in (GLOBAL, campaign_scope(7)):
+                    sent[(scope, donor_id)] = sent.get((scope, donor_id), 0) + quantity
+                if rng.random() < 0.1:
+                    worker.persist(database)
+            worker.persist(database)
+
+        with patch.object(Leaderboards, '_ensure_started'), patch('app.leaderboard.broker'):
+            threads = [threading.Thread(target=write, args=(worker, seed, sent))
+                       for worker, seed, sent in zip(workers, (1, 2), recorded)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        expected = dict(recorded[0])
+        for key, quantity in recorded[1].items():
+            expected[key] = expected.get(key, 0) + quantity
+        self.assertEqual(database.totals, expected)
+
+    def test_failed_persist_keeps_deltas(self):
+        database = FakeIncrementRpc()
+        worker = Leaderboards(size=10)
+        with patch.object(Leaderboards, '_ensure_started'), patch('app.leaderboard.broker'):
+            worker.record(1, None, 50)
+            with patch.object(database, 'rpc', side_effect=RuntimeError("unavailable")):
+                with self.assertRaises(RuntimeError):
+                    worker.persist(database)
+            worker.record(1, None, 25)
+            self.assertEqual(worker.persist(database), 1)
+
+        self.assertEqual(database.totals, {(GLOBAL, 1): 75})
+
+
+    def test_reload_counts_each_delta_once(self):
+        database = FakeIncrementRpc()
+        a, b = Leaderboards(size=10), Leaderboards(size=10)
+        a._id, b._id = "a", "b"
+        events = []
+
+        def kg(worker):
+            return {row['donor_id']: row['kg'] for row in worker.top(GLOBAL)}
+
+        with patch.object(Leaderboards, '_ensure_started'), patch('app.leaderboard.broker') as broker:
+            broker.publish.side_effect = lambda topic, event_type, payload: events.append((event_type, payload))
+
+            a.record(1, None, 100)                      # b receives it before anything is persisted
+            b._on_event(*events.pop())
+            a.record(1, None, 200)                      # b missed it (subscribed late)
+            late = events.pop()
+            a.persist(database)
+            a.record(1, None, 300)                      # in flight while b reloads
+            in_flight = events.pop()
+            b._load(database)
+
+            self.assertEqual(kg(b), {1: 3.0})
+            b._on_event(*late)                          # delivered after the reload: already in the table
+            b._on_event(*in_flight)
+            self.assertEqual(kg(b), {1: 6.0})
+
+            a.persist(database)
+            a._load(database)
+            b._load(database)
+
+            self.assertEqual(kg(a), {1: 6.0})
+            self.assertEqual(kg(b), {1: 6.0})
+        self.assertEqual(database.totals, {(GLOBAL, 1): 600})
+
+
+class TestRebuild(unittest.TestCase):
+    """Test the batch recompute of donor_leaderboard."""
+
+    def test_reads_every_page_when_responses_are_capped(self):
+        supabase = CappedSupabase(
+            3,
+            donations_all=[{'id': 1, 'id_donor': 1, 'id_campaign': 7}, {'id': 2, 'id_donor': 2, 'id_campaign': None}],
+            food_all=[{'id': n, 'id_donation': 1 + n % 2, 'quantity': 100} for n in range(10)],
+            donor_leaderboard=[{'scope': GLOBAL, 'donor_id': donor_id, 'quantity': 1} for donor_id in range(3, 8)],
+        )
+        with patch('app.db.PAGE_SIZE', 3), patch('app.leaderboard.broker'):
+            result = rebuild(supabase, batch_size=3)
+
+        written = {(row['scope'], row['donor_id']): row['quantity'] for row in supabase.upserts}
+        self.assertEqual(result['donations_scanned'], 2)
+        self.assertEqual(written[(GLOBAL, 1)], 500)
+        self.assertEqual(written[(campaign_scope(7), 1)], 500)
+        self.assertEqual(written[(GLOBAL, 2)], 500)
+        # Every stale row is reset, not only the first page of them
+        self.assertEqual([donor_id for (scope, donor_id), quantity in written.items() if quantity == 0],
+                         [3, 4, 5, 6, 7])
+
+
+class TestLeaderboardRoutes(unittest.TestCase):
+    """Test the leaderboard endpoints."""
+
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.client = self.app.test_client()
+
+    @patch('app.donors.leaderboards')
+    def test_limit_is_clamped(self, mock_leaderboards):
+        mock_leaderboards.top.return_value = []
+
+        for limit, expected in [(0, 1), (-5, 1), (LEADERBOARD_SIZE + 1, LEADERBOARD_SIZE), (1, 1)]:
+            self.client.get('/donors/leaderboard', query_string={'limit': limit})
+            self.assertEqual(mock_leaderboards.top.call_args[0], (GLOBAL, expected))
+
+
+if __name__ == '__main__':
+    unittest.main()
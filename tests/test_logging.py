@@ -0,0 +1,62 @@
+import json
+import logging
+import threading
+import unittest
+from unittest.mock import patch
+from flask import Flask
+from app.logging_setup import JsonFormatter, NonBlockingQueueHandler, RequestContextFilter, parse_sample_rates
+
+
+def make_record(level=logging.INFO, msg="hello", **extra):
+    record = logging.LogRecord('app.test', level, __file__, 1, msg, (), None)
+    record.__dict__.update(extra)
+    return record
+
+
+class TestLogging(unittest.TestCase):
+    """Test the JSON log formatter, sampling filter and queue handler."""
+
+    def test_long_fields_are_truncated(self):
+        entry = json.loads(JsonFormatter(max_field_length=10).format(make_record(msg="x" * 25, qr="q" * 12, n=7)))
+
+        self.assertEqual(entry['msg'], "xxxxxxxxxx...[15 more chars]")
+        self.assertEqual(entry['qr'], "qqqqqqqqqq...[2 more chars]")
+        self.assertEqual(entry['n'], 7)
+
+    def test_sampling_only_drops_info_and_below(self):
+        app = Flask(__name__)
+        app.add_url_rule('/qr', 'qr', lambda: '')
+        sampler = RequestContextFilter(parse_sample_rates("qr=0.1,default=1"))
+
+        with app.test_request_context('/qr'):
+            with patch('app.logging_setup.random.random', return_value=0.5):
+                self.assertFalse(sampler.filter(make_record(logging.INFO)))
+                self.assertTrue(sampler.filter(make_record(logging.WARNING)))
+            with patch('app.logging_setup.random.random', return_value=0.05):
+                self.assertTrue(sampler.filter(make_record(logging.INFO)))
+
+        # Outside a request nothing is sampled
+        self.assertTrue(sampler.filter(make_record(logging.DEBUG)))
+
+    @patch('app.logging_setup.atexit.register')
+    @patch('app.logging_setup.QueueListener')
+    def test_listener_is_started_once_under_concurrent_logging(self, listener, register):
+        handler = NonBlockingQueueHandler(logging.NullHandler())
+        barrier = threading.Barrier(8)
+
+        def log():
+            barrier.wait()
+            handler._ensure_listener()
+
+        threads = [threading.Thread(target=log) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        listener.assert_called_once()
+        register.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
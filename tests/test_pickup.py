@@ -0,0 +1,122 @@
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+import numpy as np
+from app import create_app
+from app.pickup import haversine_matrix, nearest_neighbour, plan_routes, route_length, two_opt
+from tests import TestConfig
+
+
+class CappedQuery:
+    def __init__(self, supabase, name):
+        self.supabase = supabase
+        self.rows = list(supabase.tables[name])
+        self.sort = []
+
+    def select(self, columns):
+        return self
+
+    def gt(self, column, value):
+        self.rows = [row for row in self.rows if row[column] > value]
+        return self
+
+    def in_(self, column, values):
+        self.supabase.in_sizes.append(len(values))
+        self.rows = [row for row in self.rows if row[column] in values]
+        return self
+
+    def order(self, column):
+        self.sort.append(column)
+        self.rows = sorted(self.rows, key=lambda row: tuple(row[key] for key in self.sort))
+        return self
+
+    def range(self, start, end):
+        self.rows = self.rows[start:end + 1]
+        return self
+
+    def limit(self, count):
+        self.rows = self.rows[:count]
+        return self
+
+    def execute(self):
+        # Like PostgREST's max-rows: longer results are cut without an error
+        return SimpleNamespace(data=self.rows[:self.supabase.max_rows])
+
+
+class CappedSupabase:
+    def __init__(self, max_rows, **tables):
+        self.max_rows = max_rows
+        self.tables = tables
+        self.in_sizes = []
+
+    def table(self, name):
+        return CappedQuery(self, name)
+
+
+class TestPickupRoutes(unittest.TestCase):
+    """Test the pickup route heuristics."""
+
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        self.stops = [{'lat': 19.3 + rng.random() * 0.3, 'lon': -99.3 + rng.random() * 0.3} for _ in range(200)]
+        self.depot = (19.43, -99.13)
+
+    def test_haversine_known_distance(self):
+        # One degree of latitude is about 111.2 km
+        dist = haversine_matrix(np.array([0.0, 1.0]), np.array([0.0, 0.0]))
+        self.assertAlmostEqual(dist[0, 1], 111.2, delta=0.1)
+        self.assertEqual(dist[0, 0], 0)
+
+    def test_two_opt_never_makes_a_route_longer(self):
+        lat = np.array([self.depot[0]] + [stop['lat'] for stop in self.stops])
+        lon = np.array([self.depot[1]] + [stop['lon'] for stop in self.stops])
+        dist = haversine_matrix(lat, lon)
+        route = nearest_neighbour(dist, range(1, len(lat)))
+
+        improved = two_opt(dist, route)
+
+        self.assertLessEqual(route_length(dist, improved), route_length(dist, route))
+        self.assertEqual(improved[0], 0)
+        self.assertEqual(improved[-1], 0)
+        self.assertEqual(sorted(improved[1:-1].tolist()), list(range(1, len(lat))))
+
+    def test_every_stop_is_visited_once_across_vehicles(self):
+        routes = plan_routes(self.depot, self.stops, vehicles=3)
+
+        self.assertEqual(len(routes), 3)
+        visited = sorted(index for order, _ in routes for index in order)
+        self.assertEqual(visited, list(range(len(self.stops))))
+
+    def test_more_vehicles_than_stops(self):
+        routes = plan_routes(self.depot, self.stops[:2], vehicles=4)
+
+        self.assertEqual(sum(len(order) for order, _ in routes), 2)
+        self.assertTrue(all(distance >= 0 for _, distance in routes))
+
+
+class TestPlanRoute(unittest.TestCase):
+    """Test /routes/plan against capped responses."""
+
+    def test_every_stop_is_read_when_responses_are_capped(self):
+        supabase = CappedSupabase(
+            3,
+            donation_point_inventory=[
+                {'id_point': point, 'category': category, 'items': 1, 'quantity': 100}
+                for point in range(1, 6) for category in ('grain', 'dairy')
+            ] + [{'id_point': 6, 'category': 'grain', 'items': 0, 'quantity': 0}],
+            donation_points=[{'id': point, 'name': f'P{point}', 'address': '', 'lat': 19.4 + point / 100, 'lon': -99.1}
+                             for point in range(1, 7)],
+        )
+        client = create_app(TestConfig).test_client()
+        with patch('app.pickup_routes.supabase', supabase), patch('app.pickup_routes.PAGE_SIZE', 3), \
+                patch('app.db.PAGE_SIZE', 3), patch('app.db.IN_CHUNK_SIZE', 2):
+            response = client.post('/routes/plan', json={'depot_lat': 19.43, 'depot_lon': -99.13})
+
+        body = response.get_json()
+        self.assertEqual(body['total_stops'], 5)
+        self.assertEqual(sorted(stop['kg'] for stop in body['routes'][0]['stops']), [2.0] * 5)
+        self.assertTrue(all(size <= 2 for size in supabase.in_sizes))
+
+
+if __name__ == '__main__':
+    unittest.main()
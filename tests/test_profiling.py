@@ -0,0 +1,67 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+from app import create_app
+from app.profiling import _backend_breakdown, _should_profile
+from tests import TestConfig
+
+
+class TestProfiling(unittest.TestCase):
+    """Test the opt-in request profiler."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.app = create_app(TestConfig)
+        self.app.config.update(PROFILE_TOKEN='secret-token', PROFILE_SAMPLE_RATE=0, PROFILE_DIR=self.directory)
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def should_profile(self, headers=None):
+        with self.app.test_request_context('/health/live', headers=headers or {}):
+            return _should_profile(self.app)
+
+    def test_token_gate(self):
+        self.assertTrue(self.should_profile({'X-Profile': 'secret-token'}))
+        self.assertFalse(self.should_profile({'X-Profile': 'wrong'}))
+        self.assertFalse(self.should_profile())
+
+        # Without a configured token the header enables nothing
+        self.app.config['PROFILE_TOKEN'] = None
+        self.assertFalse(self.should_profile({'X-Profile': 'secret-token'}))
+
+    def test_sampling_decision(self):
+        self.app.config['PROFILE_SAMPLE_RATE'] = 0.25
+        with patch('app.profiling.random.random', return_value=0.2):
+            self.assertTrue(self.should_profile())
+        with patch('app.profiling.random.random', return_value=0.3):
+            self.assertFalse(self.should_profile())
+
+    def test_profiled_request_writes_stats_and_summary(self):
+        response = self.client.get('/health/live', headers={'X-Profile': 'secret-token'})
+
+        profile_id = response.headers['X-Profile-Id']
+        self.assertTrue(os.path.exists(os.path.join(self.directory, f"{profile_id}.pstats")))
+        with open(os.path.join(self.directory, f"{profile_id}.json")) as f:
+            summary = json.load(f)
+        self.assertEqual(summary['route'], '/health/live')
+        self.assertEqual(summary['backend_calls'], [])
+
+    def test_unprofiled_request_writes_nothing(self):
+        response = self.client.get('/health/live')
+
+        self.assertNotIn('X-Profile-Id', response.headers)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_backend_breakdown(self):
+        calls = [{'table': 'donors', 'ms': 1.5}, {'table': 'food', 'ms': 2.0}, {'table': 'donors', 'ms': 0.5}]
+
+        self.assertEqual(_backend_breakdown(calls), {'donors': {'calls': 2, 'ms': 2.0}, 'food': {'calls': 1, 'ms': 2.0}})
+
+
+if __name__ == '__main__':
+    unittest.main()
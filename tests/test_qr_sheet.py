@@ -0,0 +1,50 @@
+import io
+import unittest
+import zipfile
+from unittest.mock import patch
+from PIL import Image
+from app import qr_sheet
+
+
+class TestQrSheet(unittest.TestCase):
+    """Test printable QR label sheets (rendered inline, without the process pool)."""
+
+    def setUp(self):
+        patcher = patch.object(qr_sheet, 'WORKERS', 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.labels = [(f"token-{i}", f"#{i}") for i in range(14)]
+
+    def read(self, labels, fmt, columns=3, rows=4):
+        handle, mimetype = qr_sheet.build_sheet(labels, fmt, columns, rows)
+        return b"".join(qr_sheet.stream_file(handle)), mimetype
+
+    def test_pages_hold_columns_times_rows_labels(self):
+        pages = list(qr_sheet.pages(self.labels, qr_sheet.SheetLayout(3, 4)))
+
+        self.assertEqual(len(pages), 2)
+        self.assertEqual(pages[0].size, qr_sheet.PAGE_SIZE)
+        self.assertEqual(pages[0].mode, '1')
+
+    def test_pdf(self):
+        data, mimetype = self.read(self.labels, 'pdf')
+
+        self.assertEqual(mimetype, 'application/pdf')
+        self.assertTrue(data.startswith(b'%PDF'))
+
+    def test_single_page_png(self):
+        data, mimetype = self.read(self.labels[:5], 'png')
+
+        self.assertEqual(mimetype, 'image/png')
+        self.assertEqual(Image.open(io.BytesIO(data)).size, qr_sheet.PAGE_SIZE)
+
+    def test_multi_page_png_is_a_zip_of_pages(self):
+        data, mimetype = self.read(self.labels, 'png', columns=2, rows=2)
+
+        self.assertEqual(mimetype, 'application/zip')
+        names = zipfile.ZipFile(io.BytesIO(data)).namelist()
+        self.assertEqual(names, [f"labels-{n:03d}.png" for n in range(1, 5)])
+
+
+if __name__ == '__main__':
+    unittest.main()
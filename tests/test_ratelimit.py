@@ -0,0 +1,53 @@
+import unittest
+from unittest.mock import patch
+from app import create_app
+from app.ratelimit import Admission, LocalBuckets, parse_limits
+from tests import TestConfig
+
+
+class RateLimitConfig(TestConfig):
+    RATE_LIMITS = '/donors/login=2/60'
+    MAX_CONCURRENT_REQUESTS = 0
+
+
+class TestRateLimit(unittest.TestCase):
+    """Test per-client rate limiting and admission control."""
+
+    def test_parse_limits(self):
+        self.assertEqual(parse_limits('/a=10/60, /b=1/0.5,/c=x/1,/d=0/1'), {'/a': (10, 60.0), '/b': (1, 0.5)})
+
+    def test_bucket_refills(self):
+        buckets = LocalBuckets()
+        with patch('app.ratelimit.time.monotonic', side_effect=[0.0, 0.0, 0.0, 1.0]):
+            self.assertEqual(buckets.take('k', 2, 1.0), 0)
+            self.assertEqual(buckets.take('k', 2, 1.0), 0)
+            self.assertAlmostEqual(buckets.take('k', 2, 1.0), 1.0)
+            self.assertEqual(buckets.take('k', 2, 1.0), 0)
+
+    def test_admission_caps_concurrent_requests(self):
+        admission = Admission(1)
+        self.assertTrue(admission.acquire())
+        self.assertFalse(admission.acquire())
+        admission.release()
+        self.assertTrue(admission.acquire())
+
+    @patch('app.donors.supabase')
+    def test_login_is_rejected_before_the_backend(self, mock_supabase):
+        client = create_app(RateLimitConfig).test_client()
+        body = {'email': 'a@b.com', 'password': 'x'}
+        client.post('/donors/login', json=body)
+        client.post('/donors/login', json=body)
+        calls = mock_supabase.table.call_count
+
+        response = client.post('/donors/login', json=body)
+
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response.headers['Retry-After']), 1)
+        self.assertEqual(mock_supabase.table.call_count, calls)
+        # Other clients have their own bucket
+        other = client.post('/donors/login', json=body, environ_base={'REMOTE_ADDR': '10.0.0.2'})
+        self.assertNotEqual(other.status_code, 429)
+
+
+if __name__ == '__main__':
+    unittest.main()
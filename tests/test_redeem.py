@@ -0,0 +1,117 @@
+import unittest
+from unittest.mock import patch, MagicMock
+from app import create_app
+from app.qr_tokens import SigningKeyMissing, sign_qr_token, verify_qr_token, redeemed
+from tests import TestConfig
+
+
+class TestRedeem(unittest.TestCase):
+    """Test signed QR tokens and /donations/redeem."""
+
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+    def tearDown(self):
+        self.app_context.pop()
+
+    def test_token_round_trip(self):
+        token = sign_qr_token(42, 7)
+        self.assertEqual(verify_qr_token(token), ('42', '7'))
+
+    def test_tampered_token_is_rejected(self):
+        token = sign_qr_token(42, 7)
+        self.assertIsNone(verify_qr_token(token.replace('PD1.42.', 'PD1.43.')))
+        self.assertIsNone(verify_qr_token('42'))
+
+    @patch('app.donations.supabase')
+    def test_redeem_once(self, mock_supabase):
+        redeemed.release('101')
+        query = mock_supabase.table.return_value.update.return_value
+        query.eq.return_value.eq.return_value.execute.return_value = MagicMock(
+            data=[{'id': 101, 'id_point': 7, 'pending': False, 'qr': 'blob'}]
+        )
+        token = sign_qr_token(101, 7)
+
+        response = self.client.post('/donations/redeem', json={'token': token, 'id_point': 7})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('qr', response.get_json()['donation'])
+
+        response = self.client.post('/donations/redeem', json={'token': token, 'id_point': 7})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(mock_supabase.table.call_count, 1)
+
+    @patch('app.donations.supabase')
+    def test_invalid_token_never_reaches_backend(self, mock_supabase):
+        response = self.client.post('/donations/redeem', json={'token': 'PD1.1.1.forged'})
+        self.assertEqual(response.status_code, 400)
+        mock_supabase.table.assert_not_called()
+
+    @patch('app.donations.supabase')
+    def test_wrong_point_is_rejected(self, mock_supabase):
+        token = sign_qr_token(102, 7)
+        response = self.client.post('/donations/redeem', json={'token': token, 'id_point': 8})
+        self.assertEqual(response.status_code, 409)
+        mock_supabase.table.assert_not_called()
+
+    def test_missing_signing_key_fails_closed(self):
+        token = sign_qr_token(42, 7)
+        self.app.config['QR_SIGNING_KEY'] = None
+        with self.assertRaises(SigningKeyMissing):
+            sign_qr_token(42, 7)
+        with self.assertRaises(SigningKeyMissing):
+            verify_qr_token(token)
+
+    @patch('app.donations.supabase')
+    def test_redeem_without_signing_key_is_unavailable(self, mock_supabase):
+        token = sign_qr_token(103, 7)
+        self.app.config['QR_SIGNING_KEY'] = None
+        response = self.client.post('/donations/redeem', json={'token': token})
+        self.assertEqual(response.status_code, 503)
+        mock_supabase.table.assert_not_called()
+
+    @patch('app.donations.supabase')
+    def test_create_without_signing_key_writes_nothing(self, mock_supabase):
+        self.app.config['QR_SIGNING_KEY'] = None
+        response = self.client.post('/donations/create', json={
+            'id': 104, 'date': '2026-10-01', 'time': '10:00:00', 'state': 'new', 'id_donor': 1,
+            'id_point': 7, 'type': 'food', 'pending': True,
+            'foods': [{'name': 'rice', 'quantity': 100, 'category': 'grain', 'perishable': False}],
+        })
+        self.assertEqual(response.status_code, 503)
+        mock_supabase.table.assert_not_called()
+
+    @patch('app.db.IN_CHUNK_SIZE', 2)
+    @patch('app.donations.supabase')
+    def test_qr_sheet_without_signing_key_is_unavailable(self, mock_supabase):
+        query = mock_supabase.table.return_value.select.return_value.in_.return_value
+        query.order.return_value.limit.return_value.execute.return_value = MagicMock(
+            data=[{'id': 105, 'id_point': 7, 'date': '2026-10-01', 'type': 'food', 'pending': True}]
+        )
+        self.app.config['QR_SIGNING_KEY'] = None
+        response = self.client.post('/donations/qrcode/sheet', json={'ids': [101, 102, 103, 104, 105]})
+        self.assertEqual(response.status_code, 503)
+        chunks = [call.args[1] for call in mock_supabase.table.return_value.select.return_value.in_.call_args_list]
+        self.assertEqual(chunks, [[101, 102], [103, 104], [105]])
+
+    def test_legacy_ids_only_behind_flag(self):
+        self.assertIsNone(verify_qr_token('42'))
+        self.app.config['QR_ACCEPT_LEGACY_IDS'] = True
+        self.assertEqual(verify_qr_token('42'), ('42', None))
+
+    @patch('app.donations.supabase')
+    def test_legacy_id_checks_point_in_update(self, mock_supabase):
+        redeemed.release('105')
+        self.app.config['QR_ACCEPT_LEGACY_IDS'] = True
+        query = mock_supabase.table.return_value.update.return_value.eq.return_value.eq.return_value
+        query.eq.return_value.execute.return_value = MagicMock(data=[])
+
+        response = self.client.post('/donations/redeem', json={'token': '105', 'id_point': 8})
+        self.assertEqual(response.status_code, 409)
+        query.eq.assert_called_once_with('id_point', 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+from unittest.mock import patch
+import httpx
+from app import resilience
+from app.resilience import CircuitBreaker, BreakerTransport, CircuitOpenError, stale_read
+
+
+class FailingTransport(httpx.BaseTransport):
+    """Transport that always times out."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def handle_request(self, request):
+        self.calls += 1
+        raise httpx.ReadTimeout("timed out", request=request)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    """Test the backend circuit breaker."""
+
+    def test_opens_after_threshold_and_fails_fast(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        inner = FailingTransport()
+        client = httpx.Client(transport=BreakerTransport(inner, breaker))
+
+        for _ in range(2):
+            with self.assertRaises(httpx.ReadTimeout):
+                client.get('http://backend/rest/v1/campaigns')
+
+        with self.assertRaises(CircuitOpenError):
+            client.get('http://backend/rest/v1/campaigns')
+        self.assertEqual(inner.calls, 2)
+
+    def test_half_open_probe_closes_circuit(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+
+class TestStaleRead(unittest.TestCase):
+    """Test the stale-if-error read policy."""
+
+    def test_serves_last_good_data_when_backend_fails(self):
+        with patch.object(resilience, 'STALE_FRESH_TTL', 0), \
+                patch.object(resilience, 'STALE_WHILE_REVALIDATE', 0):
+            data, age = stale_read('test:points', lambda: [{'id': 1}])
+            self.assertEqual(data, [{'id': 1}])
+            self.assertIsNone(age)
+
+            def failing():
+                raise RuntimeError('backend down')
+
+            data, age = stale_read('test:points', failing)
+            self.assertEqual(data, [{'id': 1}])
+            self.assertIsNotNone(age)
+
+    def test_raises_without_fallback(self):
+        def failing():
+            raise RuntimeError('backend down')
+
+        with self.assertRaises(RuntimeError):
+            stale_read('test:empty', failing)
+
+
+if __name__ == '__main__':
+    unittest.main()
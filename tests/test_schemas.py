@@ -0,0 +1,51 @@
+import unittest
+from unittest.mock import patch, MagicMock
+from app import create_app
+from tests import TestConfig
+
+
+class TestRequestSchemas(unittest.TestCase):
+    """Test that bad payloads are rejected before any backend call."""
+
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.client = self.app.test_client()
+
+    @patch('app.donors.supabase')
+    def test_missing_field(self, mock_supabase):
+        response = self.client.post('/donors/create', json={'name': 'Ana', 'email': 'ana@example.com'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()['error'], 'Missing required field: phone')
+        mock_supabase.table.assert_not_called()
+
+    @patch('app.donations.supabase')
+    def test_invalid_nested_type(self, mock_supabase):
+        response = self.client.post('/donations/create', json={
+            'id': 1, 'date': '2024-05-01', 'time': '10:00', 'state': 'new',
+            'id_donor': 1, 'id_point': 2, 'type': 'drop-off', 'pending': True,
+            'foods': [{'name': 'Rice', 'quantity': 'lots', 'category': 'grains', 'perishable': False}]
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('foods.0.quantity', response.get_json()['error'])
+        mock_supabase.table.assert_not_called()
+
+    @patch('app.donors.supabase')
+    def test_invalid_json(self, mock_supabase):
+        response = self.client.post('/donors/login', data='{not json', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()['error'], 'Invalid JSON body')
+
+    @patch('app.donors.supabase')
+    def test_password_is_never_returned(self, mock_supabase):
+        mock_supabase.table.return_value.insert.return_value.execute.return_value = MagicMock(
+            data=[{'id': 1, 'name': 'Ana', 'email': 'ana@example.com', 'phone': '555', 'password': 'hash'}]
+        )
+        response = self.client.post('/donors/create', json={
+            'name': 'Ana', 'email': 'ana@example.com', 'phone': '555', 'password': 'secret'
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('password', response.get_json())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+from app import create_app
+from tests import TestConfig
+
+
+class TestSearch(unittest.TestCase):
+    """Test the /donors/search typeahead."""
+
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.client = self.app.test_client()
+
+    @patch('app.donors.supabase')
+    def test_search_ranks_through_the_rpc(self, mock_supabase):
+        mock_supabase.rpc.return_value.execute.return_value = SimpleNamespace(
+            data=[{'id': 1, 'name': 'Ana Ruiz', 'email': 'ana@x.com'}])
+
+        response = self.client.get('/donors/search', query_string={'q': ' ana '})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['total'], 1)
+        mock_supabase.rpc.assert_called_once_with("search_donors", {'q': 'ana', 'k': 10})
+
+    @patch('app.donors.supabase')
+    def test_limit_is_clamped(self, mock_supabase):
+        mock_supabase.rpc.return_value.execute.return_value = SimpleNamespace(data=[])
+
+        for limit, expected in [(0, 1), (-5, 1), (500, 50), (20, 20)]:
+            self.client.get('/donors/search', query_string={'q': 'ana', 'limit': limit})
+            self.assertEqual(mock_supabase.rpc.call_args[0][1]['k'], expected)
+
+    @patch('app.donors.supabase')
+    def test_short_queries_never_reach_the_backend(self, mock_supabase):
+        response = self.client.get('/donors/search', query_string={'q': 'a'})
+
+        self.assertEqual(response.get_json(), {'donors': [], 'total': 0})
+        mock_supabase.rpc.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import importlib.util
+import os
+import threading
+import unittest
+from unittest.mock import patch
+from postgrest.exceptions import APIError
+from app.db import create_supabase_client
+from app.inventory import read_inventory
+from app.resilience import CircuitBreaker
+
+spec = importlib.util.spec_from_file_location(
+    "postgrest_standin", os.path.join(os.path.dirname(os.path.dirname(__file__)), "tools", "postgrest_standin.py"))
+standin = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(standin)
+
+
+class TestStandin(unittest.TestCase):
+    """Smoke test of the PostgREST stand-in through the real Supabase client."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = standin.serve(':memory:', '127.0.0.1', 0)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        cls.supabase = create_supabase_client(url, "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.abc", CircuitBreaker())
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_crud_filters_and_paging(self):
+        donors = self.supabase.table("donors")
+        donors.insert([{'id': n, 'name': f'Donor {n}', 'email': f'd{n}@x.com'} for n in range(1, 6)]).execute()
+
+        rows = donors.select("id,name").in_('id', [1, 2, 3]).neq('id', 2).order('id', desc=True).execute().data
+        self.assertEqual([row['id'] for row in rows], [3, 1])
+        page = donors.select("id", count="exact").order('id').range(2, 3).execute()
+        self.assertEqual(([row['id'] for row in page.data], page.count), ([3, 4], 5))
+        rows = donors.select("id").or_('id.eq.1,and(id.gt.3,name.ilike.*5)').order('id').execute().data
+        self.assertEqual([row['id'] for row in rows], [1, 5])
+
+        donors.update({'name': 'Renamed'}).eq('id', 1).execute()
+        donors.upsert([{'id': 2, 'name': 'Upserted', 'email': 'd2@x.com'}]).execute()
+        donors.delete().eq('id', 5).execute()
+        rows = donors.select("id,name").order('id').limit(2).execute().data
+        self.assertEqual(rows, [{'id': 1, 'name': 'Renamed'}, {'id': 2, 'name': 'Upserted'}])
+        self.assertEqual(len(donors.select("id").execute().data), 4)
+
+    def test_inventory_follows_donation_and_food_writes(self):
+        self.supabase.table("donations").insert(
+            [{'id': 100, 'id_point': 10, 'pending': True, 'date': '2026-10-01'}]).execute()
+        self.supabase.table("food").insert([
+            {'id_donation': 100, 'name': 'rice', 'category': 'grain', 'quantity': 300, 'perishable': False},
+            {'id_donation': 100, 'name': 'milk', 'category': 'dairy', 'quantity': 100, 'perishable': True},
+        ]).execute()
+
+        inventory = read_inventory(self.supabase, 10)
+        self.assertEqual((inventory['total_items'], inventory['total_kg']), (2, 4.0))
+
+        self.supabase.table("donations").update({'pending': False}).eq('id', 100).execute()
+        self.assertEqual(read_inventory(self.supabase, 10)['total_items'], 0)
+
+    def test_rpc_and_views(self):
+        self.supabase.table("donations").insert(
+            [{'id': 200, 'id_donor': 1, 'id_campaign': 7, 'pending': False, 'date': '2020-01-01'}]).execute()
+        self.supabase.table("food").insert(
+            [{'id_donation': 200, 'name': 'beans', 'category': 'grain', 'quantity': 250, 'perishable': False}]).execute()
+
+        moved = self.supabase.rpc("archive_donations", {'p_before': '2021-01-01', 'p_limit': 10}).execute().data
+        self.assertEqual(moved, 1)
+        self.assertEqual(self.supabase.table("donations").select("id").eq('id', 200).execute().data, [])
+        self.assertEqual(len(self.supabase.table("donations_all").select("id").eq('id', 200).execute().data), 1)
+        dashboard = self.supabase.rpc("campaign_dashboard", {'p_campaign_id': 7}).execute().data
+        self.assertEqual((dashboard['donations'], dashboard['total_kg']), (1, 2.5))
+
+        self.supabase.rpc("leaderboard_add", {
+            'p_deltas': [{'scope': 'global', 'donor_id': 1, 'quantity': 250}], 'p_origin': 'w1', 'p_seq': 3}).execute()
+        self.supabase.rpc("leaderboard_add", {'p_deltas': [], 'p_origin': 'w1', 'p_seq': 2}).execute()
+        snapshot = self.supabase.rpc("leaderboard_snapshot", {}).execute().data
+        self.assertEqual(snapshot, {'rows': [['global', 1, 250]], 'watermarks': {'w1': 3}})
+
+    def test_failed_rpc_rolls_back(self):
+        def fail_half_way(store, args):
+            with store.transaction():
+                store.conn.execute("insert into donors (id, name) values (900, 'Half way')")
+                raise ValueError("failed after the first write")
+
+        self.supabase.table("donors").insert([{'id': 899, 'name': 'Before', 'email': 'b@x.com'}]).execute()
+        with patch.dict(standin.Handler.rpc, {'fail_half_way': fail_half_way}):
+            with self.assertRaises(APIError):
+                self.supabase.rpc("fail_half_way", {}).execute()
+
+        self.assertEqual(self.supabase.table("donors").select("id").eq('id', 900).execute().data, [])
+        # The shared connection is out of the transaction: later writes commit
+        self.supabase.table("donors").insert([{'id': 901, 'name': 'After', 'email': 'a@x.com'}]).execute()
+        self.assertEqual(self.supabase.table("donors").select("id").eq('id', 901).execute().data, [{'id': 901}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+import unittest
+from datetime import date
+from types import SimpleNamespace
+from unittest.mock import patch
+import numpy as np
+from app.timeseries import DonationColumns, aggregate, bucket_starts, load_columns, parse_range
+
+
+class CappedQuery:
+    """PostgREST-like query whose responses never hold more than `max_rows` rows."""
+
+    def __init__(self, rows, max_rows):
+        self.rows = rows
+        self.max_rows = max_rows
+        self.limit_rows = None
+
+    def select(self, *args):
+        return self
+
+    def in_(self, column, values):
+        self.rows = [row for row in self.rows if row[column] in values]
+        return self
+
+    def gte(self, column, value):
+        self.rows = [row for row in self.rows if row[column] >= value]
+        return self
+
+    def lte(self, column, value):
+        self.rows = [row for row in self.rows if row[column] <= value]
+        return self
+
+    def gt(self, column, value):
+        self.rows = [row for row in self.rows if row[column] > value]
+        return self
+
+    def order(self, column):
+        self.rows = sorted(self.rows, key=lambda row: row[column])
+        return self
+
+    def limit(self, count):
+        self.limit_rows = count
+        return self
+
+    def execute(self):
+        return SimpleNamespace(data=self.rows[:min(self.max_rows, self.limit_rows or self.max_rows)])
+
+
+class CappedSupabase:
+    def __init__(self, max_rows, **tables):
+        self.max_rows = max_rows
+        self.tables = tables
+
+    def table(self, name):
+        return CappedQuery(list(self.tables[name]), self.max_rows)
+
+
+def columns():
+    # Donations 1-3 on May 1, 2 and 8; food rows reference them by position
+    return DonationColumns(
+        ids=np.array([1, 2, 3]),
+        days=np.array(['2024-05-01', '2024-05-02', '2024-05-08'], dtype='datetime64[D]'),
+        points=np.array([10, 20, 10]),
+        food_donation=np.array([0, 0, 1, 2]),
+        quantity=np.array([200.0, 100.0, 300.0, 400.0]),
+        category=np.array([0, 1, 0, 1]),
+        perishable=np.array([False, True, False, True]),
+        categories=['grain', 'produce'],
+    )
+
+
+class TestTimeseries(unittest.TestCase):
+    """Test the vectorized time-series aggregates."""
+
+    def test_daily_buckets(self):
+        result = aggregate(columns(), date(2024, 5, 1), date(2024, 5, 3))
+
+        self.assertEqual(result['buckets'], ['2024-05-01', '2024-05-02', '2024-05-03'])
+        self.assertEqual(result['donations'], [1, 1, 0])
+        self.assertEqual(result['kg'], [3.0, 3.0, 0.0])
+        self.assertEqual(result['perishable_ratio'], [0.33, 0.0, 0.0])
+        self.assertEqual(result['categories'], {'grain': [2.0, 3.0, 0.0], 'produce': [1.0, 0.0, 0.0]})
+
+    def test_weekly_buckets_start_on_monday(self):
+        result = aggregate(columns(), date(2024, 5, 1), date(2024, 5, 8), 'week')
+
+        self.assertEqual(result['buckets'], ['2024-04-29', '2024-05-06'])
+        self.assertEqual(result['donations'], [2, 1])
+        self.assertEqual(result['kg'], [6.0, 4.0])
+
+    def test_per_point_breakdown(self):
+        result = aggregate(columns(), date(2024, 5, 1), date(2024, 5, 8), 'week')
+
+        self.assertEqual(result['points']['10']['donations'], [1, 1])
+        self.assertEqual(result['points']['10']['categories'], {'grain': [2.0, 0.0], 'produce': [1.0, 4.0]})
+        self.assertEqual(result['points']['20']['kg'], [3.0, 0.0])
+
+    def test_empty_range(self):
+        empty = DonationColumns(np.empty(0, dtype=np.int64), np.empty(0, dtype='datetime64[D]'),
+                                np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0),
+                                np.empty(0, dtype=np.int64), np.empty(0, dtype=bool), [])
+        result = aggregate(empty, date(2024, 5, 1), date(2024, 5, 2))
+
+        self.assertEqual(result['donations'], [0, 0])
+        self.assertEqual(result['points'], {})
+
+    def test_bucket_starts(self):
+        starts = bucket_starts(date(2024, 5, 1), date(2024, 5, 14), 'week')
+        self.assertEqual([str(day) for day in starts], ['2024-04-29', '2024-05-06', '2024-05-13'])
+
+    def test_parse_range_rejects_reversed_dates(self):
+        with self.assertRaises(ValueError):
+            parse_range('2024-05-02', '2024-05-01')
+
+    def test_load_columns_reads_every_food_page(self):
+        # Two donations with 5 food rows each, responses capped at 3 rows
+        supabase = CappedSupabase(
+            3,
+            donations=[{'id': 1, 'date': '2024-05-01', 'id_point': 10}, {'id': 2, 'date': '2024-05-02', 'id_point': 10}],
+            food=[
+                {'id': food_id, 'id_donation': 1 + food_id % 2, 'quantity': 100, 'category': 'grain', 'perishable': False}
+                for food_id in range(10)
+            ],
+        )
+        with patch('app.timeseries.CHUNK_SIZE', 3), patch('app.db.PAGE_SIZE', 3), \
+                patch('app.archive.tables_for_range', return_value=('donations', 'food')):
+            columns = load_columns(supabase, date(2024, 5, 1), date(2024, 5, 2))
+
+        self.assertEqual(len(columns.quantity), 10)
+        self.assertEqual(aggregate(columns, date(2024, 5, 1), date(2024, 5, 2))['kg'], [5.0, 5.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
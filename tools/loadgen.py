@@ -0,0 +1,208 @@
+"""
+Scripted load generator for the API.
+
+Seeds a donation point and a pool of donors, then runs a weighted mix of
+scenarios from a number of worker threads for a fixed duration:
+
+    donor_login      POST /donors/login
+    donation_create  POST /donations/create (one food item)
+    staff_polling    GET /donations/changes with a watermark, plus /donations/pending
+
+Reports throughput and latency percentiles per scenario.
+
+Usage:
+    python tools/loadgen.py --base-url http://127.0.0.1:5000 --concurrency 32 --duration 60
+    python tools/loadgen.py --mix donor_login=1,donation_create=3,staff_polling=6
+"""
+import argparse
+import itertools
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+import httpx
+
+DEFAULT_MIX = "donor_login=2,donation_create=3,staff_polling=5"
+PASSWORD = "loadgen-password"
+CATEGORIES = ("grain", "canned", "dairy", "produce", "bakery")
+
+
+class Recorder:
+    """Per-scenario latency samples and error counts, shared by all workers."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def record(self, scenario, seconds, status):
+        with self.lock:
+            self.latencies[scenario].append(seconds)
+            self.statuses[scenario][status] += 1
+            if status is None or status >= 400:
+                self.errors[scenario] += 1
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def parse_mix(spec):
+    """'donor_login=1,staff_polling=3' -> [('donor_login', 1.0), ('staff_polling', 3.0)]"""
+    mix = []
+    for item in spec.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() not in SCENARIOS:
+            raise SystemExit(f"unknown scenario: {name}")
+        mix.append((name.strip(), float(weight or 1)))
+    return mix
+
+
+class Session:
+    """State for one worker: its HTTP client, donor and polling watermark."""
+
+    def __init__(self, client, donors, point_id, donation_ids):
+        self.client = client
+        self.donor = random.choice(donors)
+        self.point_id = point_id
+        self.donation_ids = donation_ids
+        self.watermark = {}
+
+
+def donor_login(session):
+    return session.client.post("/donors/login", json={
+        'email': session.donor['email'],
+        'password': PASSWORD,
+    })
+
+
+def donation_create(session):
+    return session.client.post("/donations/create", json={
+        'id': next(session.donation_ids),
+        'date': time.strftime("%Y-%m-%d"),
+        'time': time.strftime("%H:%M:%S"),
+        'state': 'new',
+        'id_donor': session.donor['id'],
+        'id_point': session.point_id,
+        'type': 'drop',
+        'pending': True,
+        'foods': [{
+            'name': 'loadgen item',
+            'quantity': random.randint(100, 5000),
+            'category': random.choice(CATEGORIES),
+            'perishable': random.random() < 0.3,
+        }],
+    })
+
+
+def staff_polling(session):
+    response = session.client.get("/donations/changes", params={
+        'id_point': session.point_id, 'limit': 100, **session.watermark,
+    })
+    if response.status_code == 200:
+        session.watermark = response.json().get('watermark') or session.watermark
+        return session.client.get("/donations/pending")
+    return response
+
+
+SCENARIOS = {
+    'donor_login': donor_login,
+    'donation_create': donation_create,
+    'staff_polling': staff_polling,
+}
+
+
+def seed(client, donors):
+    """Create one donation point and `donors` donor accounts; returns (point_id, donors)."""
+    tag = uuid.uuid4().hex[:8]
+    point = client.post("/donation_points/create", json={
+        'name': f"Loadgen point {tag}", 'address': "n/a", 'lat': 19.43, 'lon': -99.13,
+    })
+    point.raise_for_status()
+    point_id = point.json()['id']
+
+    accounts = []
+    for n in range(donors):
+        email = f"loadgen-{tag}-{n}@example.com"
+        response = client.post("/donors/create", json={
+            'name': f"Loadgen {n}", 'email': email, 'phone': f"555{n:07d}", 'password': PASSWORD,
+        })
+        response.raise_for_status()
+        accounts.append({'id': response.json()['id'], 'email': email})
+    return point_id, accounts
+
+
+def worker(base_url, mix, deadline, recorder, donors, point_id, donation_ids, timeout):
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    with httpx.Client(base_url=base_url, timeout=timeout) as client:
+        session = Session(client, donors, point_id, donation_ids)
+        while time.monotonic() < deadline:
+            scenario = random.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                status = SCENARIOS[scenario](session).status_code
+            except httpx.HTTPError:
+                status = None
+            recorder.record(scenario, time.perf_counter() - started, status)
+
+
+def report(recorder, elapsed):
+    header = f"{'scenario':<16} {'requests':>9} {'rps':>8} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+    print(header)
+    print("-" * len(header))
+    total = 0
+    for scenario in sorted(recorder.latencies):
+        samples = sorted(recorder.latencies[scenario])
+        total += len(samples)
+        print(f"{scenario:<16} {len(samples):>9} {len(samples) / elapsed:>8.1f} {recorder.errors[scenario]:>7} "
+              f"{percentile(samples, 50) * 1000:>8.1f} {percentile(samples, 95) * 1000:>8.1f} "
+              f"{percentile(samples, 99) * 1000:>8.1f} {samples[-1] * 1000:>8.1f}")
+    print(f"\n{total} requests in {elapsed:.1f}s ({total / elapsed:.1f} req/s)")
+    for scenario in sorted(recorder.statuses):
+        codes = ", ".join(f"{code}: {count}" for code, count in sorted(recorder.statuses[scenario].items(), key=str))
+        print(f"  {scenario} status codes: {codes}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:5000")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--donors", type=int, default=50, help="donor accounts to seed")
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--first-donation-id", type=int, default=None,
+                        help="donation ids are client-assigned; defaults to a time-based base")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    with httpx.Client(base_url=args.base_url, timeout=args.timeout) as client:
+        point_id, donors = seed(client, args.donors)
+
+    # Donation ids come from the client, so hand them out from one shared counter
+    first_id = args.first_donation_id or int(time.time() * 1000) % 1_000_000_000
+    donation_ids = itertools.count(first_id)
+    recorder = Recorder()
+    deadline = time.monotonic() + args.duration
+    started = time.monotonic()
+    threads = [
+        threading.Thread(target=worker, args=(args.base_url, mix, deadline, recorder, donors, point_id,
+                                              donation_ids, args.timeout), daemon=True)
+        for _ in range(args.concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    report(recorder, time.monotonic() - started)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,706 @@
+"""
+Local PostgREST stand-in backed by SQLite, for end-to-end load tests.
+
+Speaks the subset of the PostgREST protocol the blueprints use:
+select / insert / upsert / update / delete on /rest/v1/<table>, the
+eq, neq, gt, gte, lt, lte, like, ilike, in, is filters (and not./or=),
+order, limit/offset, single-object responses and Prefer: count=exact,
+plus a few RPC functions under /rest/v1/rpc/<name>, the read-only
+donations_all / food_all views and the inventory ledger triggers of
+migrations/004 (donation_point_inventory follows donation and food
+writes). Other triggers, constraints and cascades are not emulated.
+
+Tables and columns are created on first insert; column types are
+inferred from the first value written.
+
+Usage:
+    python tools/postgrest_standin.py --db standin.sqlite --port 54321
+    SUPABASE_URL=http://127.0.0.1:54321 SUPABASE_KEY=<any JWT-shaped string> gunicorn ...
+"""
+import argparse
+import contextlib
+import json
+import re
+import sqlite3
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+OPERATORS = {
+    'eq': '=', 'neq': '!=', 'gt': '>', 'gte': '>=', 'lt': '<', 'lte': '<=',
+}
+RESERVED_PARAMS = {'select', 'order', 'limit', 'offset', 'on_conflict', 'columns'}
+# Read-only views over the hot and archive tables (migrations/008)
+VIEWS = {'donations_all': ('donations', 'donations_archive'), 'food_all': ('food', 'food_archive')}
+
+# migrations/004: food of pending donations is counted per point and
+# category. Each trigger adds (sign = 1) or subtracts (-1) through the
+# same upsert as inventory_apply().
+INVENTORY = "donation_point_inventory"
+_APPLY = ("insert into " + INVENTORY + " (id_point, category, items, quantity, updated_at) "
+          "select {point}, coalesce({category}, 'uncategorized'), {sign} * {items}, {sign} * {quantity}, "
+          "datetime('now') from {source} where {where} {group}"
+          "on conflict (id_point, category) do update set items = items + excluded.items, "
+          "quantity = quantity + excluded.quantity, updated_at = excluded.updated_at;")
+
+
+def _apply_food(row, sign):
+    """Ledger change for one food row (`row` is new or old) of a pending donation."""
+    return _APPLY.format(
+        point="d.id_point", category=f"{row}.category", sign=sign, items=1, quantity=f"coalesce({row}.quantity, 0)",
+        source="donations d", where=f"d.id = {row}.id_donation and d.pending and d.id_point is not null", group="")
+
+
+def _apply_donation(row, sign, extra=""):
+    """Ledger change for all the food of a donation (`row` is new or old), by category."""
+    return _APPLY.format(
+        point=f"{row}.id_point", category="category", sign=sign, items="count(*)",
+        quantity="coalesce(sum(quantity), 0)", source="food",
+        where=f"id_donation = old.id and {row}.pending and {row}.id_point is not null{extra}",
+        group="group by coalesce(category, 'uncategorized') ")
+
+
+INVENTORY_TRIGGERS = [
+    f"create trigger if not exists inventory_food_inserted after insert on food begin "
+    f"{_apply_food('new', 1)} end",
+    f"create trigger if not exists inventory_food_updated after update on food begin "
+    f"{_apply_food('old', -1)} {_apply_food('new', 1)} end",
+    f"create trigger if not exists inventory_food_deleted after delete on food begin "
+    f"{_apply_food('old', -1)} end",
+    f"create trigger if not exists inventory_donation_updated after update of pending, id_point on donations "
+    f"when old.pending is not new.pending or old.id_point is not new.id_point begin "
+    f"{_apply_donation('old', -1)} {_apply_donation('new', 1)} end",
+    f"create trigger if not exists inventory_donation_deleted before delete on donations begin "
+    f"{_apply_donation('old', -1)} end",
+]
+
+
+class APIError(Exception):
+    def __init__(self, status, message, code="PGRST000"):
+        super().__init__(message)
+        self.status = status
+        self.body = {'code': code, 'message': message, 'details': None, 'hint': None}
+
+
+def _ident(name):
+    if not IDENTIFIER.match(name):
+        raise APIError(400, f"Invalid identifier: {name}", "PGRST100")
+    return f'"{name}"'
+
+
+def _kind_of(value):
+    if isinstance(value, bool):
+        return 'bool'
+    if isinstance(value, int):
+        return 'int'
+    if isinstance(value, float):
+        return 'float'
+    if isinstance(value, (dict, list)):
+        return 'json'
+    return 'text'
+
+
+def _split_top_level(text):
+    """Split 'a.eq.1,and(b.eq.2,c.eq.3)' on commas outside parentheses and quotes."""
+    parts, depth, quoted, current = [], 0, False, []
+    for char in text:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == '(':
+            depth += 1
+        elif not quoted and char == ')':
+            depth -= 1
+        elif not quoted and depth == 0 and char == ',':
+            parts.append("".join(current))
+            current = []
+            continue
+        current.append(char)
+    if current:
+        parts.append("".join(current))
+    return parts
+
+
+def _unquote(value):
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return value[1:-1]
+    return value
+
+
+class Store:
+    """SQLite storage plus the column type metadata needed to round-trip JSON."""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("pragma journal_mode=wal")
+        self.conn.execute("create table if not exists _standin_columns (tbl text, col text, kind text, primary key (tbl, col))")
+        self.lock = threading.RLock()
+        self.columns = {}
+        self._triggers_installed = False
+        for row in self.conn.execute("select tbl, col, kind from _standin_columns"):
+            self.columns.setdefault(row['tbl'], {})[row['col']] = row['kind']
+        self.ensure_inventory_triggers()
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """begin ... commit, rolled back if the body raises: the connection is shared by every request."""
+        self.conn.execute("begin")
+        try:
+            yield
+        except BaseException:
+            self.conn.execute("rollback")
+            raise
+        self.conn.execute("commit")
+
+    # Schema
+
+    def has_table(self, table):
+        if table in VIEWS and VIEWS[table][0] in self.columns:
+            # A view shares its hot table's column metadata
+            self.columns[table] = self.columns[VIEWS[table][0]]
+        return table in self.columns
+
+    def source(self, table):
+        """FROM clause for a table, or a union subquery for a view."""
+        if table not in VIEWS:
+            return _ident(table)
+        hot, archive = VIEWS[table]
+        columns = list(self.columns[hot])
+        parts = [f"select {', '.join(_ident(col) for col in columns)} from {_ident(hot)}"]
+        if archive in self.columns:
+            archived = [_ident(col) if col in self.columns[archive] else f"null as {_ident(col)}" for col in columns]
+            parts.append(f"select {', '.join(archived)} from {_ident(archive)}")
+        return f"({' union all '.join(parts)})"
+
+    def copy_columns(self, source, target):
+        """Give `target` every column `source` has (archive tables mirror the hot ones)."""
+        self._ensure_table(target, [])
+        for col, kind in self.columns[source].items():
+            if col not in self.columns[target]:
+                self.conn.execute(f"alter table {_ident(target)} add column {_ident(col)}")
+                self.conn.execute("insert into _standin_columns values (?, ?, ?)", (target, col, kind))
+                self.columns[target][col] = kind
+
+    def ensure_table(self, table, rows):
+        self._ensure_table(table, rows)
+        if table in ('donations', 'food'):
+            self.ensure_inventory_triggers()
+
+    def ensure_inventory_triggers(self):
+        """
+        The inventory ledger triggers of migrations/004 as SQLite triggers,
+        installed once both donations and food exist, so the ledger (and
+        /donation_points/<id>/inventory, /routes) follows writes like it
+        does on Postgres.
+        """
+        if self._triggers_installed or 'donations' not in self.columns or 'food' not in self.columns:
+            return
+        self._ensure_table('donations', [{'id_point': 0, 'pending': False}])
+        self._ensure_table('food', [{'id_donation': 0, 'category': '', 'quantity': 0}])
+        self._ensure_table(INVENTORY, [{'id_point': 0, 'category': '', 'items': 0, 'quantity': 0.0, 'updated_at': ''}])
+        self.conn.execute(f"create unique index if not exists {INVENTORY}_id_point_category_key "
+                          f"on {INVENTORY} (id_point, category)")
+        for statement in INVENTORY_TRIGGERS:
+            self.conn.execute(statement)
+        self._triggers_installed = True
+
+    def _ensure_table(self, table, rows):
+        if table not in self.columns:
+            self.conn.execute(f"create table if not exists {_ident(table)} (id integer primary key autoincrement)")
+            self.conn.execute("insert or ignore into _standin_columns values (?, 'id', 'int')", (table,))
+            self.columns[table] = {'id': 'int'}
+        known = self.columns[table]
+        for row in rows:
+            for col, value in row.items():
+                if col not in known and value is not None:
+                    self.conn.execute(f"alter table {_ident(table)} add column {_ident(col)}")
+                    self.conn.execute("insert into _standin_columns values (?, ?, ?)", (table, col, _kind_of(value)))
+                    known[col] = _kind_of(value)
+        for row in rows:
+            for col in row:
+                if col not in known:
+                    self.conn.execute(f"alter table {_ident(table)} add column {_ident(col)}")
+                    self.conn.execute("insert into _standin_columns values (?, ?, 'text')", (table, col))
+                    known[col] = 'text'
+
+    # Value conversion
+
+    def to_db(self, table, col, value):
+        kind = self.columns.get(table, {}).get(col)
+        if value is None:
+            return None
+        if kind == 'json' or isinstance(value, (dict, list)):
+            return json.dumps(value)
+        if isinstance(value, bool):
+            return int(value)
+        return value
+
+    def from_param(self, table, col, raw):
+        """Convert a filter value from the URL to the column's storage type."""
+        kind = self.columns.get(table, {}).get(col, 'text')
+        raw = _unquote(raw)
+        try:
+            if kind == 'int':
+                return int(raw) if re.fullmatch(r"-?\d+", raw) else float(raw)
+            if kind == 'float':
+                return float(raw)
+            if kind == 'bool':
+                return 1 if raw.lower() == 'true' else 0
+        except ValueError:
+            pass
+        return raw
+
+    def from_db(self, table, row):
+        kinds = self.columns.get(table, {})
+        out = {}
+        for col in row.keys():
+            value = row[col]
+            kind = kinds.get(col)
+            if value is not None and kind == 'bool':
+                value = bool(value)
+            elif value is not None and kind == 'json':
+                value = json.loads(value)
+            out[col] = value
+        return out
+
+    # Filters
+
+    def build_where(self, table, params):
+        clauses, args = [], []
+        for key, value in params:
+            if key in RESERVED_PARAMS or '.' in key:
+                continue
+            if key in ('or', 'and'):
+                sql, sub_args = self._logical(table, key, value.strip()[1:-1])
+            else:
+                sql, sub_args = self._condition(table, key, value)
+            clauses.append(sql)
+            args.extend(sub_args)
+        return (" where " + " and ".join(clauses)) if clauses else "", args
+
+    def _logical(self, table, op, body):
+        parts, args = [], []
+        for item in _split_top_level(body):
+            match = re.match(r"^(not\.)?(and|or)\((.*)\)$", item)
+            if match:
+                sql, sub_args = self._logical(table, match.group(2), match.group(3))
+                if match.group(1):
+                    sql = f"not {sql}"
+            else:
+                col, expr = item.split('.', 1)
+                sql, sub_args = self._condition(table, col, expr)
+            parts.append(sql)
+            args.extend(sub_args)
+        return "(" + f" {op} ".join(parts) + ")", args
+
+    def _condition(self, table, col, expr):
+        negate = expr.startswith('not.')
+        if negate:
+            expr = expr[4:]
+        op, _, raw = expr.partition('.')
+        if col not in self.columns.get(table, {}):
+            raise APIError(400, f"column {table}.{col} does not exist", "42703")
+        column = _ident(col)
+
+        if op in OPERATORS:
+            sql, args = f"{column} {OPERATORS[op]} ?", [self.from_param(table, col, raw)]
+        elif op in ('like', 'ilike'):
+            pattern = _unquote(raw).replace('*', '%')
+            if op == 'ilike':
+                sql, args = f"lower({column}) like lower(?) escape '\\'", [pattern]
+            else:
+                sql, args = f"{column} glob ?", [pattern.replace('%', '*').replace('_', '?')]
+        elif op == 'in':
+            values = [self.from_param(table, col, v) for v in _split_top_level(raw.strip()[1:-1])]
+            if not values:
+                sql, args = "0", []
+            else:
+                sql, args = f"{column} in ({','.join('?' * len(values))})", values
+        elif op == 'is':
+            literal = {'null': 'null', 'true': '1', 'false': '0'}.get(raw.lower())
+            if literal is None:
+                raise APIError(400, f"Invalid is value: {raw}", "PGRST100")
+            sql, args = (f"{column} is null" if literal == 'null' else f"{column} = {literal}"), []
+        else:
+            raise APIError(400, f"Unsupported operator: {op}", "PGRST100")
+
+        return (f"not ({sql})" if negate else sql), args
+
+    def order_by(self, table, spec):
+        if not spec:
+            return ""
+        terms = []
+        for item in spec.split(','):
+            parts = item.split('.')
+            col = parts[0]
+            if col not in self.columns.get(table, {}):
+                raise APIError(400, f"column {table}.{col} does not exist", "42703")
+            term = _ident(col) + (" desc" if 'desc' in parts[1:] else " asc")
+            if 'nullsfirst' in parts[1:]:
+                term += " nulls first"
+            elif 'nullslast' in parts[1:]:
+                term += " nulls last"
+            terms.append(term)
+        return " order by " + ", ".join(terms)
+
+    def projection(self, table, select):
+        if not select or select == '*':
+            return '*'
+        cols = [c for c in select.split(',') if c in self.columns.get(table, {})]
+        return ", ".join(_ident(c) for c in cols) or '*'
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    store = None
+    rpc = {}
+
+    def log_message(self, format, *args):
+        pass
+
+    # Plumbing
+
+    def _parse(self):
+        parts = urlsplit(self.path)
+        params = parse_qsl(parts.query, keep_blank_values=True)
+        path = parts.path
+        if not path.startswith('/rest/v1/'):
+            raise APIError(404, f"Unknown path: {path}", "PGRST125")
+        return path[len('/rest/v1/'):], params
+
+    def _body(self):
+        return json.loads(self._raw_body) if self._raw_body else None
+
+    def _prefer(self):
+        return {p.strip() for p in (self.headers.get('Prefer') or '').split(',') if p.strip()}
+
+    def _send(self, status, body=None, headers=None):
+        payload = b'' if body is None else json.dumps(body, default=str).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(payload)
+
+    def _rows_response(self, status, rows, total=None, offset=0):
+        headers = {}
+        if total is not None:
+            headers['Content-Range'] = (f"{offset}-{offset + len(rows) - 1}/{total}" if rows else f"*/{total}")
+        if 'vnd.pgrst.object' in (self.headers.get('Accept') or ''):
+            if len(rows) != 1:
+                raise APIError(406, "JSON object requested, multiple (or no) rows returned", "PGRST116")
+            return self._send(status, rows[0], headers)
+        return self._send(status, rows, headers)
+
+    def _dispatch(self, method):
+        # Always drain the body (the client sends '{}' even on GET) so the
+        # next request on this keep-alive connection starts cleanly.
+        length = int(self.headers.get('Content-Length') or 0)
+        self._raw_body = self.rfile.read(length) if length else b''
+        try:
+            with self.store.lock:
+                method()
+        except APIError as e:
+            self._send(e.status, e.body)
+        except (sqlite3.Error, ValueError, KeyError) as e:
+            self._send(400, {'code': 'PGRST000', 'message': str(e), 'details': None, 'hint': None})
+
+    # Verbs
+
+    def do_GET(self):
+        self._dispatch(self._select)
+
+    def do_HEAD(self):
+        self._dispatch(self._select)
+
+    def do_POST(self):
+        self._dispatch(self._insert)
+
+    def do_PATCH(self):
+        self._dispatch(self._update)
+
+    def do_DELETE(self):
+        self._dispatch(self._delete)
+
+    def _select(self):
+        table, params = self._parse()
+        store = self.store
+        count = 'count=exact' in self._prefer()
+        if not store.has_table(table):
+            return self._rows_response(200, [], 0 if count else None)
+
+        query = dict(params)
+        where, args = store.build_where(table, params)
+        sql = f"select {store.projection(table, query.get('select'))} from {store.source(table)}{where}"
+        sql += store.order_by(table, query.get('order'))
+        limit = int(query['limit']) if 'limit' in query else -1
+        offset = int(query.get('offset', 0))
+        sql += f" limit {limit} offset {offset}"
+
+        rows = [store.from_db(table, r) for r in store.conn.execute(sql, args)]
+        total = None
+        if count:
+            total = store.conn.execute(f"select count(*) from {store.source(table)}{where}", args).fetchone()[0]
+        self._rows_response(200, rows, total, offset)
+
+    def _insert(self):
+        target, params = self._parse()
+        if target.startswith('rpc/'):
+            return self._rpc(target[len('rpc/'):])
+
+        rows = self._body()
+        rows = rows if isinstance(rows, list) else [rows]
+        store = self.store
+        prefer = self._prefer()
+        query = dict(params)
+        if not rows:
+            return self._rows_response(201, [])
+
+        store.ensure_table(target, rows)
+        conflict = [col.strip() for col in query.get('on_conflict', 'id').split(',')]
+        conflict_sql = ", ".join(_ident(col) for col in conflict)
+        upsert = any(p.startswith('resolution=') for p in prefer)
+        if upsert and conflict != ['id']:
+            store.conn.execute(
+                f"create unique index if not exists {_ident('_'.join([target, *conflict, 'key']))} "
+                f"on {_ident(target)} ({conflict_sql})"
+            )
+
+        columns = sorted({col for row in rows for col in row})
+        sql = f"insert into {_ident(target)} ({', '.join(_ident(c) for c in columns)}) values ({', '.join('?' * len(columns))})"
+        if 'resolution=ignore-duplicates' in prefer:
+            sql += f" on conflict ({conflict_sql}) do nothing"
+        elif 'resolution=merge-duplicates' in prefer:
+            updates = ", ".join(f"{_ident(c)} = excluded.{_ident(c)}" for c in columns if c not in conflict)
+            sql += f" on conflict ({conflict_sql}) do " + (f"update set {updates}" if updates else "nothing")
+        sql += " returning *"
+
+        created = []
+        store.conn.execute("begin")
+        try:
+            for row in rows:
+                values = [store.to_db(target, c, row.get(c)) for c in columns]
+                created.extend(store.from_db(target, r) for r in store.conn.execute(sql, values))
+            store.conn.execute("commit")
+        except Exception:
+            store.conn.execute("rollback")
+            raise
+
+        if 'return=representation' in prefer:
+            return self._rows_response(201, created)
+        self._send(201)
+
+    def _update(self):
+        table, params = self._parse()
+        store = self.store
+        data = self._body() or {}
+        if not store.has_table(table):
+            return self._rows_response(200, [])
+        store.ensure_table(table, [data])
+        where, args = store.build_where(table, params)
+        assignments = ", ".join(f"{_ident(c)} = ?" for c in data)
+        values = [store.to_db(table, c, v) for c, v in data.items()]
+        rows = [store.from_db(table, r) for r in store.conn.execute(
+            f"update {_ident(table)} set {assignments}{where} returning *", values + args)]
+        if 'return=representation' in self._prefer():
+            return self._rows_response(200, rows)
+        self._send(204)
+
+    def _delete(self):
+        table, params = self._parse()
+        store = self.store
+        if not store.has_table(table):
+            return self._rows_response(200, [])
+        where, args = store.build_where(table, params)
+        rows = [store.from_db(table, r) for r in store.conn.execute(
+            f"delete from {_ident(table)}{where} returning *", args)]
+        if 'return=representation' in self._prefer():
+            return self._rows_response(200, rows)
+        self._send(204)
+
+    def _rpc(self, name):
+        function = self.rpc.get(name)
+        if function is None:
+            raise APIError(404, f"Could not find the function public.{name}", "PGRST202")
+        self._send(200, function(self.store, self._body() or {}))
+
+
+# RPC functions mirroring the SQL ones in migrations/
+
+def rpc_search_donors(store, args):
+    if not store.has_table('donors'):
+        return []
+    q = str(args.get('q', '')).lower()
+    k = int(args.get('k', 10))
+    rows = store.conn.execute(
+        "select id, name, email, phone, "
+        "case when lower(name) like ?1 || '%' or lower(email) like ?1 || '%' then 2 else 1 end as score "
+        "from donors where lower(name) like '%' || ?1 || '%' or lower(email) like '%' || ?1 || '%' "
+        "order by score desc, id limit ?2", (q, k))
+    return [dict(r) for r in rows]
+
+
+def rpc_campaign_dashboard(store, args):
+    campaign_id = int(args.get('p_campaign_id'))
+    result = {'enrolled_donors': 0, 'donations': 0, 'pending_donations': 0, 'donating_donors': 0,
+              'total_kg': 0, 'by_category': [], 'by_day': []}
+    if store.has_table('campaign_donors'):
+        result['enrolled_donors'] = store.conn.execute(
+            "select count(*) from campaign_donors where campaign_id = ?", (campaign_id,)).fetchone()[0]
+    # Archived donations still count (donations_all / food_all, migration 010)
+    if not store.has_table('donations_all') or 'id_campaign' not in store.columns['donations_all']:
+        return result
+    donations = store.source('donations_all')
+    row = store.conn.execute(
+        f"select count(*), coalesce(sum(pending), 0), count(distinct id_donor) from {donations} "
+        f"where id_campaign = ?", (campaign_id,)).fetchone()
+    result['donations'], result['pending_donations'], result['donating_donors'] = row[0], row[1], row[2]
+    if not store.has_table('food_all'):
+        return result
+    food = f"select d.date, f.category, f.quantity, f.perishable, d.id from {donations} d " \
+           f"join {store.source('food_all')} f on f.id_donation = d.id where d.id_campaign = ?"
+    result['total_kg'] = store.conn.execute(
+        f"select coalesce(sum(quantity), 0) / 100.0 from ({food})", (campaign_id,)).fetchone()[0]
+    result['by_category'] = [dict(r) for r in store.conn.execute(
+        f"select category, count(*) as items, sum(quantity) / 100.0 as kg, "
+        f"sum(case when perishable then quantity else 0 end) / 100.0 as perishable_kg "
+        f"from ({food}) group by category order by kg desc", (campaign_id,))]
+    result['by_day'] = [dict(r) for r in store.conn.execute(
+        f"select date as day, count(distinct id) as donations, sum(quantity) / 100.0 as kg "
+        f"from ({food}) group by date order by date", (campaign_id,))]
+    return result
+
+
+def rpc_archive_donations(store, args):
+    if not store.has_table('donations'):
+        return 0
+    ids = [row[0] for row in store.conn.execute(
+        "select id from donations where pending = 0 and date < ? order by id limit ?",
+        (args.get('p_before'), int(args.get('p_limit'))))]
+    if not ids:
+        return 0
+    marks = ','.join('?' * len(ids))
+    moves = [('donations', 'donations_archive', 'id')]
+    if store.has_table('food'):
+        moves.insert(0, ('food', 'food_archive', 'id_donation'))
+    # Schema changes stay outside the transaction: the column metadata is not rolled back
+    for hot, archive, _ in moves:
+        store.copy_columns(hot, archive)
+    with store.transaction():
+        for hot, archive, key in moves:
+            columns = ', '.join(_ident(col) for col in store.columns[hot])
+            store.conn.execute(f"insert into {_ident(archive)} ({columns}) select {columns} from {_ident(hot)} "
+                               f"where {_ident(key)} in ({marks})", ids)
+            store.conn.execute(f"delete from {_ident(hot)} where {_ident(key)} in ({marks})", ids)
+    return len(ids)
+
+
+def rpc_leaderboard_add(store, args):
+    store.ensure_table('donor_leaderboard', [{'scope': '', 'donor_id': 0, 'quantity': 0.0, 'updated_at': ''}])
+    store.conn.execute("create unique index if not exists donor_leaderboard_scope_donor_id_key "
+                       "on donor_leaderboard (scope, donor_id)")
+    store.conn.execute("create table if not exists leaderboard_watermarks "
+                       "(origin text primary key, seq integer not null, updated_at text)")
+    donors = store.has_table('donors')
+    with store.transaction():
+        for delta in args.get('p_deltas') or []:
+            exists = store.conn.execute("select 1 from donors where id = ?", (delta['donor_id'],)).fetchone() \
+                if donors else True
+            if not exists:
+                continue
+            store.conn.execute(
+                "insert into donor_leaderboard (scope, donor_id, quantity, updated_at) values (?, ?, ?, datetime('now')) "
+                "on conflict (scope, donor_id) do update set quantity = quantity + excluded.quantity, "
+                "updated_at = excluded.updated_at",
+                (delta['scope'], delta['donor_id'], delta['quantity']))
+        store.conn.execute(
+            "insert into leaderboard_watermarks (origin, seq, updated_at) values (?, ?, datetime('now')) "
+            "on conflict (origin) do update set seq = max(seq, excluded.seq), updated_at = excluded.updated_at",
+            (args['p_origin'], int(args['p_seq'])))
+    return None
+
+
+def rpc_leaderboard_snapshot(store, args):
+    snapshot = {'rows': [], 'watermarks': {}}
+    if store.has_table('donor_leaderboard'):
+        snapshot['rows'] = [list(row) for row in store.conn.execute(
+            "select scope, donor_id, quantity from donor_leaderboard where quantity != 0")]
+    if store.conn.execute("select 1 from sqlite_master where name = 'leaderboard_watermarks'").fetchone():
+        snapshot['watermarks'] = {row[0]: row[1] for row in store.conn.execute(
+            "select origin, seq from leaderboard_watermarks")}
+    return snapshot
+
+
+def rpc_merge_donors(store, args):
+    canonical = int(args['p_canonical'])
+    duplicates = [int(donor_id) for donor_id in args.get('p_duplicates') or [] if int(donor_id) != canonical]
+    moved = {'donations': 0, 'campaign_donors': 0, 'campaign_donors_dropped': 0}
+    if not duplicates:
+        return moved
+    marks = ','.join('?' * len(duplicates))
+    with store.transaction():
+        for table in ('donations', 'donations_archive'):
+            if store.has_table(table):
+                moved['donations'] += store.conn.execute(
+                    f"update {table} set id_donor = ? where id_donor in ({marks})", [canonical, *duplicates]).rowcount
+        if store.has_table('campaign_donors'):
+            moved['campaign_donors_dropped'] = store.conn.execute(
+                f"delete from campaign_donors where id in (select id from (select id, row_number() over ("
+                f"partition by campaign_id order by donor_id = ? desc, id) as position from campaign_donors "
+                f"where donor_id = ? or donor_id in ({marks})) where position > 1)",
+                [canonical, canonical, *duplicates]).rowcount
+            moved['campaign_donors'] = store.conn.execute(
+                f"update campaign_donors set donor_id = ? where donor_id in ({marks})", [canonical, *duplicates]).rowcount
+        if store.has_table('donor_leaderboard'):
+            store.conn.execute("create unique index if not exists donor_leaderboard_scope_donor_id_key "
+                               "on donor_leaderboard (scope, donor_id)")
+            store.conn.execute(
+                f"insert into donor_leaderboard (scope, donor_id, quantity, updated_at) "
+                f"select scope, ?, sum(quantity), datetime('now') from donor_leaderboard where donor_id in ({marks}) "
+                f"group by scope on conflict (scope, donor_id) do update set "
+                f"quantity = quantity + excluded.quantity, updated_at = excluded.updated_at",
+                [canonical, *duplicates])
+            store.conn.execute(f"delete from donor_leaderboard where donor_id in ({marks})", duplicates)
+        if store.has_table('donors'):
+            store.conn.execute(f"delete from donors where id in ({marks})", duplicates)
+    return moved
+
+
+Handler.rpc = {
+    'search_donors': rpc_search_donors,
+    'campaign_dashboard': rpc_campaign_dashboard,
+    'archive_donations': rpc_archive_donations,
+    'leaderboard_add': rpc_leaderboard_add,
+    'leaderboard_snapshot': rpc_leaderboard_snapshot,
+    'merge_donors': rpc_merge_donors,
+}
+
+
+def serve(db_path, host, port):
+    Handler.store = Store(db_path)
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument('--db', default='standin.sqlite', help="SQLite file (use :memory: for a throwaway store)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=54321)
+    args = parser.parse_args()
+
+    server = serve(args.db, args.host, args.port)
+    print(f"PostgREST stand-in listening on http://{args.host}:{args.port} (db: {args.db})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,6 @@
+# wsgi.py - production entry point, e.g. `gunicorn -c gunicorn.conf.py wsgi:app`
+from app import create_app
+from app.warmup import warmup
+
+app = create_app()
+warmup(app)